@@ -1,4 +1,4 @@
-from Cadastro_API.client import ApiResponse, AtsApiClient
+from Cadastro_API.client import ApiResponse, AsyncAtsApiClient, AtsApiClient
 from Cadastro_API.login import login_api
 
-__all__ = ["login_api", "ApiResponse", "AtsApiClient"]
+__all__ = ["login_api", "ApiResponse", "AtsApiClient", "AsyncAtsApiClient"]
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
 from typing import Any, Mapping
 from urllib.parse import urljoin, urlparse
 
 import httpx
 
-from Cadastro_API.login import login_api
+from Cadastro_API.controle_fluxo import ControleFluxo, obter_controle_fluxo
+from Cadastro_API.token_manager import GerenciadorTokenApi, obter_gerenciador_token
 from config.settings import settings
 
 
@@ -15,52 +19,50 @@ class ApiResponse:
     status_code: int
     json_data: Any
     text: str
+    headers: dict[str, str] = field(default_factory=dict)
 
+    def retry_after_segundos(self) -> float | None:
+        # Retry-After pode vir em segundos ou como data HTTP.
+        raw = str(self.headers.get("retry-after") or "").strip()
+        if not raw:
+            return None
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+        except Exception:
+            return None
 
-class AtsApiClient:
+
+class _AtsApiClientBase:
     def __init__(self, timeout_seconds: float = 30.0, integration_config: Mapping[str, Any] | None = None) -> None:
         self.integration_config = dict(integration_config or {})
         self.timeout_seconds = max(1.0, float(timeout_seconds))
         self._base_url = self._resolver_base_url(self.integration_config)
         self._token: str | None = None
-        self._client = httpx.Client(timeout=self.timeout_seconds)
-
-    def close(self) -> None:
-        self._client.close()
-
-    def authenticate(self, force: bool = False) -> str:
-        if self._token and not force:
-            return self._token
-
-        auth_data = login_api(timeout=self.timeout_seconds, config=self.integration_config)
-        token = str(auth_data.get("token") or "").strip()
-        if not token:
-            raise ValueError("Resposta de login sem token valido.")
-        self._token = token
-        return token
+        self._tokens: GerenciadorTokenApi = obter_gerenciador_token(
+            self.integration_config,
+            timeout=self.timeout_seconds,
+        )
 
-    def post_json(
+    def configurar_fluxo(
         self,
         endpoint_path: str,
-        payload: dict[str, Any],
         *,
-        retry_unauthorized: bool = True,
-    ) -> ApiResponse:
-        token = self.authenticate()
-        response = self._request(endpoint_path, payload, token)
-
-        if response.status_code == 401 and retry_unauthorized:
-            token = self.authenticate(force=True)
-            response = self._request(endpoint_path, payload, token)
+        requisicoes_por_segundo: float | None = None,
+        concorrencia_maxima: int | None = None,
+    ) -> None:
+        self._controle_fluxo(endpoint_path).configurar(
+            requisicoes_por_segundo=requisicoes_por_segundo,
+            concorrencia_maxima=concorrencia_maxima,
+        )
 
-        return self._parse_response(response)
+    def _controle_fluxo(self, endpoint_path: str) -> ControleFluxo:
+        return obter_controle_fluxo(self._base_url, self._normalizar_endpoint(endpoint_path))
 
-    def _request(
-        self,
-        endpoint_path: str,
-        payload: dict[str, Any],
-        token: str,
-    ) -> httpx.Response:
+    def _montar_requisicao(self, endpoint_path: str, token: str) -> tuple[str, dict[str, str]]:
         endpoint = self._normalizar_endpoint(endpoint_path)
         url = urljoin(self._base_url, endpoint)
         headers = {
@@ -68,7 +70,7 @@ class AtsApiClient:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {token}",
         }
-        return self._client.post(url, json=payload, headers=headers)
+        return url, headers
 
     @staticmethod
     def _parse_response(response: httpx.Response) -> ApiResponse:
@@ -81,6 +83,7 @@ class AtsApiClient:
             status_code=int(response.status_code),
             json_data=json_data,
             text=text,
+            headers={str(k).lower(): str(v) for k, v in response.headers.items()},
         )
 
     @staticmethod
@@ -109,3 +112,119 @@ class AtsApiClient:
             path = path[:-6]
 
         return f"{parsed.scheme}://{parsed.netloc}{path}/"
+
+
+class AtsApiClient(_AtsApiClientBase):
+    def __init__(self, timeout_seconds: float = 30.0, integration_config: Mapping[str, Any] | None = None) -> None:
+        super().__init__(timeout_seconds=timeout_seconds, integration_config=integration_config)
+        self._client = httpx.Client(timeout=self.timeout_seconds)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def authenticate(self, force: bool = False, token_rejeitado: str | None = None) -> str:
+        # O gerenciador e compartilhado no processo: com envio concorrente,
+        # varias threads podem receber 401 ao mesmo tempo e so uma faz login.
+        if force:
+            token = self._tokens.renovar(token_rejeitado=token_rejeitado or self._token)
+        else:
+            token = self._tokens.obter_token()
+        self._token = token
+        return token
+
+    def post_json(
+        self,
+        endpoint_path: str,
+        payload: dict[str, Any],
+        *,
+        retry_unauthorized: bool = True,
+    ) -> ApiResponse:
+        token = self.authenticate()
+        response = self._request(endpoint_path, payload, token)
+
+        if response.status_code == 401 and retry_unauthorized:
+            token = self.authenticate(force=True, token_rejeitado=token)
+            response = self._request(endpoint_path, payload, token)
+
+        return self._parse_response(response)
+
+    def _request(
+        self,
+        endpoint_path: str,
+        payload: dict[str, Any],
+        token: str,
+    ) -> httpx.Response:
+        url, headers = self._montar_requisicao(endpoint_path, token)
+        controle = self._controle_fluxo(endpoint_path)
+        with controle.slot():
+            try:
+                response = self._client.post(url, json=payload, headers=headers)
+            except httpx.TransportError:
+                controle.registrar(status_code=None)
+                raise
+        controle.registrar(status_code=response.status_code)
+        return response
+
+
+class AsyncAtsApiClient(_AtsApiClientBase):
+    def __init__(
+        self,
+        timeout_seconds: float = 30.0,
+        integration_config: Mapping[str, Any] | None = None,
+        *,
+        max_conexoes: int = 100,
+    ) -> None:
+        super().__init__(timeout_seconds=timeout_seconds, integration_config=integration_config)
+        conexoes = max(1, int(max_conexoes))
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_seconds,
+            limits=httpx.Limits(max_connections=conexoes, max_keepalive_connections=conexoes),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def authenticate(self, force: bool = False, token_rejeitado: str | None = None) -> str:
+        # Token valido sai da memoria sem bloquear; login (raro) roda em thread.
+        if force:
+            token = await asyncio.to_thread(
+                self._tokens.renovar,
+                token_rejeitado=token_rejeitado or self._token,
+            )
+        else:
+            token = self._tokens.token_valido() or await asyncio.to_thread(self._tokens.obter_token)
+        self._token = token
+        return token
+
+    async def post_json(
+        self,
+        endpoint_path: str,
+        payload: dict[str, Any],
+        *,
+        retry_unauthorized: bool = True,
+    ) -> ApiResponse:
+        token = await self.authenticate()
+        response = await self._request(endpoint_path, payload, token)
+
+        if response.status_code == 401 and retry_unauthorized:
+            token = await self.authenticate(force=True, token_rejeitado=token)
+            response = await self._request(endpoint_path, payload, token)
+
+        return self._parse_response(response)
+
+    async def _request(
+        self,
+        endpoint_path: str,
+        payload: dict[str, Any],
+        token: str,
+    ) -> httpx.Response:
+        url, headers = self._montar_requisicao(endpoint_path, token)
+        controle = self._controle_fluxo(endpoint_path)
+        async with controle.slot_async():
+            try:
+                response = await self._client.post(url, json=payload, headers=headers)
+            except httpx.TransportError:
+                controle.registrar(status_code=None)
+                raise
+        controle.registrar(status_code=response.status_code)
+        return response
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+# Respostas que indicam sobrecarga da API: reduzem a janela de concorrencia.
+STATUS_SOBRECARGA = frozenset({429, 503})
+_FATOR_REDUCAO = 0.5
+_ESPERA_MAXIMA_SEGUNDOS = 0.25
+
+_CONTROLES: dict[tuple[str, str], "ControleFluxo"] = {}
+_CONTROLES_LOCK = threading.Lock()
+
+
+def obter_controle_fluxo(base_url: str, endpoint: str) -> "ControleFluxo":
+    chave = (str(base_url or "").rstrip("/").lower(), str(endpoint or "").lower())
+    with _CONTROLES_LOCK:
+        controle = _CONTROLES.get(chave)
+        if controle is None:
+            controle = ControleFluxo()
+            _CONTROLES[chave] = controle
+        return controle
+
+
+class ControleFluxo:
+    # Token bucket (requisicoes/s) + janela de concorrencia AIMD por
+    # (base_url, endpoint), compartilhados por todos os clientes do processo.
+    # Sucesso soma 1/janela (≈ +1 por "rodada"); 429/503 ou falha de conexao
+    # multiplicam a janela por 0.5, com piso 1 e teto concorrencia_maxima.
+    # Com concorrencia_maxima 1 (padrao de API_SYNC_CONCORRENCIA) a janela
+    # fica presa em 1: o AIMD so tem efeito com concorrencia > 1.
+    def __init__(self, *, requisicoes_por_segundo: float = 0.0, concorrencia_maxima: int = 0) -> None:
+        self._cond = threading.Condition()
+        self._em_voo = 0
+        self._tokens = 0.0
+        self._ultimo_abastecimento = time.monotonic()
+        self.requisicoes_por_segundo = 0.0
+        self.concorrencia_maxima = 0
+        self.janela = 1.0
+        self.configurar(requisicoes_por_segundo=requisicoes_por_segundo, concorrencia_maxima=concorrencia_maxima)
+
+    def configurar(self, *, requisicoes_por_segundo: float | None = None, concorrencia_maxima: int | None = None) -> None:
+        # O controle e compartilhado por todos os servicos do processo que usam
+        # o mesmo (base_url, endpoint): configuracoes se somam pelo maior
+        # limite, sem que o ultimo a configurar sobrescreva os demais, e a
+        # janela ja em uso nunca e reiniciada (um teto maior ela alcanca pelo
+        # incremento aditivo).
+        with self._cond:
+            if requisicoes_por_segundo is not None:
+                taxa = max(0.0, float(requisicoes_por_segundo))
+                if taxa > self.requisicoes_por_segundo:
+                    self.requisicoes_por_segundo = taxa
+                    self._tokens = min(self._tokens, self._capacidade())
+            if concorrencia_maxima is not None:
+                maximo = max(0, int(concorrencia_maxima))
+                if maximo > self.concorrencia_maxima:
+                    if not self.concorrencia_maxima:
+                        self.janela = float(maximo)
+                    self.concorrencia_maxima = maximo
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        while True:
+            with self._cond:
+                espera = self._tentar_adquirir()
+                if espera <= 0:
+                    break
+                self._cond.wait(espera)
+        try:
+            yield
+        finally:
+            self._liberar()
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        while True:
+            with self._cond:
+                espera = self._tentar_adquirir()
+            if espera <= 0:
+                break
+            await asyncio.sleep(espera)
+        try:
+            yield
+        finally:
+            self._liberar()
+
+    def registrar(self, *, status_code: int | None) -> None:
+        with self._cond:
+            if not self.concorrencia_maxima:
+                return
+            if status_code is None or status_code in STATUS_SOBRECARGA:
+                self.janela = max(1.0, self.janela * _FATOR_REDUCAO)
+            elif status_code < 500:
+                self.janela = min(float(self.concorrencia_maxima), self.janela + 1.0 / self.janela)
+            self._cond.notify_all()
+
+    def _tentar_adquirir(self) -> float:
+        if self.concorrencia_maxima and self._em_voo >= int(self.janela):
+            return _ESPERA_MAXIMA_SEGUNDOS
+
+        if self.requisicoes_por_segundo > 0:
+            agora = time.monotonic()
+            self._tokens = min(
+                self._capacidade(),
+                self._tokens + (agora - self._ultimo_abastecimento) * self.requisicoes_por_segundo,
+            )
+            self._ultimo_abastecimento = agora
+            if self._tokens < 1.0:
+                falta = (1.0 - self._tokens) / self.requisicoes_por_segundo
+                return min(_ESPERA_MAXIMA_SEGUNDOS, max(0.001, falta))
+            self._tokens -= 1.0
+
+        self._em_voo += 1
+        return 0.0
+
+    def _liberar(self) -> None:
+        with self._cond:
+            self._em_voo = max(0, self._em_voo - 1)
+            self._cond.notify_all()
+
+    def _capacidade(self) -> float:
+        # Rajada de ate 1s de taxa (minimo 1 token).
+        return max(1.0, self.requisicoes_por_segundo)
@@ -1,9 +1,15 @@
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from threading import Lock
 from typing import Any, Dict, Mapping
 from urllib.parse import urlparse, urlunparse
 
 import httpx
 
-from config.settings import settings
+from config.settings import BASE_DIR, settings
 
 _LOGIN_PATHS = (
     "/login",
@@ -14,6 +20,15 @@ _LOGIN_PATHS = (
     "/v1/auth/login",
 )
 
+# URL de login que funcionou por configuracao (login_url + base_url), tentada
+# primeiro no proximo login; persistida em arquivo para sobreviver a restart.
+_LOGIN_URLS_VENCEDORAS: dict[str, str] = {}
+_LOGIN_URLS_LOCK = Lock()
+_LOGIN_URLS_CARREGADAS = False
+_MAX_SONDAGENS_PARALELAS = 8
+# Respostas de uma rota de login a um POST sem credenciais.
+_STATUS_SONDAGEM_LOGIN = frozenset({400, 401, 422})
+
 
 def _cfg_get(config: Mapping[str, Any] | None, key: str, default: str) -> str:
     if config is None:
@@ -101,6 +116,113 @@ def _extract_token(payload: Any) -> str:
     return ""
 
 
+def _chave_login(login_url: str, base_url: str) -> str:
+    raw = f"{login_url.strip().lower()}|{base_url.strip().lower()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _arquivo_login_urls() -> Path | None:
+    raw = str(settings.api_login_url_cache_file or "").strip()
+    if not raw:
+        return None
+    path = Path(raw).expanduser()
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def _login_url_vencedora(chave: str) -> str | None:
+    global _LOGIN_URLS_CARREGADAS
+    with _LOGIN_URLS_LOCK:
+        if not _LOGIN_URLS_CARREGADAS:
+            _LOGIN_URLS_CARREGADAS = True
+            path = _arquivo_login_urls()
+            if path is not None and path.exists():
+                try:
+                    data = json.loads(path.read_text(encoding="utf-8"))
+                    _LOGIN_URLS_VENCEDORAS.update({str(k): str(v) for k, v in dict(data).items()})
+                except Exception:
+                    pass
+        return _LOGIN_URLS_VENCEDORAS.get(chave)
+
+
+def _registrar_login_url_vencedora(chave: str, url: str) -> None:
+    with _LOGIN_URLS_LOCK:
+        if _LOGIN_URLS_VENCEDORAS.get(chave) == url:
+            return
+        _LOGIN_URLS_VENCEDORAS[chave] = url
+        path = _arquivo_login_urls()
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(_LOGIN_URLS_VENCEDORAS, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except Exception:
+            pass
+
+
+def _tentar_login(
+    client: httpx.Client,
+    candidate: str,
+    payload: Mapping[str, Any],
+    headers: Mapping[str, str],
+) -> tuple[Dict[str, Any] | None, str | None]:
+    try:
+        response = client.post(candidate, json=payload, headers=headers)
+    except Exception as exc:
+        return None, f"{candidate} -> erro de conexao: {exc}"
+
+    status_code = int(response.status_code)
+    if status_code in {404, 405}:
+        return None, f"{candidate} -> HTTP {status_code}"
+
+    if status_code in {401, 403}:
+        return None, f"{candidate} -> HTTP {status_code} (credenciais rejeitadas)"
+
+    if status_code >= 400:
+        return None, f"{candidate} -> HTTP {status_code}"
+
+    try:
+        data = response.json()
+    except Exception:
+        return None, f"{candidate} -> resposta nao-JSON (HTTP {status_code})"
+
+    token = _extract_token(data)
+    if not token:
+        return None, f"{candidate} -> resposta sem token"
+
+    normalized = dict(data)
+    normalized.setdefault("token", token)
+    normalized["_login_url"] = candidate
+    return normalized, None
+
+
+def _sondar_login(
+    candidate: str,
+    headers: Mapping[str, str],
+    timeout: httpx.Timeout,
+) -> tuple[bool, str | None]:
+    # Descoberta sem credenciais (corpo vazio), sem abrir sessao no servidor.
+    # So conta como rota de login a rejeicao tipica de login (400/401/422 com
+    # corpo JSON): host "catch-all", proxy reverso ou redirect nao vencem.
+    # Cliente proprio por sondagem, pois as sondagens rodam em threads que
+    # podem sobreviver ao login_api.
+    try:
+        with httpx.Client(timeout=timeout, follow_redirects=False) as client:
+            response = client.post(candidate, json={}, headers=headers)
+    except Exception as exc:
+        return False, f"{candidate} -> erro de conexao: {exc}"
+
+    status_code = int(response.status_code)
+    if status_code not in _STATUS_SONDAGEM_LOGIN:
+        return False, f"{candidate} -> HTTP {status_code} (nao parece rota de login)"
+    try:
+        response.json()
+    except Exception:
+        return False, f"{candidate} -> HTTP {status_code} sem corpo JSON (nao parece rota de login)"
+    return True, None
+
+
 def login_api(timeout: float = 30.0, config: Mapping[str, Any] | None = None) -> Dict[str, Any]:
     login_url = _cfg_get(config, "login_url", settings.api_login_url)
     base_url = _cfg_get(config, "base_url", settings.api_base_url)
@@ -125,43 +247,54 @@ def login_api(timeout: float = 30.0, config: Mapping[str, Any] | None = None) ->
     if not candidates:
         raise ValueError("Nao foi possivel montar URL de login para autenticacao.")
 
+    chave = _chave_login(login_url, base_url)
+    vencedora = _login_url_vencedora(chave)
     erros: list[str] = []
-    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-        for candidate in candidates:
-            try:
-                response = client.post(candidate, json=payload, headers=headers)
-            except Exception as exc:
-                erros.append(f"{candidate} -> erro de conexao: {exc}")
-                continue
-
-            status_code = int(response.status_code)
-            if status_code in {404, 405}:
-                erros.append(f"{candidate} -> HTTP {status_code}")
-                continue
 
-            if status_code in {401, 403}:
-                erros.append(f"{candidate} -> HTTP {status_code} (credenciais rejeitadas)")
-                continue
-
-            if status_code >= 400:
-                erros.append(f"{candidate} -> HTTP {status_code}")
-                continue
-
-            try:
-                data = response.json()
-            except Exception:
-                erros.append(f"{candidate} -> resposta nao-JSON (HTTP {status_code})")
-                continue
-
-            token = _extract_token(data)
-            if not token:
-                erros.append(f"{candidate} -> resposta sem token")
-                continue
-
-            normalized = dict(data)
-            normalized.setdefault("token", token)
-            normalized["_login_url"] = candidate
-            return normalized
+    # URL vencedora em cache e a login_url configurada recebem as credenciais
+    # direto, nessa ordem; as demais candidatas so depois que ambas falharem.
+    diretas = [url for url in (vencedora, str(login_url).strip()) if url and url in candidates]
+    for url in dict.fromkeys(diretas):
+        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+            data, erro = _tentar_login(client, url, payload, headers)
+        if data is not None:
+            if url != vencedora:
+                _registrar_login_url_vencedora(chave, url)
+            return data
+        erros.append(erro or f"{url} -> falha")
+    candidates = [candidate for candidate in candidates if candidate not in diretas]
+    if not candidates:
+        resumo = " | ".join(erros[:5]) if erros else "sem detalhes"
+        raise ValueError(f"Nao foi possivel autenticar. Tentativas: {resumo}")
+
+    # Descoberta das demais candidatas em paralelo, com connect timeout curto:
+    # URL errada falha rapido. As credenciais vao uma vez so, para a primeira
+    # rota encontrada (a seguinte so se essa falhar), nunca em paralelo.
+    connect_timeout = min(float(timeout), max(0.5, float(settings.api_login_connect_timeout_seconds)))
+    client_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+    workers = max(1, min(_MAX_SONDAGENS_PARALELAS, len(candidates)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-login")
+    try:
+        pendentes = {
+            pool.submit(_sondar_login, candidate, headers, client_timeout): candidate
+            for candidate in candidates
+        }
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for future in concluidos:
+                candidate = pendentes.pop(future)
+                existe, erro = future.result()
+                if not existe:
+                    erros.append(erro or f"{candidate} -> falha")
+                    continue
+                with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+                    data, erro = _tentar_login(client, candidate, payload, headers)
+                if data is not None:
+                    _registrar_login_url_vencedora(chave, candidate)
+                    return data
+                erros.append(erro or f"{candidate} -> falha")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
     resumo = " | ".join(erros[:5]) if erros else "sem detalhes"
     raise ValueError(f"Nao foi possivel autenticar. Tentativas: {resumo}")
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Mapping
+
+from Cadastro_API.login import login_api
+from config.settings import BASE_DIR, settings
+
+# Sem "exp" no JWT o token e tratado como valido por este tempo.
+_VALIDADE_PADRAO_SEGUNDOS = 3600
+_LOCK_ARQUIVO_EXPIRA_SEGUNDOS = 30.0
+_LOCK_ARQUIVO_ESPERA_SEGUNDOS = 0.05
+
+_GERENCIADORES: dict[str, "GerenciadorTokenApi"] = {}
+_GERENCIADORES_LOCK = threading.Lock()
+
+
+def _cfg_get(config: Mapping[str, Any] | None, key: str, default: str) -> str:
+    return str((config or {}).get(key) or default or "").strip()
+
+
+def _chave_token(config: Mapping[str, Any] | None) -> str:
+    login_url = _cfg_get(config, "login_url", settings.api_login_url).lower()
+    usuario = _cfg_get(config, "usuario", settings.api_user)
+    return hashlib.sha1(f"{login_url}|{usuario}".encode("utf-8")).hexdigest()
+
+
+def _decodificar_exp(token: str) -> float | None:
+    partes = str(token or "").split(".")
+    if len(partes) != 3:
+        return None
+    corpo = partes[1] + "=" * (-len(partes[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(corpo.encode("ascii")))
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
+def _resolver_arquivo_cache() -> Path | None:
+    raw = str(settings.api_token_cache_file or "").strip()
+    if not raw:
+        return None
+    path = Path(raw).expanduser()
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def obter_gerenciador_token(
+    config: Mapping[str, Any] | None = None,
+    *,
+    timeout: float = 30.0,
+) -> "GerenciadorTokenApi":
+    chave = _chave_token(config)
+    with _GERENCIADORES_LOCK:
+        gerenciador = _GERENCIADORES.get(chave)
+        if gerenciador is None:
+            gerenciador = GerenciadorTokenApi(chave=chave, config=config, timeout=timeout)
+            _GERENCIADORES[chave] = gerenciador
+        else:
+            gerenciador.atualizar_config(config, timeout=timeout)
+        return gerenciador
+
+
+class GerenciadorTokenApi:
+    # Um gerenciador por (login_url, usuario) no processo. O token e renovado
+    # antes do "exp" por um timer em segundo plano e compartilhado entre
+    # processos pelo arquivo de cache, protegido por um lock de arquivo.
+    def __init__(
+        self,
+        *,
+        chave: str,
+        config: Mapping[str, Any] | None = None,
+        timeout: float = 30.0,
+        arquivo_cache: Path | None = None,
+    ) -> None:
+        self.chave = chave
+        self.config = dict(config or {})
+        self.timeout = max(1.0, float(timeout))
+        self.arquivo_cache = arquivo_cache if arquivo_cache is not None else _resolver_arquivo_cache()
+        self.margem_segundos = max(0, int(settings.api_token_refresh_margin_seconds))
+        self._lock = threading.Lock()
+        self._token: str | None = None
+        self._expira_em: float = 0.0
+        self._timer: threading.Timer | None = None
+
+    def atualizar_config(self, config: Mapping[str, Any] | None, *, timeout: float) -> None:
+        with self._lock:
+            novo = dict(config or {})
+            if _cfg_get(novo, "senha", settings.api_pass) != _cfg_get(self.config, "senha", settings.api_pass):
+                self._token = None
+                self._expira_em = 0.0
+            self.config = novo
+            self.timeout = max(1.0, float(timeout))
+
+    def token_valido(self) -> str | None:
+        token = self._token
+        if token and time.time() < self._expira_em - self.margem_segundos:
+            return token
+        return None
+
+    def obter_token(self) -> str:
+        token = self.token_valido()
+        if token:
+            return token
+
+        with self._lock:
+            if self._token and time.time() < self._expira_em - self.margem_segundos:
+                return self._token
+            return self._renovar_locked(token_rejeitado=None)
+
+    def renovar(self, token_rejeitado: str | None = None) -> str:
+        with self._lock:
+            # Outra thread ja trocou o token rejeitado: reaproveita o novo.
+            if self._token and token_rejeitado and self._token != token_rejeitado:
+                return self._token
+            return self._renovar_locked(token_rejeitado=token_rejeitado)
+
+    def encerrar(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _renovar_locked(self, *, token_rejeitado: str | None) -> str:
+        with self._lock_arquivo():
+            cacheado = self._ler_cache()
+            if (
+                cacheado is not None
+                and cacheado[0] != token_rejeitado
+                and time.time() < cacheado[1] - self.margem_segundos
+            ):
+                token, expira_em = cacheado
+            else:
+                auth_data = login_api(timeout=self.timeout, config=self.config)
+                token = str(auth_data.get("token") or "").strip()
+                if not token:
+                    raise ValueError("Resposta de login sem token valido.")
+                expira_em = _decodificar_exp(token) or (time.time() + _VALIDADE_PADRAO_SEGUNDOS)
+                self._gravar_cache(token, expira_em)
+
+        self._token = token
+        self._expira_em = expira_em
+        self._agendar_renovacao()
+        return token
+
+    def _agendar_renovacao(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        atraso = self._expira_em - self.margem_segundos - time.time()
+        if atraso <= 0:
+            self._timer = None
+            return
+        self._timer = threading.Timer(atraso, self._renovar_em_segundo_plano)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _renovar_em_segundo_plano(self) -> None:
+        try:
+            with self._lock:
+                self._renovar_locked(token_rejeitado=None)
+        except Exception:
+            # Falhou em segundo plano: a proxima chamada de obter_token tenta
+            # de novo de forma sincrona e propaga o erro ao chamador.
+            pass
+
+    def _ler_cache(self) -> tuple[str, float] | None:
+        if self.arquivo_cache is None or not self.arquivo_cache.exists():
+            return None
+        try:
+            data = json.loads(self.arquivo_cache.read_text(encoding="utf-8"))
+            item = data.get(self.chave) or {}
+            token = str(item.get("token") or "").strip()
+            expira_em = float(item.get("expira_em") or 0)
+        except Exception:
+            return None
+        return (token, expira_em) if token else None
+
+    def _gravar_cache(self, token: str, expira_em: float) -> None:
+        if self.arquivo_cache is None:
+            return
+        try:
+            data: dict[str, Any] = {}
+            if self.arquivo_cache.exists():
+                try:
+                    data = json.loads(self.arquivo_cache.read_text(encoding="utf-8"))
+                except Exception:
+                    data = {}
+            agora = time.time()
+            data = {k: v for k, v in data.items() if float((v or {}).get("expira_em") or 0) > agora}
+            data[self.chave] = {"token": token, "expira_em": expira_em}
+
+            self.arquivo_cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.arquivo_cache.with_suffix(self.arquivo_cache.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.arquivo_cache)
+        except Exception:
+            # Cache em arquivo e apenas otimizacao; o token segue em memoria.
+            pass
+
+    @contextmanager
+    def _lock_arquivo(self) -> Iterator[None]:
+        if self.arquivo_cache is None:
+            yield
+            return
+
+        lock_path = self.arquivo_cache.with_suffix(self.arquivo_cache.suffix + ".lock")
+        fd: int | None = None
+        limite = time.monotonic() + self.timeout
+        try:
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            while True:
+                try:
+                    fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    # Lock abandonado por processo que caiu durante o login.
+                    try:
+                        if time.time() - lock_path.stat().st_mtime > _LOCK_ARQUIVO_EXPIRA_SEGUNDOS:
+                            os.remove(lock_path)
+                            continue
+                    except OSError:
+                        continue
+                    if time.monotonic() >= limite:
+                        break
+                    time.sleep(_LOCK_ARQUIVO_ESPERA_SEGUNDOS)
+        except OSError:
+            fd = None
+
+        try:
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
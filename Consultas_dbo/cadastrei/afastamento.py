@@ -5,11 +5,33 @@ from datetime import date, datetime
 from typing import Any
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.elements import TextClause
+
+from Consultas_dbo.cadastrei.lote_temporario import (
+    criar_keyset_temporario,
+    descartar_tabela_temporaria,
+    inserir_linhas_em_massa,
+)
+from Consultas_dbo.metadados import aquecer_metadados, colunas_tabela, invalidar_metadados
 
 _IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 
+# Abaixo disso o caminho linha a linha sai mais barato que montar a tabela temporaria.
+_MIN_EVENTOS_INSERCAO_EM_MASSA = 20
+_TABELA_LOTE = "#AfastamentoLote"
+_COLUNA_SEQ_LOTE = "SeqLote"
+_TABELA_CHAVES_ESTADO = "#AfastamentoSyncChaves"
+# Chave de AfastamentoSyncEstado (sem DatabaseOrigem), com os tipos da tabela.
+_COLUNAS_CHAVE_ESTADO = {
+    "NumeroDaEmpresa": "INT",
+    "TipoDeColaborador": "SMALLINT",
+    "NumeroDeOrigemDoColaborador": "INT",
+    "DataDoAfastamento": "DATE",
+    "Situacao": "INT",
+}
+
 _COLUNAS_EVENTO_OBRIGATORIAS = (
     "NumeroDaEmpresa",
     "TipoDeColaborador",
@@ -45,7 +67,6 @@ class RepositorioAfastamento:
         self.engine = engine
         self.schema = _safe_identifier(schema, "Schema")
         self.table_name = _safe_identifier(table_name, "Tabela")
-        self._cache_colunas_tabela: dict[str, str] | None = None
 
     def garantir_estruturas_auxiliares(self) -> None:
         sql_estado = text(
@@ -108,6 +129,14 @@ class RepositorioAfastamento:
             conn.execute(sql_estado)
             conn.execute(sql_cursor)
             conn.execute(sql_coluna_descricao_situacao)
+        # Roda a cada ciclo: so invalida o cache de catalogo se a coluna
+        # DescricaoDaSituacao ainda nao constava nele (pode ter sido criada agora).
+        colunas = colunas_tabela(self.engine, self.schema, self.table_name)
+        if _normalize_key("DescricaoDaSituacao") not in {_normalize_key(c) for c in colunas}:
+            invalidar_metadados(self.engine, self.schema, self.table_name)
+
+    def aquecer_metadados(self) -> None:
+        aquecer_metadados(self.engine, self.schema, [self.table_name], checks=False)
 
     def carregar_cursor(self, database_origem: str) -> dict[str, Any]:
         with self.engine.connect() as conn:
@@ -236,56 +265,38 @@ class RepositorioAfastamento:
         if not keys:
             return {}
 
-        result: dict[tuple[int, int, int, date, int], bytes] = {}
-        chunk_size = 300  # 1 + (300 * 5) = 1501 parametros (abaixo do limite SQL Server 2100)
-
-        with self.engine.connect() as conn:
-            for start in range(0, len(keys), chunk_size):
-                chunk = keys[start:start + chunk_size]
-                params: dict[str, Any] = {"database_origem": database_origem}
-                conditions = []
-
-                for i, (numemp, tipcol, numcad, datafa, situacao) in enumerate(chunk):
-                    conditions.append(
-                        "("
-                        f"[NumeroDaEmpresa] = :e{i} "
-                        f"AND [TipoDeColaborador] = :t{i} "
-                        f"AND [NumeroDeOrigemDoColaborador] = :n{i} "
-                        f"AND [DataDoAfastamento] = :d{i} "
-                        f"AND [Situacao] = :s{i}"
-                        ")"
-                    )
-                    params[f"e{i}"] = numemp
-                    params[f"t{i}"] = tipcol
-                    params[f"n{i}"] = numcad
-                    params[f"d{i}"] = datafa
-                    params[f"s{i}"] = situacao
-
-                sql = text(
+        with self.engine.begin() as conn:
+            criar_keyset_temporario(conn, _TABELA_CHAVES_ESTADO, _COLUNAS_CHAVE_ESTADO, keys)
+            rows = conn.execute(
+                text(
                     f"""
                     SELECT
-                        [NumeroDaEmpresa],
-                        [TipoDeColaborador],
-                        [NumeroDeOrigemDoColaborador],
-                        [DataDoAfastamento],
-                        [Situacao],
-                        [HashPayload]
-                    FROM [{self.schema}].[AfastamentoSyncEstado]
-                    WHERE [DatabaseOrigem] = :database_origem
-                    AND ({' OR '.join(conditions)})
+                        e.[NumeroDaEmpresa],
+                        e.[TipoDeColaborador],
+                        e.[NumeroDeOrigemDoColaborador],
+                        e.[DataDoAfastamento],
+                        e.[Situacao],
+                        e.[HashPayload]
+                    FROM [{self.schema}].[AfastamentoSyncEstado] AS e
+                    INNER JOIN {_TABELA_CHAVES_ESTADO} AS k
+                        ON {" AND ".join(f"k.[{c}] = e.[{c}]" for c in _COLUNAS_CHAVE_ESTADO)}
+                    WHERE e.[DatabaseOrigem] = :database_origem
                     """
-                )
-                rows = conn.execute(sql, params).mappings().all()
-
-                for row in rows:
-                    key = (
-                        int(row["NumeroDaEmpresa"]),
-                        int(row["TipoDeColaborador"]),
-                        int(row["NumeroDeOrigemDoColaborador"]),
-                        row["DataDoAfastamento"],
-                        int(row["Situacao"]),
-                    )
-                    result[key] = row["HashPayload"]
+                ),
+                {"database_origem": database_origem},
+            ).mappings().all()
+            descartar_tabela_temporaria(conn, _TABELA_CHAVES_ESTADO)
+
+        result: dict[tuple[int, int, int, date, int], bytes] = {}
+        for row in rows:
+            key = (
+                int(row["NumeroDaEmpresa"]),
+                int(row["TipoDeColaborador"]),
+                int(row["NumeroDeOrigemDoColaborador"]),
+                row["DataDoAfastamento"],
+                int(row["Situacao"]),
+            )
+            result[key] = row["HashPayload"]
 
         return result
 
@@ -297,7 +308,28 @@ class RepositorioAfastamento:
         if not hashes:
             return
 
+        # Ultimo hash de cada chave vence, como no MERGE linha a linha; o MERGE
+        # unico nao aceita a mesma chave duas vezes na origem.
+        por_chave = {
+            (
+                int(item["numempresa"]),
+                int(item["tipocolaborador"]),
+                int(item["numorigem"]),
+                item["dataafastamento"],
+                int(item["situacao"]),
+            ): item["hash_payload"]
+            for item in hashes
+        }
+        colunas_chave = list(_COLUNAS_CHAVE_ESTADO)
+
         with self.engine.begin() as conn:
+            criar_keyset_temporario(
+                conn,
+                _TABELA_CHAVES_ESTADO,
+                {**_COLUNAS_CHAVE_ESTADO, "HashPayload": "VARBINARY(32)"},
+                [(*chave, hash_payload) for chave, hash_payload in por_chave.items()],
+                chave=colunas_chave,
+            )
             conn.execute(
                 text(
                     f"""
@@ -305,19 +337,12 @@ class RepositorioAfastamento:
                     USING (
                         SELECT
                             :database_origem AS [DatabaseOrigem],
-                            :numempresa AS [NumeroDaEmpresa],
-                            :tipocolaborador AS [TipoDeColaborador],
-                            :numorigem AS [NumeroDeOrigemDoColaborador],
-                            :dataafastamento AS [DataDoAfastamento],
-                            :situacao AS [Situacao],
-                            :hash_payload AS [HashPayload]
+                            {", ".join(f"k.[{c}]" for c in colunas_chave)},
+                            k.[HashPayload]
+                        FROM {_TABELA_CHAVES_ESTADO} AS k
                     ) AS source
                     ON target.[DatabaseOrigem] = source.[DatabaseOrigem]
-                    AND target.[NumeroDaEmpresa] = source.[NumeroDaEmpresa]
-                    AND target.[TipoDeColaborador] = source.[TipoDeColaborador]
-                    AND target.[NumeroDeOrigemDoColaborador] = source.[NumeroDeOrigemDoColaborador]
-                    AND target.[DataDoAfastamento] = source.[DataDoAfastamento]
-                    AND target.[Situacao] = source.[Situacao]
+                    AND {" AND ".join(f"target.[{c}] = source.[{c}]" for c in colunas_chave)}
                     WHEN MATCHED THEN
                         UPDATE SET
                             [HashPayload] = source.[HashPayload],
@@ -325,39 +350,21 @@ class RepositorioAfastamento:
                     WHEN NOT MATCHED THEN
                         INSERT (
                             [DatabaseOrigem],
-                            [NumeroDaEmpresa],
-                            [TipoDeColaborador],
-                            [NumeroDeOrigemDoColaborador],
-                            [DataDoAfastamento],
-                            [Situacao],
+                            {", ".join(f"[{c}]" for c in colunas_chave)},
                             [HashPayload],
                             [AtualizadoEm]
                         )
                         VALUES (
                             source.[DatabaseOrigem],
-                            source.[NumeroDaEmpresa],
-                            source.[TipoDeColaborador],
-                            source.[NumeroDeOrigemDoColaborador],
-                            source.[DataDoAfastamento],
-                            source.[Situacao],
+                            {", ".join(f"source.[{c}]" for c in colunas_chave)},
                             source.[HashPayload],
                             SYSUTCDATETIME()
                         );
                     """
                 ),
-                [
-                    {
-                        "database_origem": database_origem,
-                        "numempresa": int(item["numempresa"]),
-                        "tipocolaborador": int(item["tipocolaborador"]),
-                        "numorigem": int(item["numorigem"]),
-                        "dataafastamento": item["dataafastamento"],
-                        "situacao": int(item["situacao"]),
-                        "hash_payload": item["hash_payload"],
-                    }
-                    for item in hashes
-                ],
+                {"database_origem": database_origem},
             )
+            descartar_tabela_temporaria(conn, _TABELA_CHAVES_ESTADO)
 
     def inserir_eventos(self, eventos: list[dict[str, Any]]) -> int:
         if not eventos:
@@ -376,7 +383,17 @@ class RepositorioAfastamento:
         col_situacao = colunas[_normalize_key("Situacao")]
         col_hash = colunas[_normalize_key("HashPayload")]
         col_status = colunas[_normalize_key("Status")]
-
+        col_criado_em = colunas[_normalize_key("CriadoEm")]
+
+        where_identidade = [
+            f"t.[{col_numempresa}] = :check_numempresa",
+            f"t.[{col_tipocol}] = :check_tipocolaborador",
+            f"t.[{col_numorigem}] = :check_numorigem",
+            f"t.[{col_datafa}] = :check_dataafastamento",
+            f"t.[{col_situacao}] = :check_situacao",
+            f"t.[{col_hash}] = :check_hash_payload",
+            f"t.[{col_status}] IN ('PENDENTE', 'ERRO')",
+        ]
         sql = text(
             f"""
             INSERT INTO [{self.schema}].[{self.table_name}] ({", ".join(f"[{c}]" for c in cols_insert)})
@@ -384,53 +401,157 @@ class RepositorioAfastamento:
             WHERE NOT EXISTS (
                 SELECT 1
                 FROM [{self.schema}].[{self.table_name}] AS t
-                WHERE t.[{col_numempresa}] = :check_numempresa
-                AND t.[{col_tipocol}] = :check_tipocolaborador
-                AND t.[{col_numorigem}] = :check_numorigem
-                AND t.[{col_datafa}] = :check_dataafastamento
-                AND t.[{col_situacao}] = :check_situacao
-                AND t.[{col_hash}] = :check_hash_payload
-                AND t.[{col_status}] IN ('PENDENTE', 'ERRO')
+                WHERE {' AND '.join(where_identidade)}
             )
             """
         )
 
-        inseridos = 0
+        # Evento barrado pelo NOT EXISTS (mesmo hash ja na fila) e o estado mais
+        # recente do afastamento: se ha outro evento vivo mais novo da mesma
+        # chave, o existente ganha CriadoEm atual para sobreviver a supersessao
+        # (que mantem o CriadoEm mais recente por chave + Situacao).
+        cols_chave = [col_numempresa, col_tipocol, col_numorigem, col_datafa, col_situacao]
+        filtro_mais_novo = f"""
+            EXISTS (
+                SELECT 1
+                FROM [{self.schema}].[{self.table_name}] AS n
+                WHERE {' AND '.join(f"n.[{c}] = t.[{c}]" for c in cols_chave)}
+                AND n.[{col_status}] IN ('PENDENTE', 'ERRO')
+                AND n.[{col_criado_em}] > t.[{col_criado_em}]
+            )
+        """
+        sql_tocar = text(
+            f"""
+            UPDATE t
+            SET t.[{col_criado_em}] = SYSUTCDATETIME()
+            FROM [{self.schema}].[{self.table_name}] AS t
+            WHERE {' AND '.join(where_identidade)}
+            AND {filtro_mais_novo}
+            """
+        )
+
+        params_eventos = [self._montar_params_evento(mapping_colunas, evento) for evento in eventos]
         with self.engine.begin() as conn:
-            for evento in eventos:
-                params = self._montar_params_evento(mapping_colunas, evento)
-                try:
-                    result = conn.execute(sql, params)
-                    inseridos += int(result.rowcount or 0)
-                except IntegrityError as exc:
-                    if "UX_Afastamento_Idem" in str(exc):
-                        continue
+            if len(params_eventos) < _MIN_EVENTOS_INSERCAO_EM_MASSA:
+                return self._inserir_por_linha(conn, sql, sql_tocar, params_eventos)
+
+            self._preparar_lote_temporario(conn, mapping_colunas, params_eventos)
+            cols_identidade = [*cols_chave, col_hash]
+
+            # Repetidos dentro do lote: o loop inseria so o primeiro (os demais
+            # eram barrados pelo NOT EXISTS), entao o lote fica so com ele.
+            conn.execute(
+                text(
+                    f"""
+                    WITH ordenados AS (
+                        SELECT ROW_NUMBER() OVER (
+                            PARTITION BY {", ".join(f"[{c}]" for c in cols_identidade)}
+                            ORDER BY [{_COLUNA_SEQ_LOTE}]
+                        ) AS [ordem]
+                        FROM {_TABELA_LOTE}
+                    )
+                    DELETE FROM ordenados
+                    WHERE [ordem] > 1
+                    """
+                )
+            )
+
+            where_lote = [f"t.[{c}] = l.[{c}]" for c in cols_identidade]
+            where_lote.append(f"t.[{col_status}] IN ('PENDENTE', 'ERRO')")
+            sql_inserir_lote = text(
+                f"""
+                INSERT INTO [{self.schema}].[{self.table_name}] ({", ".join(f"[{c}]" for c in cols_insert)})
+                SELECT {", ".join(f"l.[{c}]" for c in cols_insert)}
+                FROM {_TABELA_LOTE} AS l
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM [{self.schema}].[{self.table_name}] AS t
+                    WHERE {' AND '.join(where_lote)}
+                )
+                """
+            )
+            sql_tocar_lote = text(
+                f"""
+                UPDATE t
+                SET t.[{col_criado_em}] = SYSUTCDATETIME()
+                FROM [{self.schema}].[{self.table_name}] AS t
+                INNER JOIN {_TABELA_LOTE} AS l
+                    ON {' AND '.join(where_lote)}
+                WHERE {filtro_mais_novo}
+                """
+            )
+
+            # Violacao do UX_Afastamento_Idem (corrida com outro produtor) derruba
+            # o INSERT inteiro: volta ao savepoint e refaz linha a linha.
+            savepoint = conn.begin_nested()
+            try:
+                conn.execute(sql_tocar_lote)
+                inseridos = int(conn.execute(sql_inserir_lote).rowcount or 0)
+                savepoint.commit()
+            except IntegrityError as exc:
+                if "UX_Afastamento_Idem" not in str(exc):
                     raise
+                savepoint.rollback()
+                inseridos = self._inserir_por_linha(conn, sql, sql_tocar, params_eventos)
 
+            descartar_tabela_temporaria(conn, _TABELA_LOTE)
         return inseridos
 
-    def _carregar_colunas_tabela(self) -> dict[str, str]:
-        if self._cache_colunas_tabela is not None:
-            return self._cache_colunas_tabela
+    @staticmethod
+    def _inserir_por_linha(
+        conn: Connection,
+        sql: TextClause,
+        sql_tocar: TextClause,
+        params_eventos: list[dict[str, Any]],
+    ) -> int:
+        inseridos = 0
+        for params in params_eventos:
+            try:
+                if int(conn.execute(sql_tocar, params).rowcount or 0) > 0:
+                    continue
+                result = conn.execute(sql, params)
+                inseridos += int(result.rowcount or 0)
+            except IntegrityError as exc:
+                if "UX_Afastamento_Idem" in str(exc):
+                    continue
+                raise
+        return inseridos
 
-        with self.engine.connect() as conn:
-            colunas = conn.execute(
-                text(
-                    """
-                    SELECT c.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.COLUMNS AS c
-                    WHERE c.TABLE_SCHEMA = :schema
-                    AND c.TABLE_NAME = :tabela
-                    """
-                ),
-                {"schema": self.schema, "tabela": self.table_name},
-            ).scalars().all()
+    def _preparar_lote_temporario(
+        self,
+        conn: Connection,
+        mapping_colunas: dict[str, str],
+        params_eventos: list[dict[str, Any]],
+    ) -> None:
+        # Mesmos tipos da fila via SELECT TOP (0) ... INTO; a carga usa
+        # fast_executemany (array binding do pyodbc) em um unico round-trip.
+        colunas = list(mapping_colunas)
+        descartar_tabela_temporaria(conn, _TABELA_LOTE)
+        conn.execute(
+            text(
+                f"""
+                SELECT TOP (0) CAST(0 AS INT) AS [{_COLUNA_SEQ_LOTE}], {", ".join(f"[{c}]" for c in colunas)}
+                INTO {_TABELA_LOTE}
+                FROM [{self.schema}].[{self.table_name}]
+                """
+            )
+        )
+        inserir_linhas_em_massa(
+            conn,
+            _TABELA_LOTE,
+            [_COLUNA_SEQ_LOTE, *colunas],
+            [
+                (seq, *(params[mapping_colunas[c]] for c in colunas))
+                for seq, params in enumerate(params_eventos)
+            ],
+        )
 
+    def _carregar_colunas_tabela(self) -> dict[str, str]:
+        colunas = colunas_tabela(self.engine, self.schema, self.table_name)
         if not colunas:
             raise ValueError(f"Tabela nao encontrada: [{self.schema}].[{self.table_name}]")
 
-        self._cache_colunas_tabela = {_normalize_key(c): c for c in colunas}
-        return self._cache_colunas_tabela
+        return {_normalize_key(c): c for c in colunas}
 
     @staticmethod
     def _validar_colunas_obrigatorias(colunas: dict[str, str]) -> None:
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+_MAX_COMANDOS = 512
+
+
+def tamanho_padronizado(quantidade: int, maximo: int) -> int:
+    # Menor potencia de 2 >= quantidade, limitada a `maximo`: comandos com
+    # VALUES/IN de tamanho variavel ficam com poucas variantes em cache (o
+    # bloco e completado repetindo a ultima linha, sem efeito no resultado).
+    maximo = max(1, int(maximo))
+    tamanho = 1
+    while tamanho < quantidade and tamanho < maximo:
+        tamanho *= 2
+    return min(tamanho, maximo)
+
+
+class CacheComandosSql:
+    # Comandos montados dinamicamente (nomes de coluna resolvidos no catalogo)
+    # sao construidos uma vez por (operacao, tabela, colunas resolvidas) e o
+    # mesmo TextClause e reutilizado: o SQLAlchemy reaproveita a compilacao e
+    # o SQL Server recebe sempre o mesmo texto (mesmo plano em cache).
+    def __init__(self, *, max_comandos: int = _MAX_COMANDOS) -> None:
+        self.max_comandos = max(1, int(max_comandos))
+        self._lock = Lock()
+        self._comandos: dict[Hashable, TextClause] = {}
+        self.acertos = 0
+        self.construidos = 0
+
+    def obter(self, chave: Hashable, montar: Callable[[], str]) -> TextClause:
+        with self._lock:
+            comando = self._comandos.get(chave)
+            if comando is not None:
+                self.acertos += 1
+                return comando
+
+        comando = text(montar())
+        with self._lock:
+            self.construidos += 1
+            if len(self._comandos) >= self.max_comandos:
+                # Descarta o mais antigo; chaves novas so surgem com mudanca de
+                # schema ou de de-para, entao o limite quase nunca e atingido.
+                self._comandos.pop(next(iter(self._comandos)))
+            self._comandos.setdefault(chave, comando)
+            return self._comandos[chave]
+
+    def estatisticas(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "comandos": len(self._comandos),
+                "acertos": self.acertos,
+                "construidos": self.construidos,
+            }
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._comandos.clear()
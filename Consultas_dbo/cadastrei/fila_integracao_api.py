@@ -1,15 +1,37 @@
 from __future__ import annotations
 
 import re
+import time
 from datetime import datetime
+from threading import Lock
 from typing import Any
 
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
 
+from Consultas_dbo.cadastrei.comandos_sql import CacheComandosSql, tamanho_padronizado
+from Consultas_dbo.metadados import aquecer_metadados, colunas_tabela, definicoes_check
+
 _IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 _CHECK_LITERAL_RE = re.compile(r"N?'([^']+)'", re.IGNORECASE)
+# Limite de parametros por comando do SQL Server e 2100; margem para os fixos.
+_MAX_PARAMETROS_COMANDO = 2000
+_MAX_LINHAS_VALUES = 1000
+# Status terminal de eventos com falha permanente (payload/regra de negocio).
+_STATUS_REJEITADO = "REJEITADO"
+# Status terminal de eventos substituidos por um mais novo da mesma chave.
+_STATUS_SUPERSEDIDO = "SUPERSEDIDO"
+
+# EmpresaDict/SindicatoDict sao pequenas e quase estaticas: ficam em memoria
+# no processo, compartilhadas entre repositorios do mesmo banco.
+_CACHE_PESSOA_JURIDICA: dict[tuple[str, str, str], dict[str, Any]] = {}
+_CACHE_PESSOA_JURIDICA_LOCK = Lock()
+
+# Comandos das operacoes quentes da fila (captura, marcacao, liberacao e
+# renovacao de locks, supersessao, busca de colunas), compartilhados por todos
+# os repositorios. Comandos em bloco usam tamanhos padronizados de VALUES/IN.
+_CACHE_COMANDOS = CacheComandosSql()
 
 
 def _safe_identifier(value: str, label: str) -> str:
@@ -31,15 +53,15 @@ class RepositorioFilaIntegracaoApi:
         schema: str = "dbo",
         tabela_motorista: str = "MotoristaCadastro",
         tabela_afastamento: str = "Afastamento",
+        cache_dict_ttl_seconds: int = 300,
     ) -> None:
         self.engine = engine
         self.schema = _safe_identifier(schema, "Schema")
         self.tabela_motorista = _safe_identifier(tabela_motorista, "Tabela de motoristas")
         self.tabela_afastamento = _safe_identifier(tabela_afastamento, "Tabela de afastamentos")
-        self._cache_colunas: dict[str, dict[str, str]] = {}
-        self._cache_status_sucesso: dict[str, list[str]] = {}
         self._cache_tabela_empresa_dict: dict[str, str] | None = None
         self._cache_tabela_sindicato_dict: dict[str, str] | None = None
+        self.cache_dict_ttl_seconds = max(0, int(cache_dict_ttl_seconds))
 
     def liberar_locks_expirados(self, lock_timeout_minutes: int = 15) -> dict[str, int]:
         return {
@@ -65,6 +87,31 @@ class RepositorioFilaIntegracaoApi:
             lock_timeout_minutes=lock_timeout_minutes,
         )
 
+    def renovar_locks_motoristas(self, lock_ids: list[str]) -> int:
+        return self._renovar_locks_tabela(self.tabela_motorista, lock_ids)
+
+    def renovar_locks_afastamentos(self, lock_ids: list[str]) -> int:
+        return self._renovar_locks_tabela(self.tabela_afastamento, lock_ids)
+
+    def supersedir_motoristas_pendentes(self) -> int:
+        return self._supersedir_eventos_tabela(
+            self.tabela_motorista,
+            chave_columns={"id_de_origem": "IdDeOrigem"},
+            optional_chave_columns={"numemp": "NumEmp"},
+        )
+
+    def supersedir_afastamentos_pendentes(self) -> int:
+        return self._supersedir_eventos_tabela(
+            self.tabela_afastamento,
+            chave_columns={
+                "numempresa": "NumeroDaEmpresa",
+                "tipocolaborador": "TipoDeColaborador",
+                "numorigem": "NumeroDeOrigemDoColaborador",
+                "dataafastamento": "DataDoAfastamento",
+                "situacao": "Situacao",
+            },
+        )
+
     def capturar_motoristas_pendentes(
         self,
         *,
@@ -72,6 +119,7 @@ class RepositorioFilaIntegracaoApi:
         batch_size: int,
         max_tentativas: int,
         lock_timeout_minutes: int,
+        colunas_extras: list[str] | None = None,
     ) -> list[dict[str, Any]]:
         return self._capturar_lote(
             table_name=self.tabela_motorista,
@@ -79,6 +127,7 @@ class RepositorioFilaIntegracaoApi:
             batch_size=batch_size,
             max_tentativas=max_tentativas,
             lock_timeout_minutes=lock_timeout_minutes,
+            colunas_extras=colunas_extras,
             key_columns={
                 "id_de_origem": "IdDeOrigem",
                 "evento_tipo": "EventoTipo",
@@ -98,6 +147,7 @@ class RepositorioFilaIntegracaoApi:
         batch_size: int,
         max_tentativas: int,
         lock_timeout_minutes: int,
+        colunas_extras: list[str] | None = None,
     ) -> list[dict[str, Any]]:
         return self._capturar_lote(
             table_name=self.tabela_afastamento,
@@ -105,6 +155,7 @@ class RepositorioFilaIntegracaoApi:
             batch_size=batch_size,
             max_tentativas=max_tentativas,
             lock_timeout_minutes=lock_timeout_minutes,
+            colunas_extras=colunas_extras,
             key_columns={
                 "numempresa": "NumeroDaEmpresa",
                 "tipocolaborador": "TipoDeColaborador",
@@ -186,9 +237,62 @@ class RepositorioFilaIntegracaoApi:
         if not resolved:
             return None
 
-        where_parts = [
-            f"t.[{resolved['codigo']}] = :codigo",
-        ]
+        # Codigos ausentes tambem ficam "em cache": a tabela inteira esta carregada.
+        registros = self._registros_pessoa_juridica(table_name, resolved)
+        found = registros.get(int(codigo_empresa))
+        return dict(found) if found else None
+
+    def precarregar_pessoas_juridicas(self) -> None:
+        for table_name, resolved in (
+            ("EmpresaDict", self._resolver_colunas_empresa_dict()),
+            ("SindicatoDict", self._resolver_colunas_sindicato_dict()),
+        ):
+            if resolved:
+                self._registros_pessoa_juridica(table_name, resolved)
+
+    def _registros_pessoa_juridica(self, table_name: str, resolved: dict[str, str]) -> dict[int, dict[str, Any]]:
+        chave = (str(self.engine.url), self.schema, table_name)
+        ttl = self.cache_dict_ttl_seconds
+
+        with _CACHE_PESSOA_JURIDICA_LOCK:
+            entry = _CACHE_PESSOA_JURIDICA.get(chave)
+            agora = time.monotonic()
+            if entry is not None and agora - entry["carregado_em"] < ttl:
+                return entry["registros"]
+
+            # Vencido o TTL, a marca (total, MAX(AtualizadoEm)) decide se e
+            # preciso recarregar; sem AtualizadoEm a recarga e sempre completa.
+            marca = self._marca_pessoa_juridica(table_name, resolved)
+            if entry is not None and marca is not None and marca == entry["marca"]:
+                entry["carregado_em"] = agora
+                return entry["registros"]
+
+            registros = self._carregar_pessoas_juridicas(table_name, resolved)
+            _CACHE_PESSOA_JURIDICA[chave] = {
+                "registros": registros,
+                "marca": marca,
+                "carregado_em": agora,
+            }
+            return registros
+
+    def _marca_pessoa_juridica(self, table_name: str, resolved: dict[str, str]) -> tuple[Any, Any] | None:
+        if "atualizado_em" not in resolved:
+            return None
+
+        sql = text(
+            f"""
+            SELECT COUNT(1) AS total, MAX(t.[{resolved['atualizado_em']}]) AS maximo
+            FROM [{self.schema}].[{table_name}] AS t
+            """
+        )
+        with self.engine.connect() as conn:
+            row = conn.execute(sql).mappings().first()
+        if not row:
+            return None
+        return (row.get("total"), row.get("maximo"))
+
+    def _carregar_pessoas_juridicas(self, table_name: str, resolved: dict[str, str]) -> dict[int, dict[str, Any]]:
+        where_parts = ["1 = 1"]
         if "ativo" in resolved:
             where_parts.append(f"ISNULL(t.[{resolved['ativo']}], 1) = 1")
 
@@ -208,13 +312,9 @@ class RepositorioFilaIntegracaoApi:
             order_parts.append(f"t.[{resolved['atualizado_em']}] DESC")
         order_parts.append(f"t.[{resolved['codigo']}] ASC")
 
-        params: dict[str, Any] = {
-            "codigo": int(codigo_empresa),
-        }
-
         sql = text(
             f"""
-            SELECT TOP 1
+            SELECT
                 {', '.join(select_parts)}
             FROM [{self.schema}].[{table_name}] AS t
             WHERE {' AND '.join(where_parts)}
@@ -223,11 +323,20 @@ class RepositorioFilaIntegracaoApi:
         )
 
         with self.engine.connect() as conn:
-            row = conn.execute(sql, params).mappings().first()
-        if not row:
-            return None
-        return dict(row)
+            rows = conn.execute(sql).mappings().all()
+
+        # Mesma regra do antigo SELECT TOP 1: vale o registro mais recente do codigo.
+        registros: dict[int, dict[str, Any]] = {}
+        for row in rows:
+            try:
+                codigo = int(row.get("codigo_pessoa"))
+            except (TypeError, ValueError):
+                continue
+            registros.setdefault(codigo, dict(row))
+        return registros
 
+    # Marcacao de um evento so: mesmo comando (e mesmo fallback de CHECK de
+    # status) de marcar_resultados_em_lote.
     def marcar_motorista_sucesso(
         self,
         *,
@@ -236,23 +345,13 @@ class RepositorioFilaIntegracaoApi:
         http_status: int | None,
         resposta_resumo: str | None,
     ) -> bool:
-        return self._marcar_resultado(
-            table_name=self.tabela_motorista,
-            lock_id=lock_id,
-            evento=evento,
-            sucesso=True,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=None,
-            proxima_tentativa=None,
-            key_columns={
-                "id_de_origem": "IdDeOrigem",
-                "evento_tipo": "EventoTipo",
-                "versao_payload": "VersaoPayload",
-                "hash_payload": "HashPayload",
-            },
-            optional_key_columns={"numemp": "NumEmp"},
-        )
+        resultado = {
+            "evento": evento,
+            "sucesso": True,
+            "http_status": http_status,
+            "resposta_resumo": resposta_resumo,
+        }
+        return self.marcar_motoristas_em_lote(lock_id=lock_id, resultados=[resultado])[0]
 
     def marcar_motorista_erro(
         self,
@@ -264,23 +363,15 @@ class RepositorioFilaIntegracaoApi:
         ultimo_erro: str,
         proxima_tentativa: datetime | None,
     ) -> bool:
-        return self._marcar_resultado(
-            table_name=self.tabela_motorista,
-            lock_id=lock_id,
-            evento=evento,
-            sucesso=False,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=ultimo_erro,
-            proxima_tentativa=proxima_tentativa,
-            key_columns={
-                "id_de_origem": "IdDeOrigem",
-                "evento_tipo": "EventoTipo",
-                "versao_payload": "VersaoPayload",
-                "hash_payload": "HashPayload",
-            },
-            optional_key_columns={"numemp": "NumEmp"},
-        )
+        resultado = {
+            "evento": evento,
+            "sucesso": False,
+            "http_status": http_status,
+            "resposta_resumo": resposta_resumo,
+            "ultimo_erro": ultimo_erro,
+            "proxima_tentativa": proxima_tentativa,
+        }
+        return self.marcar_motoristas_em_lote(lock_id=lock_id, resultados=[resultado])[0]
 
     def marcar_afastamento_sucesso(
         self,
@@ -290,26 +381,13 @@ class RepositorioFilaIntegracaoApi:
         http_status: int | None,
         resposta_resumo: str | None,
     ) -> bool:
-        return self._marcar_resultado(
-            table_name=self.tabela_afastamento,
-            lock_id=lock_id,
-            evento=evento,
-            sucesso=True,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=None,
-            proxima_tentativa=None,
-            key_columns={
-                "numempresa": "NumeroDaEmpresa",
-                "tipocolaborador": "TipoDeColaborador",
-                "numorigem": "NumeroDeOrigemDoColaborador",
-                "dataafastamento": "DataDoAfastamento",
-                "situacao": "Situacao",
-                "evento_tipo": "EventoTipo",
-                "versao_payload": "VersaoPayload",
-                "hash_payload": "HashPayload",
-            },
-        )
+        resultado = {
+            "evento": evento,
+            "sucesso": True,
+            "http_status": http_status,
+            "resposta_resumo": resposta_resumo,
+        }
+        return self.marcar_afastamentos_em_lote(lock_id=lock_id, resultados=[resultado])[0]
 
     def marcar_afastamento_erro(
         self,
@@ -321,26 +399,343 @@ class RepositorioFilaIntegracaoApi:
         ultimo_erro: str,
         proxima_tentativa: datetime | None,
     ) -> bool:
-        return self._marcar_resultado(
-            table_name=self.tabela_afastamento,
-            lock_id=lock_id,
-            evento=evento,
-            sucesso=False,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=ultimo_erro,
-            proxima_tentativa=proxima_tentativa,
-            key_columns={
-                "numempresa": "NumeroDaEmpresa",
-                "tipocolaborador": "TipoDeColaborador",
-                "numorigem": "NumeroDeOrigemDoColaborador",
-                "dataafastamento": "DataDoAfastamento",
-                "situacao": "Situacao",
-                "evento_tipo": "EventoTipo",
-                "versao_payload": "VersaoPayload",
-                "hash_payload": "HashPayload",
+        resultado = {
+            "evento": evento,
+            "sucesso": False,
+            "http_status": http_status,
+            "resposta_resumo": resposta_resumo,
+            "ultimo_erro": ultimo_erro,
+            "proxima_tentativa": proxima_tentativa,
+        }
+        return self.marcar_afastamentos_em_lote(lock_id=lock_id, resultados=[resultado])[0]
+
+    def marcar_motoristas_em_lote(self, *, lock_id: str, resultados: list[dict[str, Any]]) -> list[bool]:
+        return self.marcar_resultados_em_lote(self.tabela_motorista, lock_id, resultados)
+
+    def marcar_afastamentos_em_lote(self, *, lock_id: str, resultados: list[dict[str, Any]]) -> list[bool]:
+        return self.marcar_resultados_em_lote(self.tabela_afastamento, lock_id, resultados)
+
+    def marcar_resultados_em_lote(
+        self,
+        table_name: str,
+        lock_id: str,
+        resultados: list[dict[str, Any]],
+    ) -> list[bool]:
+        # Cada item traz evento, sucesso, http_status, resposta_resumo, ultimo_erro e
+        # proxima_tentativa (e, para falhas permanentes, permanente/tentativas_limite).
+        # O retorno segue a ordem de `resultados` e indica se a linha do evento
+        # (ainda presa ao lock_id) foi atualizada.
+        if not resultados:
+            return []
+
+        key_columns, optional_key_columns = self._colunas_chave_fila(table_name)
+
+        resolved = self._resolver_colunas(
+            table_name,
+            required_columns={
+                **key_columns,
+                "status": "Status",
+                "tentativas": "Tentativas",
+                "lock_id": "LockId",
+                "lock_em": "LockEm",
+            },
+            optional_columns={
+                **optional_key_columns,
+                "http_status": "HttpStatus",
+                "resposta_resumo": "RespostaResumo",
+                "ultimo_erro": "UltimoErro",
+                "proxima_tentativa_em": "ProximaTentativaEm",
+                "processado_em": "ProcessadoEm",
+                "atualizado_em": "AtualizadoEm",
+            },
+        )
+        key_aliases = [
+            alias
+            for alias in list(key_columns.keys()) + list(optional_key_columns.keys())
+            if alias in resolved
+        ]
+
+        # Colunas do VALUES: os dados do resultado recebem CAST explicito para o
+        # driver conseguir tipar parametros NULL; as chaves seguem o tipo da tabela.
+        value_columns: list[tuple[str, str | None]] = [
+            ("idx", "INT"),
+            ("sucesso", "BIT"),
+            ("rejeitado", "BIT"),
+            ("tentativas_limite", "INT"),
+            ("http_status", "INT"),
+            ("resposta_resumo", "NVARCHAR(4000)"),
+            ("ultimo_erro", "NVARCHAR(4000)"),
+            ("proxima_tentativa", "DATETIME2"),
+        ] + [(f"k_{alias}", None) for alias in key_aliases]
+
+        tentativas_col = resolved["tentativas"]
+        rejeitado_permitido = self._status_permitido(table_name, _STATUS_REJEITADO)
+        linhas_por_comando = max(
+            1,
+            min(_MAX_LINHAS_VALUES, _MAX_PARAMETROS_COMANDO // len(value_columns)),
+        )
+
+        def _montar(tamanho: int) -> str:
+            if rejeitado_permitido:
+                status_expr = (
+                    f"CASE WHEN v.[sucesso] = 1 THEN :status_sucesso "
+                    f"WHEN v.[rejeitado] = 1 THEN '{_STATUS_REJEITADO}' ELSE 'ERRO' END"
+                )
+                tentativas_expr = f"ISNULL(t.[{tentativas_col}], 0) + 1"
+            else:
+                # CHECK de status sem REJEITADO: a falha permanente fica como ERRO com
+                # Tentativas no limite, o que ja a tira da captura.
+                status_expr = "CASE WHEN v.[sucesso] = 1 THEN :status_sucesso ELSE 'ERRO' END"
+                tentativas_expr = (
+                    f"CASE WHEN v.[rejeitado] = 1 THEN v.[tentativas_limite] "
+                    f"ELSE ISNULL(t.[{tentativas_col}], 0) + 1 END"
+                )
+
+            set_parts = [
+                f"t.[{resolved['status']}] = {status_expr}",
+                f"t.[{tentativas_col}] = {tentativas_expr}",
+                f"t.[{resolved['lock_id']}] = NULL",
+                f"t.[{resolved['lock_em']}] = NULL",
+            ]
+            if "http_status" in resolved:
+                set_parts.append(f"t.[{resolved['http_status']}] = v.[http_status]")
+            if "resposta_resumo" in resolved:
+                set_parts.append(f"t.[{resolved['resposta_resumo']}] = v.[resposta_resumo]")
+            if "ultimo_erro" in resolved:
+                set_parts.append(f"t.[{resolved['ultimo_erro']}] = v.[ultimo_erro]")
+            if "proxima_tentativa_em" in resolved:
+                set_parts.append(f"t.[{resolved['proxima_tentativa_em']}] = v.[proxima_tentativa]")
+            if "processado_em" in resolved:
+                set_parts.append(
+                    f"t.[{resolved['processado_em']}] = "
+                    "CASE WHEN v.[sucesso] = 1 THEN SYSUTCDATETIME() ELSE NULL END"
+                )
+            if "atualizado_em" in resolved:
+                set_parts.append(f"t.[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
+
+            join_parts = [f"t.[{resolved[alias]}] = v.[k_{alias}]" for alias in key_aliases]
+            return f"""
+                UPDATE t
+                SET {', '.join(set_parts)}
+                OUTPUT v.[idx]
+                FROM [{self.schema}].[{table_name}] AS t
+                INNER JOIN (
+                    VALUES {self._linhas_values(value_columns, tamanho)}
+                ) AS v ({', '.join(f'[{column}]' for column, _ in value_columns)})
+                    ON {' AND '.join(join_parts)}
+                WHERE t.[{resolved['lock_id']}] = :lock_id
+                """
+
+        status_candidates = self._status_sucesso_candidates(table_name)
+        aplicados = [False] * len(resultados)
+
+        for inicio in range(0, len(resultados), linhas_por_comando):
+            bloco = resultados[inicio:inicio + linhas_por_comando]
+            linhas: list[dict[str, Any]] = []
+            for offset, item in enumerate(bloco):
+                evento = item.get("evento") or {}
+                sucesso = bool(item.get("sucesso"))
+                rejeitado = not sucesso and bool(item.get("permanente"))
+                row_values = {
+                    "idx": inicio + offset,
+                    "sucesso": 1 if sucesso else 0,
+                    "rejeitado": 1 if rejeitado else 0,
+                    "tentativas_limite": item.get("tentativas_limite") if rejeitado else None,
+                    "http_status": item.get("http_status"),
+                    "resposta_resumo": item.get("resposta_resumo"),
+                    "ultimo_erro": None if sucesso else item.get("ultimo_erro"),
+                    "proxima_tentativa": None if sucesso else item.get("proxima_tentativa"),
+                }
+                for alias in key_aliases:
+                    row_values[f"k_{alias}"] = evento.get(alias)
+                linhas.append(row_values)
+
+            tamanho = tamanho_padronizado(len(linhas), linhas_por_comando)
+            sql = _CACHE_COMANDOS.obter(
+                (
+                    "marcar_resultados_em_lote",
+                    self.schema,
+                    table_name,
+                    tuple(resolved.items()),
+                    rejeitado_permitido,
+                    tamanho,
+                ),
+                lambda: _montar(tamanho),
+            )
+            params = self._params_values(value_columns, linhas, tamanho)
+            params["lock_id"] = lock_id
+
+            tem_sucesso = any(bool(item.get("sucesso")) for item in bloco)
+            candidatos = status_candidates if tem_sucesso else status_candidates[:1]
+            last_exc: Exception | None = None
+            for status_value in candidatos:
+                params["status_sucesso"] = status_value
+                try:
+                    with self.engine.begin() as conn:
+                        indices = conn.execute(sql, params).scalars().all()
+                    last_exc = None
+                    break
+                except IntegrityError as exc:
+                    # Alguns ambientes usam CHECK de status diferente
+                    # (ex.: ENVIADO no lugar de PROCESSADO).
+                    if not tem_sucesso or not self._is_status_constraint_error(exc):
+                        raise
+                    last_exc = exc
+                    continue
+            if last_exc is not None:
+                raise last_exc
+
+            for idx in indices:
+                aplicados[int(idx)] = True
+
+        return aplicados
+
+    def liberar_motoristas_em_lote(self, *, lock_id: str, eventos: list[dict[str, Any]]) -> int:
+        return self.liberar_eventos_em_lote(self.tabela_motorista, lock_id, eventos)
+
+    def liberar_afastamentos_em_lote(self, *, lock_id: str, eventos: list[dict[str, Any]]) -> int:
+        return self.liberar_eventos_em_lote(self.tabela_afastamento, lock_id, eventos)
+
+    def liberar_eventos_em_lote(
+        self,
+        table_name: str,
+        lock_id: str,
+        eventos: list[dict[str, Any]],
+    ) -> int:
+        # Devolve eventos capturados e nao enviados ao status anterior a captura,
+        # sem consumir tentativa (ex.: API fora do ar com disjuntor aberto).
+        if not eventos:
+            return 0
+
+        key_columns, optional_key_columns = self._colunas_chave_fila(table_name)
+        resolved = self._resolver_colunas(
+            table_name,
+            required_columns={
+                **key_columns,
+                "status": "Status",
+                "lock_id": "LockId",
+                "lock_em": "LockEm",
+            },
+            optional_columns={
+                **optional_key_columns,
+                "atualizado_em": "AtualizadoEm",
             },
         )
+        key_aliases = [
+            alias
+            for alias in list(key_columns.keys()) + list(optional_key_columns.keys())
+            if alias in resolved
+        ]
+        value_columns: list[tuple[str, str | None]] = [("status_anterior", "NVARCHAR(30)")] + [
+            (f"k_{alias}", None) for alias in key_aliases
+        ]
+
+        linhas_por_comando = max(
+            1,
+            min(_MAX_LINHAS_VALUES, _MAX_PARAMETROS_COMANDO // len(value_columns)),
+        )
+
+        def _montar(tamanho: int) -> str:
+            set_parts = [
+                f"t.[{resolved['status']}] = ISNULL(v.[status_anterior], 'PENDENTE')",
+                f"t.[{resolved['lock_id']}] = NULL",
+                f"t.[{resolved['lock_em']}] = NULL",
+            ]
+            if "atualizado_em" in resolved:
+                set_parts.append(f"t.[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
+            join_parts = [f"t.[{resolved[alias]}] = v.[k_{alias}]" for alias in key_aliases]
+            return f"""
+                UPDATE t
+                SET {', '.join(set_parts)}
+                FROM [{self.schema}].[{table_name}] AS t
+                INNER JOIN (
+                    VALUES {self._linhas_values(value_columns, tamanho)}
+                ) AS v ({', '.join(f'[{column}]' for column, _ in value_columns)})
+                    ON {' AND '.join(join_parts)}
+                WHERE t.[{resolved['lock_id']}] = :lock_id
+                """
+
+        liberados = 0
+        for inicio in range(0, len(eventos), linhas_por_comando):
+            bloco = eventos[inicio:inicio + linhas_por_comando]
+            linhas: list[dict[str, Any]] = []
+            for evento in bloco:
+                status_anterior = str(evento.get("status_anterior") or "").strip().upper()
+                row_values = {
+                    "status_anterior": status_anterior if status_anterior in {"PENDENTE", "ERRO"} else None,
+                }
+                for alias in key_aliases:
+                    row_values[f"k_{alias}"] = evento.get(alias)
+                linhas.append(row_values)
+
+            tamanho = tamanho_padronizado(len(linhas), linhas_por_comando)
+            sql = _CACHE_COMANDOS.obter(
+                ("liberar_eventos_em_lote", self.schema, table_name, tuple(resolved.items()), tamanho),
+                lambda: _montar(tamanho),
+            )
+            params = self._params_values(value_columns, linhas, tamanho)
+            params["lock_id"] = lock_id
+            with self.engine.begin() as conn:
+                result = conn.execute(sql, params)
+                liberados += int(result.rowcount or 0)
+
+        return liberados
+
+    @staticmethod
+    def _linhas_values(value_columns: list[tuple[str, str | None]], tamanho: int) -> str:
+        # Parametros nomeados pela posicao no bloco (nao pelo indice global): o
+        # texto do comando depende so do tamanho e pode ficar em cache. Dados
+        # recebem CAST explicito para o driver tipar parametros NULL.
+        rows_sql: list[str] = []
+        for pos in range(tamanho):
+            placeholders = [
+                f"CAST(:{column}_{pos} AS {sql_type})" if sql_type else f":{column}_{pos}"
+                for column, sql_type in value_columns
+            ]
+            rows_sql.append(f"({', '.join(placeholders)})")
+        return ", ".join(rows_sql)
+
+    @staticmethod
+    def _params_values(
+        value_columns: list[tuple[str, str | None]],
+        linhas: list[dict[str, Any]],
+        tamanho: int,
+    ) -> dict[str, Any]:
+        # Completa o bloco ate `tamanho` repetindo a ultima linha: o JOIN casa a
+        # mesma linha da fila de novo, sem alterar o resultado do UPDATE.
+        params: dict[str, Any] = {}
+        for pos in range(tamanho):
+            row_values = linhas[min(pos, len(linhas) - 1)]
+            for column, _ in value_columns:
+                params[f"{column}_{pos}"] = row_values[column]
+        return params
+
+    def _colunas_chave_fila(self, table_name: str) -> tuple[dict[str, str], dict[str, str]]:
+        if table_name == self.tabela_motorista:
+            return (
+                {
+                    "id_de_origem": "IdDeOrigem",
+                    "evento_tipo": "EventoTipo",
+                    "versao_payload": "VersaoPayload",
+                    "hash_payload": "HashPayload",
+                },
+                {"numemp": "NumEmp"},
+            )
+        if table_name == self.tabela_afastamento:
+            return (
+                {
+                    "numempresa": "NumeroDaEmpresa",
+                    "tipocolaborador": "TipoDeColaborador",
+                    "numorigem": "NumeroDeOrigemDoColaborador",
+                    "dataafastamento": "DataDoAfastamento",
+                    "situacao": "Situacao",
+                    "evento_tipo": "EventoTipo",
+                    "versao_payload": "VersaoPayload",
+                    "hash_payload": "HashPayload",
+                },
+                {},
+            )
+        raise ValueError(f"Tabela sem fila de integracao configurada: {table_name!r}")
 
     def _buscar_colunas_evento(
         self,
@@ -351,18 +746,7 @@ class RepositorioFilaIntegracaoApi:
         key_columns: dict[str, str],
         optional_key_columns: dict[str, str] | None = None,
     ) -> dict[str, Any]:
-        cleaned_columns: list[str] = []
-        seen_columns: set[str] = set()
-        for column_name in requested_columns:
-            logical = str(column_name or "").strip()
-            if not logical:
-                continue
-            norm = _normalize_key(logical)
-            if not norm or norm in seen_columns:
-                continue
-            seen_columns.add(norm)
-            cleaned_columns.append(logical)
-
+        cleaned_columns = self._limpar_colunas_solicitadas(requested_columns)
         if not cleaned_columns:
             return {}
 
@@ -373,42 +757,57 @@ class RepositorioFilaIntegracaoApi:
             optional_columns={**(optional_key_columns or {}), **requested_aliases},
         )
 
-        select_parts: list[str] = []
-        for alias in requested_aliases.keys():
-            if alias in resolved:
-                select_parts.append(f"t.[{resolved[alias]}] AS [{alias}]")
-            else:
-                select_parts.append(f"NULL AS [{alias}]")
-        where_parts: list[str] = []
-        params: dict[str, Any] = {}
+        # O texto do WHERE depende de quais chaves vieram nulas no evento.
+        chaves_nulas = tuple(alias for alias in key_columns.keys() if evento.get(alias) is None)
+        chaves_opcionais = tuple(
+            alias
+            for alias in (optional_key_columns or {}).keys()
+            if alias in resolved and evento.get(alias) is not None
+        )
+        params: dict[str, Any] = {
+            alias: evento.get(alias)
+            for alias in (*key_columns.keys(), *chaves_opcionais)
+            if alias not in chaves_nulas
+        }
+        if not key_columns and not chaves_opcionais:
+            return {}
 
-        for alias in key_columns.keys():
-            value = evento.get(alias)
-            if value is None:
-                where_parts.append(f"t.[{resolved[alias]}] IS NULL")
-            else:
+        def _montar() -> str:
+            select_parts: list[str] = []
+            for alias in requested_aliases.keys():
+                if alias in resolved:
+                    select_parts.append(f"t.[{resolved[alias]}] AS [{alias}]")
+                else:
+                    select_parts.append(f"NULL AS [{alias}]")
+
+            where_parts: list[str] = []
+            for alias in key_columns.keys():
+                if alias in chaves_nulas:
+                    where_parts.append(f"t.[{resolved[alias]}] IS NULL")
+                else:
+                    where_parts.append(f"t.[{resolved[alias]}] = :{alias}")
+            for alias in chaves_opcionais:
                 where_parts.append(f"t.[{resolved[alias]}] = :{alias}")
-                params[alias] = value
-
-        for alias in (optional_key_columns or {}).keys():
-            if alias not in resolved:
-                continue
-            value = evento.get(alias)
-            if value is None:
-                continue
-            where_parts.append(f"t.[{resolved[alias]}] = :{alias}")
-            params[alias] = value
 
-        if not where_parts:
-            return {}
-
-        sql = text(
-            f"""
+            return f"""
             SELECT TOP 1
                 {', '.join(select_parts)}
             FROM [{self.schema}].[{table_name}] AS t
             WHERE {' AND '.join(where_parts)}
             """
+
+        sql = _CACHE_COMANDOS.obter(
+            (
+                "buscar_colunas_evento",
+                self.schema,
+                table_name,
+                tuple(resolved.items()),
+                tuple(requested_aliases),
+                tuple(key_columns),
+                chaves_nulas,
+                chaves_opcionais,
+            ),
+            _montar,
         )
 
         with self.engine.connect() as conn:
@@ -422,6 +821,21 @@ class RepositorioFilaIntegracaoApi:
             for alias_name, logical_name in requested_aliases.items()
         }
 
+    @staticmethod
+    def _limpar_colunas_solicitadas(requested_columns: list[str] | None) -> list[str]:
+        cleaned_columns: list[str] = []
+        seen_columns: set[str] = set()
+        for column_name in requested_columns or []:
+            logical = str(column_name or "").strip()
+            if not logical:
+                continue
+            norm = _normalize_key(logical)
+            if not norm or norm in seen_columns:
+                continue
+            seen_columns.add(norm)
+            cleaned_columns.append(logical)
+        return cleaned_columns
+
     def _capturar_lote(
         self,
         *,
@@ -432,7 +846,14 @@ class RepositorioFilaIntegracaoApi:
         lock_timeout_minutes: int,
         key_columns: dict[str, str],
         optional_key_columns: dict[str, str] | None = None,
+        colunas_extras: list[str] | None = None,
     ) -> list[dict[str, Any]]:
+        # Colunas extras (origens "colunas.X" do de-para) saem no proprio OUTPUT
+        # da captura, evitando um SELECT por evento durante o envio.
+        extras_aliases = {
+            f"de_para_{idx}": col
+            for idx, col in enumerate(self._limpar_colunas_solicitadas(colunas_extras))
+        }
         resolved = self._resolver_colunas(
             table_name,
             required_columns={
@@ -446,17 +867,64 @@ class RepositorioFilaIntegracaoApi:
             },
             optional_columns={
                 **(optional_key_columns or {}),
+                **extras_aliases,
                 "proxima_tentativa_em": "ProximaTentativaEm",
                 "atualizado_em": "AtualizadoEm",
             },
         )
 
+        sql = _CACHE_COMANDOS.obter(
+            (
+                "capturar_lote",
+                self.schema,
+                table_name,
+                tuple(resolved.items()),
+                tuple(key_columns),
+                tuple(optional_key_columns or {}),
+                tuple(extras_aliases),
+            ),
+            lambda: self._montar_sql_captura(table_name, resolved, key_columns, optional_key_columns, extras_aliases),
+        )
+
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                sql,
+                {
+                    "batch_size": max(1, int(batch_size)),
+                    "max_tentativas": max(1, int(max_tentativas)),
+                    "lock_timeout_minutes": max(1, int(lock_timeout_minutes)),
+                    "lock_id": lock_id,
+                },
+            ).mappings().all()
+
+        if not extras_aliases:
+            return [dict(row) for row in rows]
+
+        eventos: list[dict[str, Any]] = []
+        for row in rows:
+            evento = dict(row)
+            evento["colunas_origem"] = {
+                logical_name: evento.pop(alias_name, None)
+                for alias_name, logical_name in extras_aliases.items()
+            }
+            eventos.append(evento)
+        return eventos
+
+    def _montar_sql_captura(
+        self,
+        table_name: str,
+        resolved: dict[str, str],
+        key_columns: dict[str, str],
+        optional_key_columns: dict[str, str] | None,
+        extras_aliases: dict[str, str],
+    ) -> str:
         key_aliases = list(key_columns.keys()) + [
             alias
             for alias in (optional_key_columns or {}).keys()
             if alias in resolved
         ]
-        output_aliases = key_aliases + ["payload_json", "tentativas"]
+        extras_resolvidos = [alias for alias in extras_aliases.keys() if alias in resolved]
+        output_aliases = key_aliases + ["payload_json", "tentativas"] + extras_resolvidos
 
         select_parts: list[str] = []
         selected_aliases: set[str] = set()
@@ -478,8 +946,9 @@ class RepositorioFilaIntegracaoApi:
         # Em UPDATE sobre CTE, a pseudo-tabela INSERTED expõe os nomes do CTE
         # (aliases selecionados), não necessariamente os nomes físicos da tabela.
         output_cols = ",\n                    ".join(
-            f"INSERTED.[{alias}] AS [{alias}]"
-            for alias in output_aliases
+            [f"INSERTED.[{alias}] AS [{alias}]" for alias in output_aliases]
+            # Status antes da captura, para devolver o evento sem consumir tentativa.
+            + [f"DELETED.[{resolved['status']}] AS [status_anterior]"]
         )
 
         where_parts = [
@@ -513,8 +982,7 @@ class RepositorioFilaIntegracaoApi:
         if "atualizado_em" in resolved:
             set_parts.append(f"[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
 
-        sql = text(
-            f"""
+        return f"""
             WITH lote AS (
                 SELECT TOP (:batch_size)
                     {select_cols}
@@ -528,137 +996,11 @@ class RepositorioFilaIntegracaoApi:
                 {output_cols}
             ;
             """
-        )
-
-        with self.engine.begin() as conn:
-            rows = conn.execute(
-                sql,
-                {
-                    "batch_size": max(1, int(batch_size)),
-                    "max_tentativas": max(1, int(max_tentativas)),
-                    "lock_timeout_minutes": max(1, int(lock_timeout_minutes)),
-                    "lock_id": lock_id,
-                },
-            ).mappings().all()
-        return [dict(row) for row in rows]
-
-    def _marcar_resultado(
-        self,
-        *,
-        table_name: str,
-        lock_id: str,
-        evento: dict[str, Any],
-        sucesso: bool,
-        http_status: int | None,
-        resposta_resumo: str | None,
-        ultimo_erro: str | None,
-        proxima_tentativa: datetime | None,
-        key_columns: dict[str, str],
-        optional_key_columns: dict[str, str] | None = None,
-    ) -> bool:
-        resolved = self._resolver_colunas(
-            table_name,
-            required_columns={
-                **key_columns,
-                "status": "Status",
-                "tentativas": "Tentativas",
-                "lock_id": "LockId",
-                "lock_em": "LockEm",
-            },
-            optional_columns={
-                **(optional_key_columns or {}),
-                "http_status": "HttpStatus",
-                "resposta_resumo": "RespostaResumo",
-                "ultimo_erro": "UltimoErro",
-                "proxima_tentativa_em": "ProximaTentativaEm",
-                "processado_em": "ProcessadoEm",
-                "atualizado_em": "AtualizadoEm",
-            },
-        )
-
-        set_parts = [
-            f"t.[{resolved['status']}] = :status",
-            f"t.[{resolved['tentativas']}] = ISNULL(t.[{resolved['tentativas']}], 0) + 1",
-            f"t.[{resolved['lock_id']}] = NULL",
-            f"t.[{resolved['lock_em']}] = NULL",
-        ]
-        params: dict[str, Any] = {
-            "lock_id": lock_id,
-        }
-
-        if "http_status" in resolved:
-            set_parts.append(f"t.[{resolved['http_status']}] = :http_status")
-            params["http_status"] = http_status
-
-        if "resposta_resumo" in resolved:
-            set_parts.append(f"t.[{resolved['resposta_resumo']}] = :resposta_resumo")
-            params["resposta_resumo"] = resposta_resumo
-
-        if "ultimo_erro" in resolved:
-            set_parts.append(f"t.[{resolved['ultimo_erro']}] = :ultimo_erro")
-            params["ultimo_erro"] = None if sucesso else ultimo_erro
-
-        if "proxima_tentativa_em" in resolved:
-            set_parts.append(f"t.[{resolved['proxima_tentativa_em']}] = :proxima_tentativa")
-            params["proxima_tentativa"] = None if sucesso else proxima_tentativa
-
-        if "processado_em" in resolved:
-            set_parts.append(
-                f"t.[{resolved['processado_em']}] = "
-                f"{'SYSUTCDATETIME()' if sucesso else 'NULL'}"
-            )
-
-        if "atualizado_em" in resolved:
-            set_parts.append(f"t.[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
-
-        where_parts = [f"t.[{resolved['lock_id']}] = :lock_id"]
-        for alias in list(key_columns.keys()) + list((optional_key_columns or {}).keys()):
-            if alias not in resolved:
-                continue
-            where_parts.append(f"t.[{resolved[alias]}] = :{alias}")
-            params[alias] = evento.get(alias)
-
-        sql = text(
-            f"""
-            UPDATE t
-            SET {', '.join(set_parts)}
-            FROM [{self.schema}].[{table_name}] AS t
-            WHERE {' AND '.join(where_parts)}
-            """
-        )
-
-        status_candidates = (
-            self._status_sucesso_candidates(table_name)
-            if sucesso
-            else ["ERRO"]
-        )
-
-        last_exc: Exception | None = None
-        for status_value in status_candidates:
-            params["status"] = status_value
-            try:
-                with self.engine.begin() as conn:
-                    result = conn.execute(sql, params)
-                    return int(result.rowcount or 0) > 0
-            except IntegrityError as exc:
-                # Alguns ambientes usam CHECK de status diferente
-                # (ex.: ENVIADO no lugar de PROCESSADO).
-                if not sucesso or not self._is_status_constraint_error(exc):
-                    raise
-                last_exc = exc
-                continue
-
-        if last_exc is not None:
-            raise last_exc
-        return False
 
     def _status_sucesso_candidates(self, table_name: str) -> list[str]:
-        if table_name in self._cache_status_sucesso:
-            return self._cache_status_sucesso[table_name]
-
         allowed = self._status_values_from_constraints(table_name)
         preferred = ["PROCESSADO", "ENVIADO", "INTEGRADO", "CONCLUIDO", "SUCESSO", "OK"]
-        blocked = {"PENDENTE", "PROCESSANDO", "ERRO"}
+        blocked = {"PENDENTE", "PROCESSANDO", "ERRO", _STATUS_REJEITADO, _STATUS_SUPERSEDIDO}
 
         candidates: list[str] = []
         for value in preferred:
@@ -677,27 +1019,18 @@ class RepositorioFilaIntegracaoApi:
         if not candidates:
             candidates = ["PROCESSADO"]
 
-        self._cache_status_sucesso[table_name] = candidates
         return candidates
 
+    def _status_permitido(self, table_name: str, status: str) -> bool:
+        # Status novos (REJEITADO, SUPERSEDIDO) so sao usados se nao houver CHECK
+        # de status ou se ele os aceitar (ver scripts/sql/004 e 005).
+        allowed = self._status_values_from_constraints(table_name)
+        return not allowed or status in allowed
+
     def _status_values_from_constraints(self, table_name: str) -> list[str]:
+        # Definicoes vem do cache de catalogo do processo (Consultas_dbo.metadados).
         try:
-            with self.engine.connect() as conn:
-                rows = conn.execute(
-                    text(
-                        """
-                        SELECT cc.[definition]
-                        FROM sys.check_constraints AS cc
-                        INNER JOIN sys.tables AS t
-                            ON t.[object_id] = cc.[parent_object_id]
-                        INNER JOIN sys.schemas AS s
-                            ON s.[schema_id] = t.[schema_id]
-                        WHERE s.[name] = :schema
-                        AND t.[name] = :table_name
-                        """
-                    ),
-                    {"schema": self.schema, "table_name": table_name},
-                ).scalars().all()
+            rows = definicoes_check(self.engine, self.schema, table_name)
         except Exception:
             return []
 
@@ -720,6 +1053,124 @@ class RepositorioFilaIntegracaoApi:
         message = str(exc).lower()
         return ("constraint" in message and "status" in message) or "ck_" in message
 
+    def _supersedir_eventos_tabela(
+        self,
+        table_name: str,
+        *,
+        chave_columns: dict[str, str],
+        optional_chave_columns: dict[str, str] | None = None,
+    ) -> int:
+        # Rajadas de alteracao geram varios eventos para a mesma chave; so o mais
+        # novo entre PENDENTE/ERRO precisa ir para a API. Os anteriores viram
+        # SUPERSEDIDO num unico UPDATE. PROCESSANDO (lock ativo) nunca e tocado.
+        # CriadoEm e o "ultimo visto" do evento: os produtores o atualizam quando
+        # o dedup barra um evento igual a um existente mais antigo da chave.
+        if not self._status_permitido(table_name, _STATUS_SUPERSEDIDO):
+            return 0
+
+        resolved = self._resolver_colunas(
+            table_name,
+            required_columns={
+                **chave_columns,
+                "evento_tipo": "EventoTipo",
+                "status": "Status",
+                "lock_id": "LockId",
+                "criado_em": "CriadoEm",
+            },
+            optional_columns={
+                **(optional_chave_columns or {}),
+                "id": "Id",
+                "atualizado_em": "AtualizadoEm",
+                "ultimo_erro": "UltimoErro",
+                "proxima_tentativa_em": "ProximaTentativaEm",
+            },
+        )
+        partition_aliases = list(chave_columns.keys()) + [
+            alias for alias in (optional_chave_columns or {}).keys() if alias in resolved
+        ] + ["evento_tipo"]
+
+        def _montar() -> str:
+            order_parts = [f"t.[{resolved['criado_em']}] DESC"]
+            for alias in ("atualizado_em", "id"):
+                if alias in resolved:
+                    order_parts.append(f"t.[{resolved[alias]}] DESC")
+
+            select_parts = [f"t.[{resolved['status']}] AS [{resolved['status']}]"]
+            set_parts = [f"[{resolved['status']}] = '{_STATUS_SUPERSEDIDO}'"]
+            for alias, valor in (
+                ("atualizado_em", "SYSUTCDATETIME()"),
+                ("ultimo_erro", "'Substituido por evento mais recente da mesma chave.'"),
+                ("proxima_tentativa_em", "NULL"),
+            ):
+                if alias in resolved:
+                    select_parts.append(f"t.[{resolved[alias]}] AS [{resolved[alias]}]")
+                    set_parts.append(f"[{resolved[alias]}] = {valor}")
+
+            return f"""
+            WITH ordenados AS (
+                SELECT
+                    {', '.join(select_parts)},
+                    ROW_NUMBER() OVER (
+                        PARTITION BY {', '.join(f't.[{resolved[alias]}]' for alias in partition_aliases)}
+                        ORDER BY {', '.join(order_parts)}
+                    ) AS [ordem]
+                FROM [{self.schema}].[{table_name}] AS t WITH (ROWLOCK, UPDLOCK, READPAST)
+                WHERE t.[{resolved['status']}] IN ('PENDENTE', 'ERRO')
+                AND t.[{resolved['lock_id']}] IS NULL
+            )
+            UPDATE ordenados
+            SET {', '.join(set_parts)}
+            WHERE [ordem] > 1
+            """
+
+        sql = _CACHE_COMANDOS.obter(
+            ("supersedir_eventos", self.schema, table_name, tuple(resolved.items()), tuple(partition_aliases)),
+            _montar,
+        )
+
+        with self.engine.begin() as conn:
+            result = conn.execute(sql)
+            return int(result.rowcount or 0)
+
+    def _renovar_locks_tabela(self, table_name: str, lock_ids: list[str]) -> int:
+        # Heartbeat: estende LockEm de todas as linhas ainda presas aos lock_ids
+        # ativos, num UPDATE por bloco (lock_ids por processo sao poucos).
+        lock_ids = list(dict.fromkeys(str(lock_id) for lock_id in lock_ids if lock_id))
+        if not lock_ids:
+            return 0
+
+        resolved = self._resolver_colunas(
+            table_name,
+            required_columns={
+                "status": "Status",
+                "lock_id": "LockId",
+                "lock_em": "LockEm",
+            },
+        )
+
+        def _montar(tamanho: int) -> str:
+            return f"""
+            UPDATE [{self.schema}].[{table_name}]
+            SET [{resolved['lock_em']}] = SYSUTCDATETIME()
+            WHERE [{resolved['status']}] = 'PROCESSANDO'
+            AND [{resolved['lock_id']}] IN ({', '.join(f':lock_id_{pos}' for pos in range(tamanho))})
+            """
+
+        renovados = 0
+        for inicio in range(0, len(lock_ids), _MAX_LINHAS_VALUES):
+            bloco = lock_ids[inicio:inicio + _MAX_LINHAS_VALUES]
+            tamanho = tamanho_padronizado(len(bloco), _MAX_LINHAS_VALUES)
+            sql = _CACHE_COMANDOS.obter(
+                ("renovar_locks", self.schema, table_name, tuple(resolved.items()), tamanho),
+                lambda: _montar(tamanho),
+            )
+            # Posicoes de preenchimento repetem o ultimo lock_id (IN ignora repetidos).
+            params = {f"lock_id_{pos}": bloco[min(pos, len(bloco) - 1)] for pos in range(tamanho)}
+            with self.engine.begin() as conn:
+                result = conn.execute(sql, params)
+                renovados += int(result.rowcount or 0)
+        return renovados
+
     def _liberar_locks_expirados_tabela(
         self,
         table_name: str,
@@ -739,29 +1190,33 @@ class RepositorioFilaIntegracaoApi:
             },
         )
 
-        set_parts = [
-            f"[{resolved['status']}] = 'ERRO'",
-            f"[{resolved['lock_id']}] = NULL",
-            f"[{resolved['lock_em']}] = NULL",
-        ]
         params = {"lock_timeout_minutes": max(1, int(lock_timeout_minutes))}
 
-        if "ultimo_erro" in resolved:
-            set_parts.append(
-                f"[{resolved['ultimo_erro']}] = "
-                "'Lock expirado durante processamento. Evento reenfileirado automaticamente.'"
-            )
-        if "atualizado_em" in resolved:
-            set_parts.append(f"[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
+        def _montar() -> str:
+            set_parts = [
+                f"[{resolved['status']}] = 'ERRO'",
+                f"[{resolved['lock_id']}] = NULL",
+                f"[{resolved['lock_em']}] = NULL",
+            ]
+            if "ultimo_erro" in resolved:
+                set_parts.append(
+                    f"[{resolved['ultimo_erro']}] = "
+                    "'Lock expirado durante processamento. Evento reenfileirado automaticamente.'"
+                )
+            if "atualizado_em" in resolved:
+                set_parts.append(f"[{resolved['atualizado_em']}] = SYSUTCDATETIME()")
 
-        sql = text(
-            f"""
+            return f"""
             UPDATE [{self.schema}].[{table_name}]
             SET {', '.join(set_parts)}
             WHERE [{resolved['status']}] = 'PROCESSANDO'
             AND [{resolved['lock_id']}] IS NOT NULL
             AND [{resolved['lock_em']}] < DATEADD(MINUTE, -:lock_timeout_minutes, SYSUTCDATETIME())
             """
+
+        sql = _CACHE_COMANDOS.obter(
+            ("liberar_locks_expirados", self.schema, table_name, tuple(resolved.items())),
+            _montar,
         )
 
         with self.engine.begin() as conn:
@@ -820,7 +1275,7 @@ class RepositorioFilaIntegracaoApi:
                 },
             )
         except Exception:
-            self._cache_tabela_empresa_dict = {}
+            # Falha (tabela ausente/erro transitorio) nao fica em cache.
             return None
 
         self._cache_tabela_empresa_dict = resolved
@@ -853,32 +1308,23 @@ class RepositorioFilaIntegracaoApi:
                 },
             )
         except Exception:
-            self._cache_tabela_sindicato_dict = {}
+            # Falha (tabela ausente/erro transitorio) nao fica em cache.
             return None
 
         self._cache_tabela_sindicato_dict = resolved
         return resolved
 
-    def _carregar_colunas_tabela(self, table_name: str) -> dict[str, str]:
-        if table_name in self._cache_colunas:
-            return self._cache_colunas[table_name]
+    @staticmethod
+    def estatisticas_comandos_sql() -> dict[str, Any]:
+        # Em regime, "construidos" para de crescer: os ciclos so reutilizam comandos.
+        return _CACHE_COMANDOS.estatisticas()
 
-        with self.engine.connect() as conn:
-            rows = conn.execute(
-                text(
-                    """
-                    SELECT c.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.COLUMNS AS c
-                    WHERE c.TABLE_SCHEMA = :schema
-                    AND c.TABLE_NAME = :table_name
-                    """
-                ),
-                {"schema": self.schema, "table_name": table_name},
-            ).scalars().all()
+    def aquecer_metadados(self) -> None:
+        aquecer_metadados(self.engine, self.schema, [self.tabela_motorista, self.tabela_afastamento])
 
+    def _carregar_colunas_tabela(self, table_name: str) -> dict[str, str]:
+        rows = colunas_tabela(self.engine, self.schema, table_name)
         if not rows:
             raise ValueError(f"Tabela nao encontrada: [{self.schema}].[{table_name}]")
 
-        mapped = {_normalize_key(col): col for col in rows}
-        self._cache_colunas[table_name] = mapped
-        return mapped
+        return {_normalize_key(col): col for col in rows}
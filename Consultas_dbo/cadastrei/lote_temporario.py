@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+_TABELA_TEMPORARIA_RE = re.compile(r"^#[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _validar_tabela_temporaria(tabela: str) -> str:
+    if not _TABELA_TEMPORARIA_RE.fullmatch(tabela or ""):
+        raise ValueError(f"Tabela temporaria invalida: {tabela!r}")
+    return tabela
+
+
+def descartar_tabela_temporaria(conn: Connection, tabela: str) -> None:
+    # Tabelas #temp vivem na sessao; com pool a conexao volta com elas.
+    tabela = _validar_tabela_temporaria(tabela)
+    conn.execute(text(f"IF OBJECT_ID(N'tempdb..{tabela}') IS NOT NULL DROP TABLE {tabela}"))
+
+
+def inserir_linhas_em_massa(
+    conn: Connection,
+    tabela: str,
+    colunas: Sequence[str],
+    linhas: Sequence[Sequence[Any]],
+) -> None:
+    # Array binding do pyodbc (fast_executemany): um round-trip por lote e sem
+    # o teto de 2100 parametros de um comando unico.
+    tabela = _validar_tabela_temporaria(tabela)
+    if not linhas:
+        return
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.fast_executemany = True
+        cursor.executemany(
+            f"INSERT INTO {tabela} ({', '.join(f'[{c}]' for c in colunas)}) "
+            f"VALUES ({', '.join('?' for _ in colunas)})",
+            [tuple(linha) for linha in linhas],
+        )
+    finally:
+        cursor.close()
+
+
+def criar_keyset_temporario(
+    conn: Connection,
+    tabela: str,
+    colunas: dict[str, str],
+    linhas: Sequence[Sequence[Any]],
+    *,
+    chave: Sequence[str] | None = None,
+) -> None:
+    # Cria `tabela` com `colunas` ({nome: tipo SQL}), PK em `chave` (todas as
+    # colunas por padrao) e carrega `linhas`, que precisam ser unicas na chave.
+    tabela = _validar_tabela_temporaria(tabela)
+    nomes = list(colunas)
+    chave = list(chave or nomes)
+
+    descartar_tabela_temporaria(conn, tabela)
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE {tabela}(
+                {", ".join(f"[{nome}] {tipo} NOT NULL" for nome, tipo in colunas.items())},
+                PRIMARY KEY CLUSTERED ({", ".join(f"[{c}]" for c in chave)})
+            )
+            """
+        )
+    )
+    inserir_linhas_em_massa(conn, tabela, nomes, linhas)
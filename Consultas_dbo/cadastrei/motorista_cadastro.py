@@ -5,8 +5,16 @@ from datetime import datetime
 from typing import Any
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.elements import TextClause
+
+from Consultas_dbo.cadastrei.lote_temporario import (
+    criar_keyset_temporario,
+    descartar_tabela_temporaria,
+    inserir_linhas_em_massa,
+)
+from Consultas_dbo.metadados import aquecer_metadados, colunas_tabela
 
 _IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 
@@ -24,6 +32,32 @@ _COLUNAS_EVENTO_OBRIGATORIAS = (
     "AtualizadoEm",
 )
 
+# Na compactacao o evento PENDENTE mantem identidade e estado de envio; so
+# payload, hash, espelho e AtualizadoEm sao trocados (CriadoEm vai para agora).
+_PARAMS_PRESERVADOS_NA_COMPACTACAO = frozenset(
+    {
+        "id_de_origem",
+        "evento_tipo",
+        "numemp",
+        "status",
+        "tentativas",
+        "criado_em",
+        "proxima_tentativa_em",
+        "ultimo_erro",
+        "http_status",
+        "resposta_resumo",
+        "lock_id",
+        "lock_em",
+        "processado_em",
+    }
+)
+
+# Abaixo disso o caminho linha a linha sai mais barato que montar a tabela temporaria.
+_MIN_EVENTOS_INSERCAO_EM_MASSA = 20
+_TABELA_LOTE = "#MotoristaCadastroLote"
+_COLUNA_SEQ_LOTE = "SeqLote"
+_TABELA_CHAVES_ESTADO = "#MotoristaSyncChaves"
+
 _CAMPOS_ESPELHO_ALIAS = {
     "cpf": ("Cpf", "CPF"),
     "matricula": ("Matricula", "MATRICULA", "NumeroMatricula", "NumCad"),
@@ -80,7 +114,6 @@ class RepositorioMotoristaCadastro:
         self.engine = engine
         self.schema = _safe_identifier(schema, "Schema")
         self.table_name = _safe_identifier(table_name, "Tabela")
-        self._cache_colunas_tabela: dict[str, str] | None = None
 
     def garantir_estruturas_auxiliares(self) -> None:
         sql_estado = text(
@@ -118,6 +151,9 @@ class RepositorioMotoristaCadastro:
             conn.execute(sql_estado)
             conn.execute(sql_checkpoint)
 
+    def aquecer_metadados(self) -> None:
+        aquecer_metadados(self.engine, self.schema, [self.table_name], checks=False)
+
     def carregar_checkpoint(self, database_origem: str, tabela_origem: str) -> tuple[datetime, int]:
         with self.engine.connect() as conn:
             row = conn.execute(
@@ -184,22 +220,21 @@ class RepositorioMotoristaCadastro:
         if not ids:
             return {}
 
-        params = {"database_origem": database_origem}
-        params.update({f"id{i}": valor for i, valor in enumerate(ids)})
-        placeholders = ", ".join(f":id{i}" for i in range(len(ids)))
-
-        with self.engine.connect() as conn:
+        with self.engine.begin() as conn:
+            criar_keyset_temporario(conn, _TABELA_CHAVES_ESTADO, {"IdDeOrigem": "INT"}, [(v,) for v in ids])
             rows = conn.execute(
                 text(
                     f"""
-                    SELECT [IdDeOrigem], [HashPayload]
-                    FROM [{self.schema}].[MotoristaSyncEstado]
-                    WHERE [DatabaseOrigem] = :database_origem
-                    AND [IdDeOrigem] IN ({placeholders})
+                    SELECT e.[IdDeOrigem], e.[HashPayload]
+                    FROM [{self.schema}].[MotoristaSyncEstado] AS e
+                    INNER JOIN {_TABELA_CHAVES_ESTADO} AS k
+                        ON k.[IdDeOrigem] = e.[IdDeOrigem]
+                    WHERE e.[DatabaseOrigem] = :database_origem
                     """
                 ),
-                params,
+                {"database_origem": database_origem},
             ).mappings().all()
+            descartar_tabela_temporaria(conn, _TABELA_CHAVES_ESTADO)
 
         return {int(row["IdDeOrigem"]): row["HashPayload"] for row in rows}
 
@@ -211,7 +246,18 @@ class RepositorioMotoristaCadastro:
         if not hashes:
             return
 
+        # Ultimo hash de cada IdDeOrigem vence, como no MERGE linha a linha;
+        # o MERGE unico nao aceita a mesma chave duas vezes na origem.
+        por_id = {int(item["id_de_origem"]): item["hash_payload"] for item in hashes}
+
         with self.engine.begin() as conn:
+            criar_keyset_temporario(
+                conn,
+                _TABELA_CHAVES_ESTADO,
+                {"IdDeOrigem": "INT", "HashPayload": "VARBINARY(32)"},
+                list(por_id.items()),
+                chave=["IdDeOrigem"],
+            )
             conn.execute(
                 text(
                     f"""
@@ -219,8 +265,9 @@ class RepositorioMotoristaCadastro:
                     USING (
                         SELECT
                             :database_origem AS [DatabaseOrigem],
-                            :id_de_origem AS [IdDeOrigem],
-                            :hash_payload AS [HashPayload]
+                            k.[IdDeOrigem],
+                            k.[HashPayload]
+                        FROM {_TABELA_CHAVES_ESTADO} AS k
                     ) AS source
                     ON target.[DatabaseOrigem] = source.[DatabaseOrigem]
                     AND target.[IdDeOrigem] = source.[IdDeOrigem]
@@ -233,15 +280,9 @@ class RepositorioMotoristaCadastro:
                         VALUES (source.[DatabaseOrigem], source.[IdDeOrigem], source.[HashPayload], SYSUTCDATETIME());
                     """
                 ),
-                [
-                    {
-                        "database_origem": database_origem,
-                        "id_de_origem": int(item["id_de_origem"]),
-                        "hash_payload": item["hash_payload"],
-                    }
-                    for item in hashes
-                ],
+                {"database_origem": database_origem},
             )
+            descartar_tabela_temporaria(conn, _TABELA_CHAVES_ESTADO)
 
     def resetar_estado_sync(self, database_origem: str) -> None:
         with self.engine.begin() as conn:
@@ -280,6 +321,8 @@ class RepositorioMotoristaCadastro:
         col_id_origem = colunas[_normalize_key("IdDeOrigem")]
         col_status = colunas[_normalize_key("Status")]
         col_numemp = colunas.get(_normalize_key("NumEmp"))
+        col_criado_em = colunas[_normalize_key("CriadoEm")]
+        col_lock_id = colunas.get(_normalize_key("LockId"))
 
         where_keys = [
             f"t.[{col_id_origem}] = :check_id_de_origem",
@@ -303,42 +346,213 @@ class RepositorioMotoristaCadastro:
             """
         )
 
-        inseridos = 0
+        # Compactacao: o evento PENDENTE mais novo, ainda nao capturado, do mesmo
+        # motorista recebe o payload novo no lugar de uma linha a mais (se o hash
+        # for igual, nada muda e o INSERT abaixo tambem e barrado). PROCESSANDO/ERRO
+        # nunca sao alterados; o retorno soma inseridos e compactados. CriadoEm
+        # passa a ser o do payload novo, como no sql_tocar: a supersessao mantem
+        # o CriadoEm mais recente por chave e nao pode preferir um ERRO antigo.
+        filtros_compactar = [f"t.[{col_status}] = 'PENDENTE'"]
+        if col_lock_id:
+            filtros_compactar.append(f"t.[{col_lock_id}] IS NULL")
+        where_compactar = [
+            f"t.[{col_id_origem}] = :check_id_de_origem",
+            f"t.[{col_evento_tipo}] = :check_evento_tipo",
+            *filtros_compactar,
+        ]
+        if col_numemp:
+            where_compactar.insert(0, f"t.[{col_numemp}] = :check_numemp")
+        cols_compactar = [
+            coluna
+            for coluna, param in mapping_colunas.items()
+            if param not in _PARAMS_PRESERVADOS_NA_COMPACTACAO
+        ]
+        sql_compactar = text(
+            f"""
+            WITH alvo AS (
+                SELECT TOP (1) {", ".join(f"t.[{c}]" for c in [*cols_compactar, col_criado_em])}
+                FROM [{self.schema}].[{self.table_name}] AS t WITH (ROWLOCK, UPDLOCK)
+                WHERE {' AND '.join(where_compactar)}
+                ORDER BY t.[{col_criado_em}] DESC
+            )
+            UPDATE alvo
+            SET {", ".join(f"[{c}] = :{mapping_colunas[c]}" for c in cols_compactar)},
+                [{col_criado_em}] = SYSUTCDATETIME()
+            WHERE [{col_hash_payload}] <> :check_hash_payload
+            """
+        )
+
+        # Evento barrado pelo NOT EXISTS (mesmo hash ainda PENDENTE/ERRO) e o
+        # estado mais recente do motorista: se ha outro evento vivo mais novo da
+        # mesma chave, o existente ganha CriadoEm atual para sobreviver a
+        # supersessao (que mantem o CriadoEm mais recente por chave).
+        cols_chave = [col_id_origem, col_evento_tipo]
+        if col_numemp:
+            cols_chave.insert(0, col_numemp)
+        filtro_mais_novo = f"""
+            EXISTS (
+                SELECT 1
+                FROM [{self.schema}].[{self.table_name}] AS n
+                WHERE {' AND '.join(f"n.[{c}] = t.[{c}]" for c in cols_chave)}
+                AND n.[{col_status}] IN ('PENDENTE', 'ERRO')
+                AND n.[{col_criado_em}] > t.[{col_criado_em}]
+            )
+        """
+        sql_tocar = text(
+            f"""
+            UPDATE t
+            SET t.[{col_criado_em}] = SYSUTCDATETIME()
+            FROM [{self.schema}].[{self.table_name}] AS t
+            WHERE {' AND '.join(where_keys)}
+            AND {filtro_mais_novo}
+            """
+        )
+
+        # Dentro do lote vale o ultimo evento de cada motorista (o mesmo estado
+        # final a que a compactacao chegaria), nos dois caminhos de insercao:
+        # assim o retorno conta as mesmas linhas em massa e linha a linha.
+        ultimos: dict[tuple[Any, ...], dict[str, Any]] = {}
+        for evento in eventos:
+            params = self._montar_params_evento(mapping_colunas, evento)
+            chave = (params["check_numemp"], params["check_id_de_origem"], params["check_evento_tipo"])
+            ultimos.pop(chave, None)
+            ultimos[chave] = params
+        params_eventos = list(ultimos.values())
         with self.engine.begin() as conn:
-            for evento in eventos:
-                params = self._montar_params_evento(mapping_colunas, evento)
-                try:
-                    result = conn.execute(sql, params)
-                    inseridos += int(result.rowcount or 0)
-                except IntegrityError as exc:
-                    if "UX_MotoristaCadastro_Idem" in str(exc):
-                        continue
+            if len(params_eventos) < _MIN_EVENTOS_INSERCAO_EM_MASSA:
+                return self._inserir_por_linha(conn, sql, sql_compactar, sql_tocar, params_eventos)
+
+            self._preparar_lote_temporario(conn, mapping_colunas, params_eventos)
+            chaves_lote = [f"t.[{c}] = l.[{c}]" for c in cols_chave]
+
+            novos = {coluna: f"Novo{i}" for i, coluna in enumerate(cols_compactar)}
+            sql_compactar_lote = text(
+                f"""
+                WITH alvo AS (
+                    SELECT
+                        {", ".join(f"t.[{c}]" for c in [*cols_compactar, col_criado_em])},
+                        {", ".join(f"l.[{c}] AS [{novos[c]}]" for c in cols_compactar)},
+                        ROW_NUMBER() OVER (PARTITION BY l.[{_COLUNA_SEQ_LOTE}] ORDER BY t.[{col_criado_em}] DESC) AS [ordem]
+                    FROM [{self.schema}].[{self.table_name}] AS t WITH (ROWLOCK, UPDLOCK)
+                    INNER JOIN {_TABELA_LOTE} AS l
+                        ON {' AND '.join(chaves_lote)}
+                    WHERE {' AND '.join(filtros_compactar)}
+                )
+                UPDATE alvo
+                SET {", ".join(f"[{c}] = [{novos[c]}]" for c in cols_compactar)},
+                    [{col_criado_em}] = SYSUTCDATETIME()
+                WHERE [ordem] = 1
+                AND [{col_hash_payload}] <> [{novos[col_hash_payload]}]
+                """
+            )
+            where_lote = [
+                *chaves_lote,
+                f"t.[{col_versao_payload}] = l.[{col_versao_payload}]",
+                f"t.[{col_hash_payload}] = l.[{col_hash_payload}]",
+                f"t.[{col_status}] IN ('PENDENTE', 'ERRO')",
+            ]
+            sql_inserir_lote = text(
+                f"""
+                INSERT INTO [{self.schema}].[{self.table_name}] ({", ".join(f"[{c}]" for c in cols_insert)})
+                SELECT {", ".join(f"l.[{c}]" for c in cols_insert)}
+                FROM {_TABELA_LOTE} AS l
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM [{self.schema}].[{self.table_name}] AS t
+                    WHERE {' AND '.join(where_lote)}
+                )
+                """
+            )
+            sql_tocar_lote = text(
+                f"""
+                UPDATE t
+                SET t.[{col_criado_em}] = SYSUTCDATETIME()
+                FROM [{self.schema}].[{self.table_name}] AS t
+                INNER JOIN {_TABELA_LOTE} AS l
+                    ON {' AND '.join(where_lote)}
+                WHERE {filtro_mais_novo}
+                """
+            )
+
+            # Corrida com outro produtor no UX_MotoristaCadastro_Idem derruba o
+            # INSERT inteiro: volta ao savepoint e refaz linha a linha, que
+            # ignora so a linha duplicada.
+            savepoint = conn.begin_nested()
+            try:
+                inseridos = int(conn.execute(sql_compactar_lote).rowcount or 0)
+                conn.execute(sql_tocar_lote)
+                inseridos += int(conn.execute(sql_inserir_lote).rowcount or 0)
+                savepoint.commit()
+            except IntegrityError as exc:
+                if "UX_MotoristaCadastro_Idem" not in str(exc):
                     raise
+                savepoint.rollback()
+                inseridos = self._inserir_por_linha(conn, sql, sql_compactar, sql_tocar, params_eventos)
 
+            descartar_tabela_temporaria(conn, _TABELA_LOTE)
         return inseridos
 
-    def _carregar_colunas_tabela(self) -> dict[str, str]:
-        if self._cache_colunas_tabela is not None:
-            return self._cache_colunas_tabela
+    @staticmethod
+    def _inserir_por_linha(
+        conn: Connection,
+        sql: TextClause,
+        sql_compactar: TextClause,
+        sql_tocar: TextClause,
+        params_eventos: list[dict[str, Any]],
+    ) -> int:
+        inseridos = 0
+        for params in params_eventos:
+            try:
+                result = conn.execute(sql_compactar, params)
+                if int(result.rowcount or 0) > 0:
+                    inseridos += 1
+                    continue
+                if int(conn.execute(sql_tocar, params).rowcount or 0) > 0:
+                    continue
+                result = conn.execute(sql, params)
+                inseridos += int(result.rowcount or 0)
+            except IntegrityError as exc:
+                if "UX_MotoristaCadastro_Idem" in str(exc):
+                    continue
+                raise
+        return inseridos
 
-        with self.engine.connect() as conn:
-            colunas = conn.execute(
-                text(
-                    """
-                    SELECT c.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.COLUMNS AS c
-                    WHERE c.TABLE_SCHEMA = :schema
-                    AND c.TABLE_NAME = :tabela
-                    """
-                ),
-                {"schema": self.schema, "tabela": self.table_name},
-            ).scalars().all()
+    def _preparar_lote_temporario(
+        self,
+        conn: Connection,
+        mapping_colunas: dict[str, str],
+        params_eventos: list[dict[str, Any]],
+    ) -> None:
+        # Tabela temporaria com os mesmos tipos da fila (SELECT TOP 0 ... INTO) e
+        # carga via fast_executemany: um round-trip por lote em vez de um INSERT
+        # com ~50 parametros por evento.
+        colunas = list(mapping_colunas)
+        descartar_tabela_temporaria(conn, _TABELA_LOTE)
+        conn.execute(
+            text(
+                f"""
+                SELECT TOP (0) CAST(0 AS INT) AS [{_COLUNA_SEQ_LOTE}], {", ".join(f"[{c}]" for c in colunas)}
+                INTO {_TABELA_LOTE}
+                FROM [{self.schema}].[{self.table_name}]
+                """
+            )
+        )
+        inserir_linhas_em_massa(
+            conn,
+            _TABELA_LOTE,
+            [_COLUNA_SEQ_LOTE, *colunas],
+            [
+                (seq, *(params[mapping_colunas[c]] for c in colunas))
+                for seq, params in enumerate(params_eventos)
+            ],
+        )
 
+    def _carregar_colunas_tabela(self) -> dict[str, str]:
+        colunas = colunas_tabela(self.engine, self.schema, self.table_name)
         if not colunas:
             raise ValueError(f"Tabela nao encontrada: [{self.schema}].[{self.table_name}]")
 
-        self._cache_colunas_tabela = {_normalize_key(c): c for c in colunas}
-        return self._cache_colunas_tabela
+        return {_normalize_key(c): c for c in colunas}
 
     @staticmethod
     def _validar_colunas_obrigatorias(colunas: dict[str, str]) -> None:
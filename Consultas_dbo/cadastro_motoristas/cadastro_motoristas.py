@@ -5,6 +5,7 @@ from typing import Any, Dict, List
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from Consultas_dbo.metadados import aquecer_metadados, colunas_tabela
 from Consultas_dbo.query import (
     montar_query_cadastro_motoristas,
     montar_query_cadastro_motoristas_por_numcads,
@@ -32,7 +33,6 @@ class RepositorioCadastroMotoristas:
     def __init__(self, engine: Engine, schema_origem: str = "dbo"):
         self.engine = engine
         self.schema_origem = _safe_identifier(schema_origem, "Schema de origem")
-        self._cache_colunas_data_hora: dict[str, tuple[str, str | None]] = {}
 
     def buscar_dados_cadastro_motoristas(self, limit: int = 1) -> List[Dict[str, Any]]:
         query = montar_query_cadastro_motoristas(self.schema_origem)
@@ -182,23 +182,12 @@ class RepositorioCadastroMotoristas:
             ).mappings().all()
             return [dict(r) for r in rows_reinicio]
 
+    def aquecer_metadados(self) -> None:
+        aquecer_metadados(self.engine, self.schema_origem, ["R034FUN", "R034CPL"], checks=False)
+
     def _resolver_colunas_data_hora(self, tabela_origem: str) -> tuple[str, str | None]:
         tabela = tabela_origem.upper()
-        if tabela in self._cache_colunas_data_hora:
-            return self._cache_colunas_data_hora[tabela]
-
-        with self.engine.connect() as conn:
-            colunas = conn.execute(
-                text(
-                    """
-                    SELECT c.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.COLUMNS AS c
-                    WHERE c.TABLE_SCHEMA = :schema
-                    AND c.TABLE_NAME = :tabela
-                    """
-                ),
-                {"schema": self.schema_origem, "tabela": tabela},
-            ).scalars().all()
+        colunas = colunas_tabela(self.engine, self.schema_origem, tabela)
 
         lookup = {str(nome).lower(): str(nome) for nome in colunas}
 
@@ -207,7 +196,6 @@ class RepositorioCadastroMotoristas:
             if not coluna_data:
                 continue
             coluna_hora = lookup.get(candidato_hora.lower()) if candidato_hora else None
-            self._cache_colunas_data_hora[tabela] = (coluna_data, coluna_hora)
             return coluna_data, coluna_hora
 
         raise ValueError(
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterable
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+# Cache de catalogo (colunas e CHECK constraints) compartilhado pelo processo,
+# por (URL da engine, schema, tabela). Repositorios sao recriados a cada ciclo
+# nos scripts; com o cache aquecido no startup, os ciclos nao consultam o
+# catalogo. ttl <= 0 desliga a expiracao (so invalidacao manual).
+_TTL_PADRAO_SEGUNDOS = 3600.0
+
+_ttl_segundos = _TTL_PADRAO_SEGUNDOS
+_colunas: dict[tuple[str, str, str], tuple[float, tuple[str, ...]]] = {}
+_checks: dict[tuple[str, str, str], tuple[float, tuple[str, ...]]] = {}
+_lock = threading.Lock()
+
+
+def configurar_ttl_metadados(segundos: float) -> None:
+    global _ttl_segundos
+    _ttl_segundos = float(segundos)
+
+
+def _chave(engine: Engine, schema: str, tabela: str) -> tuple[str, str, str]:
+    url = engine.url.render_as_string(hide_password=True)
+    return url, str(schema or "").strip().lower(), str(tabela or "").strip().lower()
+
+
+def _buscar(cache: dict, chave: tuple[str, str, str]) -> tuple[str, ...] | None:
+    with _lock:
+        item = cache.get(chave)
+    if item is None:
+        return None
+    carregado_em, valores = item
+    if _ttl_segundos > 0 and time.monotonic() - carregado_em > _ttl_segundos:
+        return None
+    return valores
+
+
+def _guardar(cache: dict, chave: tuple[str, str, str], valores: Iterable[str]) -> tuple[str, ...]:
+    valores = tuple(valores)
+    with _lock:
+        cache[chave] = (time.monotonic(), valores)
+    return valores
+
+
+def colunas_tabela(engine: Engine, schema: str, tabela: str) -> tuple[str, ...]:
+    # Tupla vazia = tabela nao encontrada (nao fica em cache: pode ser criada depois).
+    chave = _chave(engine, schema, tabela)
+    valores = _buscar(_colunas, chave)
+    if valores is not None:
+        return valores
+
+    aquecer_metadados(engine, schema, [tabela], checks=False)
+    return _buscar(_colunas, chave) or ()
+
+
+def definicoes_check(engine: Engine, schema: str, tabela: str) -> tuple[str, ...]:
+    chave = _chave(engine, schema, tabela)
+    valores = _buscar(_checks, chave)
+    if valores is not None:
+        return valores
+
+    aquecer_metadados(engine, schema, [tabela], colunas=False)
+    return _buscar(_checks, chave) or ()
+
+
+def aquecer_metadados(
+    engine: Engine,
+    schema: str,
+    tabelas: Iterable[str],
+    *,
+    colunas: bool = True,
+    checks: bool = True,
+) -> None:
+    # Uma consulta por tipo de metadado para todas as tabelas pedidas.
+    nomes = sorted({str(t).strip() for t in tabelas if str(t or "").strip()})
+    if not nomes:
+        return
+
+    por_tabela_colunas: dict[str, list[str]] = {}
+    por_tabela_checks: dict[str, list[str]] = {nome.lower(): [] for nome in nomes}
+    with engine.connect() as conn:
+        if colunas:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT c.TABLE_NAME, c.COLUMN_NAME
+                    FROM INFORMATION_SCHEMA.COLUMNS AS c
+                    WHERE c.TABLE_SCHEMA = :schema
+                    AND c.TABLE_NAME IN :tabelas
+                    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+                    """
+                ).bindparams(bindparam("tabelas", expanding=True)),
+                {"schema": schema, "tabelas": nomes},
+            ).all()
+            for tabela, coluna in rows:
+                por_tabela_colunas.setdefault(str(tabela).lower(), []).append(str(coluna))
+
+        if checks:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT t.[name], cc.[definition]
+                    FROM sys.check_constraints AS cc
+                    INNER JOIN sys.tables AS t
+                        ON t.[object_id] = cc.[parent_object_id]
+                    INNER JOIN sys.schemas AS s
+                        ON s.[schema_id] = t.[schema_id]
+                    WHERE s.[name] = :schema
+                    AND t.[name] IN :tabelas
+                    """
+                ).bindparams(bindparam("tabelas", expanding=True)),
+                {"schema": schema, "tabelas": nomes},
+            ).all()
+            for tabela, definicao in rows:
+                por_tabela_checks.setdefault(str(tabela).lower(), []).append(str(definicao or ""))
+
+    for nome in nomes:
+        chave = _chave(engine, schema, nome)
+        if por_tabela_colunas.get(nome.lower()):
+            _guardar(_colunas, chave, por_tabela_colunas[nome.lower()])
+        if checks:
+            _guardar(_checks, chave, por_tabela_checks.get(nome.lower(), []))
+
+
+def invalidar_metadados(engine: Engine | None = None, schema: str | None = None, tabela: str | None = None) -> None:
+    # Sem argumentos limpa tudo; com engine/schema/tabela limpa so o que casar.
+    filtro = (
+        engine.url.render_as_string(hide_password=True) if engine is not None else None,
+        str(schema).strip().lower() if schema is not None else None,
+        str(tabela).strip().lower() if tabela is not None else None,
+    )
+    with _lock:
+        for cache in (_colunas, _checks):
+            for chave in list(cache):
+                if all(f is None or f == c for f, c in zip(filtro, chave)):
+                    del cache[chave]
@@ -20,6 +20,7 @@ from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from Cadastro_API.login import login_api
+from Consultas_dbo.metadados import colunas_tabela, invalidar_metadados
 from config.engine import ativar_engine
 from config.integration_registry import IntegracaoClienteApi, IntegracaoEndpoint, IntegracaoRegistry
 from config.settings import settings
@@ -55,7 +56,6 @@ class IntegracaoApp(BaseWindow):
         self.stop_servico_motoristas: threading.Event | None = None
         self.stop_servico_afastamentos: threading.Event | None = None
 
-        self._cache_colunas: dict[str, dict[str, str]] = {}
         self._monitor_job: str | None = None
         self._closing = False
         self._busy_sync = 0
@@ -618,7 +618,7 @@ class IntegracaoApp(BaseWindow):
         ttk.Combobox(
             filtros,
             textvariable=self.lista_status_var,
-            values=("Todos", "PENDENTE", "PROCESSANDO", "PROCESSADO", "ERRO"),
+            values=("Todos", "PENDENTE", "PROCESSANDO", "PROCESSADO", "ERRO", "REJEITADO", "SUPERSEDIDO"),
             state="readonly",
             width=14,
         ).grid(row=0, column=3, padx=(6, 14), sticky="w")
@@ -1130,8 +1130,12 @@ class IntegracaoApp(BaseWindow):
         if not self.current_endpoints:
             raise ValueError("Cadastre ao menos um endpoint para a integracao.")
 
+        # A politica de retry nao tem campos no formulario: preserva a ja salva.
+        cfg_id = str(self.integracao_selected_id or "").strip()
+        existente = next((x for x in self.registry.list_configs() if x.id == cfg_id), None) if cfg_id else None
+
         return IntegracaoClienteApi(
-            id=str(self.integracao_selected_id or "").strip(),
+            id=cfg_id,
             nome=nome,
             fornecedor=(self.int_fornecedor_var.get() or "ATS_Log").strip() or "ATS_Log",
             base_url=(self.int_base_url_var.get() or "").strip(),
@@ -1140,6 +1144,7 @@ class IntegracaoApp(BaseWindow):
             senha=senha,
             timeout_seconds=max(1.0, timeout_seconds),
             endpoints=list(self.current_endpoints),
+            politica_retry=dict(existente.politica_retry) if existente is not None else {},
         )
 
     def _salvar_config_integracao(self) -> None:
@@ -1219,10 +1224,14 @@ class IntegracaoApp(BaseWindow):
 
         ep_id = str(self.endpoint_selected_id or "").strip()
         de_para_atual: list[dict[str, Any]] = []
+        concorrencia_atual = 1
+        requisicoes_por_segundo_atual = 0.0
         if ep_id:
             existente = next((x for x in self.current_endpoints if x.id == ep_id), None)
             if existente is not None:
                 de_para_atual = [dict(item) for item in (existente.de_para or []) if isinstance(item, dict)]
+                concorrencia_atual = existente.concorrencia
+                requisicoes_por_segundo_atual = existente.requisicoes_por_segundo
         novo = IntegracaoEndpoint(
             id=ep_id or str(uuid.uuid4()),
             tipo=tipo,
@@ -1230,6 +1239,8 @@ class IntegracaoApp(BaseWindow):
             tabela_destino=tabela,
             ativo=bool(self.int_endpoint_ativo_var.get()),
             de_para=de_para_atual,
+            concorrencia=concorrencia_atual,
+            requisicoes_por_segundo=requisicoes_por_segundo_atual,
         )
 
         atualizado = False
@@ -1915,7 +1926,7 @@ class IntegracaoApp(BaseWindow):
         self.engine_destino = None
         self.database_origem_atual = None
         self.database_destino_atual = None
-        self._cache_colunas.clear()
+        invalidar_metadados()
 
         self._set_status(f"Status: ambiente aplicado ({ambiente})")
         self._log_sync(f"Ambiente aplicado. Origem={db_origem}, WinSvc Sync M={sync_m}, A={sync_a}.")
@@ -1934,7 +1945,6 @@ class IntegracaoApp(BaseWindow):
         if self.engine_destino is None or self.database_destino_atual != database:
             self.engine_destino = ativar_engine(database)
             self.database_destino_atual = database
-            self._cache_colunas.clear()
 
     def _login(self) -> None:
         self._set_status("Status: autenticando API...")
@@ -2083,6 +2093,8 @@ class IntegracaoApp(BaseWindow):
                 processar_afastamentos=processa_a,
                 integration_config=cfg,
                 payload_mapping=ep.get("de_para"),
+                concorrencia=ep.get("concorrencia"),
+                requisicoes_por_segundo=ep.get("requisicoes_por_segundo"),
             )
 
             try:
@@ -2098,7 +2110,9 @@ class IntegracaoApp(BaseWindow):
             self._log_api(
                 f"[API] Endpoint tipo={ep.get('tipo')} path={ep.get('endpoint')} "
                 f"OkM={resultado.motoristas_sucesso} ErrM={resultado.motoristas_erro} "
-                f"OkA={resultado.afastamentos_sucesso} ErrA={resultado.afastamentos_erro}"
+                f"RejM={resultado.motoristas_rejeitados} "
+                f"OkA={resultado.afastamentos_sucesso} ErrA={resultado.afastamentos_erro} "
+                f"RejA={resultado.afastamentos_rejeitados}"
             )
 
         if endpoints_processados == 0:
@@ -2137,6 +2151,8 @@ class IntegracaoApp(BaseWindow):
                     "endpoint": endpoint_path,
                     "tabela_destino": str(ep.get("tabela_destino") or "").strip(),
                     "de_para": [dict(item) for item in (ep.get("de_para") or []) if isinstance(item, dict)],
+                    "concorrencia": ep.get("concorrencia"),
+                    "requisicoes_por_segundo": ep.get("requisicoes_por_segundo"),
                 }
             )
 
@@ -2507,7 +2523,7 @@ class IntegracaoApp(BaseWindow):
         select_parts = ["COUNT(1) AS total"]
 
         if "status" in resolved:
-            for status_name in ("PENDENTE", "PROCESSANDO", "PROCESSADO", "ERRO"):
+            for status_name in ("PENDENTE", "PROCESSANDO", "PROCESSADO", "ERRO", "REJEITADO", "SUPERSEDIDO"):
                 alias = status_name.lower()
                 select_parts.append(
                     f"SUM(CASE WHEN t.[{resolved['status']}] = '{status_name}' THEN 1 ELSE 0 END) AS [{alias}]"
@@ -2533,11 +2549,14 @@ class IntegracaoApp(BaseWindow):
         proc = int(resumo.get("processando") or 0)
         ok = int(resumo.get("processado") or 0)
         erro = int(resumo.get("erro") or 0)
+        rejeitado = int(resumo.get("rejeitado") or 0)
+        supersedido = int(resumo.get("supersedido") or 0)
         max_tent = int(resumo.get("max_tentativas") or 0)
         ultima = IntegracaoApp._format_datetime(resumo.get("ultima_data"))
         return (
             f"{prefixo}: total={total} pendente={pend} processando={proc} "
-            f"processado={ok} erro={erro} max_tent={max_tent} ultima={ultima}"
+            f"processado={ok} erro={erro} rejeitado={rejeitado} supersedido={supersedido} "
+            f"max_tent={max_tent} ultima={ultima}"
         )
     def _atualizar_lista_integracao(self, *, log_line: bool = True) -> None:
         self._set_status("Status: carregando lista de integracao...")
@@ -2837,30 +2856,12 @@ class IntegracaoApp(BaseWindow):
     def _carregar_colunas_tabela(self, table_name: str) -> dict[str, str]:
         self._ensure_engine_destino()
         table = self._safe_identifier(table_name, "Tabela")
-        cache_key = f"{self._database_destino().lower()}::{settings.target_schema.lower()}::{table.lower()}"
-
-        if cache_key in self._cache_colunas:
-            return self._cache_colunas[cache_key]
-
-        with self.engine_destino.connect() as conn:
-            rows = conn.execute(
-                text(
-                    """
-                    SELECT c.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.COLUMNS AS c
-                    WHERE c.TABLE_SCHEMA = :schema
-                    AND c.TABLE_NAME = :table_name
-                    """
-                ),
-                {"schema": settings.target_schema, "table_name": table},
-            ).scalars().all()
-
+        # Cache de catalogo do processo, compartilhado com os servicos da fila.
+        rows = colunas_tabela(self.engine_destino, settings.target_schema, table)
         if not rows:
             raise ValueError(f"Tabela nao encontrada: [{settings.target_schema}].[{table}]")
 
-        mapped = {self._normalize_key(col): col for col in rows}
-        self._cache_colunas[cache_key] = mapped
-        return mapped
+        return {self._normalize_key(col): col for col in rows}
 
     @staticmethod
     def _normalize_key(value: str) -> str:
@@ -1,17 +1,42 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+from urllib.parse import quote_plus
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
 from config.settings import settings
-from urllib.parse import quote_plus
 
+# Conexoes alem dos workers de envio: ciclo principal, captura do pipeline,
+# heartbeat do lease e threads de fundo da interface.
+_CONEXOES_EXTRAS_POOL = 4
+_POOL_SIZE_MINIMO = 5
 
-def _resolver_driver_odbc(driver_configurado: str) -> str:
-    preferido = (driver_configurado or "").strip()
+_ENGINES: dict[tuple[Any, ...], Engine] = {}
+_ENGINES_LOCK = threading.Lock()
 
+
+@lru_cache(maxsize=1)
+def _drivers_instalados() -> tuple[str, ...]:
     try:
         import pyodbc
     except Exception as exc:
         raise RuntimeError("Modulo pyodbc indisponivel para conexao SQL Server.") from exc
 
-    instalados = [d.strip() for d in pyodbc.drivers() if d and d.strip()]
+    return tuple(d.strip() for d in pyodbc.drivers() if d and d.strip())
+
+
+def _resolver_driver_odbc(driver_configurado: str) -> str:
+    preferido = (driver_configurado or "").strip()
+
+    instalados = list(_drivers_instalados())
 
     if preferido and preferido in instalados:
         return preferido
@@ -39,8 +64,94 @@ def _resolver_driver_odbc(driver_configurado: str) -> str:
     )
 
 
-def ativar_engine(database: str):
+@dataclass
+class EstatisticasPool:
+    checkouts: int = 0
+    esperas: int = 0
+    espera_total_segundos: float = 0.0
+    espera_maxima_segundos: float = 0.0
+    timeouts: int = 0
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def registrar(self, espera: float, *, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            # Abaixo de 1ms a conexao estava livre no pool: nao conta como espera.
+            if espera >= 0.001:
+                self.esperas += 1
+                self.espera_total_segundos += espera
+                self.espera_maxima_segundos = max(self.espera_maxima_segundos, espera)
+
+
+class _PoolMedido(QueuePool):
+    # QueuePool que mede quanto cada checkout esperou por uma conexao livre.
+    estatisticas: EstatisticasPool | None = None
 
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            if self.estatisticas is not None:
+                self.estatisticas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        if self.estatisticas is not None:
+            self.estatisticas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+    def recreate(self):
+        # engine.dispose() recria o pool; as estatisticas continuam acumulando.
+        novo = super().recreate()
+        novo.estatisticas = self.estatisticas
+        return novo
+
+
+def _pool_size_padrao(concorrencia: int | None) -> int:
+    if settings.db_pool_size > 0:
+        return int(settings.db_pool_size)
+    workers = settings.api_sync_concorrencia if concorrencia is None else concorrencia
+    return max(_POOL_SIZE_MINIMO, max(1, int(workers)) + _CONEXOES_EXTRAS_POOL)
+
+
+def ativar_engine(
+    database: str,
+    *,
+    pool_size: int | None = None,
+    max_overflow: int | None = None,
+    pool_recycle: int | None = None,
+    fast_executemany: bool | None = None,
+    concorrencia: int | None = None,
+) -> Engine:
+    # Uma engine (e um pool) por servidor/banco/opcoes no processo; sem
+    # pool_size explicito o pool acompanha a concorrencia de envio.
+    opcoes = (
+        int(pool_size if pool_size is not None else _pool_size_padrao(concorrencia)),
+        int(max_overflow if max_overflow is not None else settings.db_max_overflow),
+        int(pool_recycle if pool_recycle is not None else settings.db_pool_recycle_seconds),
+        bool(settings.db_fast_executemany if fast_executemany is None else fast_executemany),
+    )
+    chave = (settings.db_server, (database or "").strip(), settings.db_user, settings.db_driver, *opcoes)
+
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(chave)
+        if engine is None:
+            engine = _criar_engine(chave[1], *opcoes)
+            _ENGINES[chave] = engine
+        return engine
+
+
+def _criar_engine(
+    database: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_recycle: int,
+    fast_executemany: bool,
+) -> Engine:
     driver = quote_plus(_resolver_driver_odbc(settings.db_driver))
     user = quote_plus(settings.db_user)
     pwd = quote_plus(settings.db_password)
@@ -48,7 +159,50 @@ def ativar_engine(database: str):
 
     params = f"driver={driver}&Encrypt={settings.db_encrypt}&TrustServerCertificate={settings.db_trust_cert}"
     url = f"mssql+pyodbc://{user}:{pwd}@{server}/{database}?{params}"
-    return create_engine(url, pool_pre_ping=True)
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        poolclass=_PoolMedido,
+        pool_size=max(1, pool_size),
+        max_overflow=max(0, max_overflow),
+        pool_timeout=max(1.0, float(settings.db_pool_timeout_seconds)),
+        pool_recycle=pool_recycle if pool_recycle > 0 else -1,
+        fast_executemany=fast_executemany,
+    )
+    engine.pool.estatisticas = EstatisticasPool()
+    return engine
+
+
+def estatisticas_pools() -> dict[str, dict[str, Any]]:
+    with _ENGINES_LOCK:
+        engines = list(_ENGINES.items())
+
+    resultado: dict[str, dict[str, Any]] = {}
+    for chave, engine in engines:
+        pool = engine.pool
+        estatisticas = getattr(pool, "estatisticas", None) or EstatisticasPool()
+        resultado[f"{chave[0]}/{chave[1]}"] = {
+            "pool_size": pool.size(),
+            "em_uso": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": estatisticas.checkouts,
+            "esperas": estatisticas.esperas,
+            "espera_media_segundos": (
+                estatisticas.espera_total_segundos / estatisticas.esperas if estatisticas.esperas else 0.0
+            ),
+            "espera_maxima_segundos": estatisticas.espera_maxima_segundos,
+            "timeouts": estatisticas.timeouts,
+        }
+    return resultado
+
+
+def descartar_engines() -> None:
+    with _ENGINES_LOCK:
+        engines = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        engine.dispose()
+
 
 def engines_do_dbo():
     return {db: ativar_engine(db) for db in settings.databases()}
@@ -18,6 +18,8 @@ class IntegracaoEndpoint:
     tabela_destino: str
     ativo: bool = True
     de_para: list[dict[str, Any]] = field(default_factory=list)
+    concorrencia: int = 1
+    requisicoes_por_segundo: float = 0.0
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -27,6 +29,8 @@ class IntegracaoEndpoint:
             "tabela_destino": self.tabela_destino,
             "ativo": self.ativo,
             "de_para": [dict(item) for item in (self.de_para or []) if isinstance(item, dict)],
+            "concorrencia": self.concorrencia,
+            "requisicoes_por_segundo": self.requisicoes_por_segundo,
         }
 
 
@@ -41,6 +45,7 @@ class IntegracaoClienteApi:
     senha: str
     timeout_seconds: float
     endpoints: list[IntegracaoEndpoint] = field(default_factory=list)
+    politica_retry: dict[str, dict[str, Any]] = field(default_factory=dict)
 
     def to_runtime_dict(self) -> dict[str, Any]:
         return {
@@ -53,6 +58,7 @@ class IntegracaoClienteApi:
             "senha": self.senha,
             "timeout_seconds": self.timeout_seconds,
             "endpoints": [ep.to_dict() for ep in self.endpoints],
+            "politica_retry": {status: dict(regra) for status, regra in (self.politica_retry or {}).items()},
         }
 
 
@@ -94,6 +100,7 @@ class IntegracaoRegistry:
             payload = asdict(item)
             payload["id"] = str(payload.get("id") or "").strip() or str(uuid.uuid4())
             payload["timeout_seconds"] = float(payload.get("timeout_seconds") or settings.api_timeout_seconds)
+            payload["politica_retry"] = self._sanitize_politica_retry(payload.get("politica_retry"))
 
             eps = payload.get("endpoints") or []
             clean_eps: list[dict[str, Any]] = []
@@ -113,6 +120,10 @@ class IntegracaoRegistry:
                         "tabela_destino": str(ep.get("tabela_destino") or "").strip(),
                         "ativo": bool(ep.get("ativo", True)),
                         "de_para": de_para,
+                        "concorrencia": IntegracaoRegistry._sanitize_concorrencia(ep.get("concorrencia")),
+                        "requisicoes_por_segundo": IntegracaoRegistry._sanitize_requisicoes_por_segundo(
+                            ep.get("requisicoes_por_segundo")
+                        ),
                     }
                 )
             payload["endpoints"] = clean_eps
@@ -256,6 +267,10 @@ class IntegracaoRegistry:
                     tabela_destino=str(ep.get("tabela_destino") or "").strip(),
                     ativo=bool(ep.get("ativo", True)),
                     de_para=IntegracaoRegistry._sanitize_de_para(ep.get("de_para")),
+                    concorrencia=IntegracaoRegistry._sanitize_concorrencia(ep.get("concorrencia")),
+                    requisicoes_por_segundo=IntegracaoRegistry._sanitize_requisicoes_por_segundo(
+                        ep.get("requisicoes_por_segundo")
+                    ),
                 )
             )
 
@@ -269,8 +284,56 @@ class IntegracaoRegistry:
             senha=str(raw.get("senha") or "").strip(),
             timeout_seconds=float(raw.get("timeout_seconds") or 30.0),
             endpoints=endpoints,
+            politica_retry=IntegracaoRegistry._sanitize_politica_retry(raw.get("politica_retry")),
         )
 
+    @staticmethod
+    def _sanitize_concorrencia(value: Any) -> int:
+        try:
+            return max(1, min(64, int(value)))
+        except Exception:
+            return 1
+
+    @staticmethod
+    def _sanitize_requisicoes_por_segundo(value: Any) -> float:
+        # 0 desliga o limite de taxa do endpoint.
+        try:
+            return max(0.0, min(1000.0, float(value or 0)))
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def _sanitize_politica_retry(raw: Any) -> dict[str, dict[str, Any]]:
+        # Chave: status exato ("429"), classe ("5xx") ou "conexao" (sem resposta HTTP).
+        # Regra: base_segundos, max_segundos, respeitar_retry_after e permanente
+        # (rejeita sem nova tentativa), todos opcionais.
+        if not isinstance(raw, dict):
+            return {}
+
+        politica: dict[str, dict[str, Any]] = {}
+        for chave_raw, regra_raw in raw.items():
+            chave = str(chave_raw or "").strip().lower()
+            valida = chave == "conexao" or (
+                len(chave) == 3 and chave[0] in "12345" and (chave[1:].isdigit() or chave[1:] == "xx")
+            )
+            if not valida or not isinstance(regra_raw, dict):
+                continue
+
+            regra: dict[str, Any] = {}
+            for campo in ("base_segundos", "max_segundos"):
+                if regra_raw.get(campo) in (None, ""):
+                    continue
+                try:
+                    regra[campo] = max(1, int(regra_raw[campo]))
+                except Exception:
+                    continue
+            for campo in ("respeitar_retry_after", "permanente"):
+                if campo in regra_raw:
+                    regra[campo] = bool(regra_raw[campo])
+            if regra:
+                politica[chave] = regra
+        return politica
+
     @staticmethod
     def _sanitize_de_para(raw_rules: Any) -> list[dict[str, Any]]:
         if not isinstance(raw_rules, list):
@@ -51,6 +51,12 @@ class Settings(BaseModel):
     db_driver: str = Field(default="ODBC Driver 17 for SQL Server", alias="DB_DRIVER")
     db_encrypt: str = Field(default="yes", alias="DB_ENCRYPT")
     db_trust_cert: str = Field(default="yes", alias="DB_TRUST_CERT")
+    db_pool_size: int = Field(default=0, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=30.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_fast_executemany: bool = Field(default=True, alias="DB_FAST_EXECUTEMANY")
+    db_metadados_ttl_seconds: float = Field(default=3600.0, alias="DB_METADADOS_TTL_SECONDS")
 
     api_login_url: str = Field(default="", alias="API_LOGIN_URL")
     api_user: str = Field(default="", alias="API_USER")
@@ -66,6 +72,24 @@ class Settings(BaseModel):
     api_sync_lock_timeout_minutes: int = Field(default=15, alias="API_SYNC_LOCK_TIMEOUT_MINUTES")
     api_sync_retry_base_seconds: int = Field(default=60, alias="API_SYNC_RETRY_BASE_SECONDS")
     api_sync_retry_max_seconds: int = Field(default=3600, alias="API_SYNC_RETRY_MAX_SECONDS")
+    api_sync_concorrencia: int = Field(default=1, alias="API_SYNC_CONCORRENCIA")
+    api_sync_requisicoes_por_segundo: float = Field(default=0.0, alias="API_SYNC_REQUISICOES_POR_SEGUNDO")
+    api_sync_pipeline_profundidade: int = Field(default=0, alias="API_SYNC_PIPELINE_PROFUNDIDADE")
+    api_sync_pipeline_max_lotes: int = Field(default=20, alias="API_SYNC_PIPELINE_MAX_LOTES")
+    api_sync_lote_adaptativo: bool = Field(default=False, alias="API_SYNC_LOTE_ADAPTATIVO")
+    api_sync_lote_minimo: int = Field(default=10, alias="API_SYNC_LOTE_MINIMO")
+    api_sync_lote_maximo: int = Field(default=1000, alias="API_SYNC_LOTE_MAXIMO")
+    api_sync_lote_fracao_lock_timeout: float = Field(default=0.25, alias="API_SYNC_LOTE_FRACAO_LOCK_TIMEOUT")
+    api_sync_cache_dict_ttl_seconds: int = Field(default=300, alias="API_SYNC_CACHE_DICT_TTL_SECONDS")
+    api_sync_disjuntor_falhas: int = Field(default=5, alias="API_SYNC_DISJUNTOR_FALHAS")
+    api_sync_disjuntor_espera_segundos: float = Field(default=60.0, alias="API_SYNC_DISJUNTOR_ESPERA_SEGUNDOS")
+    api_sync_supersedir_eventos: bool = Field(default=True, alias="API_SYNC_SUPERSEDIR_EVENTOS")
+    api_sync_prazo_parada_segundos: float = Field(default=20.0, alias="API_SYNC_PRAZO_PARADA_SEGUNDOS")
+    api_sync_lease_intervalo_segundos: float = Field(default=0.0, alias="API_SYNC_LEASE_INTERVALO_SEGUNDOS")
+    api_token_cache_file: str = Field(default="api_tokens.json", alias="API_TOKEN_CACHE_FILE")
+    api_token_refresh_margin_seconds: int = Field(default=120, alias="API_TOKEN_REFRESH_MARGIN_SECONDS")
+    api_login_url_cache_file: str = Field(default="api_login_urls.json", alias="API_LOGIN_URL_CACHE_FILE")
+    api_login_connect_timeout_seconds: float = Field(default=5.0, alias="API_LOGIN_CONNECT_TIMEOUT_SECONDS")
     api_default_cidade: str = Field(default="NAO INFORMADO", alias="API_DEFAULT_CIDADE")
     api_default_uf: str = Field(default="SC", alias="API_DEFAULT_UF")
     api_motorista_sindicato_codigo: str = Field(default="273", alias="API_MOTORISTA_SINDICATO_CODIGO")
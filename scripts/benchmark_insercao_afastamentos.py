@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+# Compara a insercao em massa (tabela temporaria + INSERT...SELECT) com o
+# caminho linha a linha de RepositorioAfastamento.inserir_eventos, numa copia
+# vazia da fila criada so para o teste. Nao roda no CI: precisa de SQL Server.
+
+
+def _aplicar_overrides_de_conexao(argv: list[str]) -> list[str]:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--db-server")
+    parser.add_argument("--db-user")
+    parser.add_argument("--db-password")
+    parser.add_argument("--db-driver")
+    parser.add_argument("--db-encrypt")
+    parser.add_argument("--db-trust-cert")
+    args, restantes = parser.parse_known_args(argv)
+
+    mapping = {
+        "DB_SERVER": args.db_server,
+        "DB_USER": args.db_user,
+        "DB_PASSWORD": args.db_password,
+        "DB_DRIVER": args.db_driver,
+        "DB_ENCRYPT": args.db_encrypt,
+        "DB_TRUST_CERT": args.db_trust_cert,
+    }
+    for chave, valor in mapping.items():
+        if valor is not None:
+            os.environ[chave] = valor
+
+    return restantes
+
+
+def _gerar_eventos(quantidade: int, semente: int) -> list[dict[str, Any]]:
+    # Eventos sinteticos com chaves distintas (nenhum barrado pelo dedup) e
+    # payload do tamanho tipico gerado pelo sync de afastamentos.
+    inicio = date(2020, 1, 1)
+    eventos: list[dict[str, Any]] = []
+    for n in range(quantidade):
+        dataafastamento = inicio + timedelta(days=n % 1500)
+        payload = {
+            "cpf": f"{(semente * 1_000_000 + n) % 10**11:011d}",
+            "descricao": "Afastamento benchmark",
+            "descricaodasituacao": "Ferias",
+            "datainicio": dataafastamento.isoformat(),
+            "datafim": (dataafastamento + timedelta(days=10)).isoformat(),
+            "empregador": {"nome": "Empresa Benchmark", "cnpj": "00000000000191"},
+        }
+        payload_json = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        eventos.append(
+            {
+                "numempresa": 1,
+                "tipocolaborador": 1,
+                "numorigem": semente * 1_000_000 + n,
+                "dataafastamento": dataafastamento,
+                "situacao": 2,
+                "descricao": "Afastamento benchmark",
+                "descricao_situacao": "Ferias",
+                "operacao": "UPSERT",
+                "evento_tipo": "AFASTAMENTO_UPSERT",
+                "versao_payload": "v1",
+                "hash_payload": hashlib.sha256(payload_json.encode("utf-8")).digest(),
+                "payload_json": payload_json,
+                "status": "PENDENTE",
+                "tentativas": 0,
+                "origem_tabela": "R038AFA",
+                "origem_sistema": "Benchmark",
+            }
+        )
+    return eventos
+
+
+def main() -> None:
+    argv = _aplicar_overrides_de_conexao(sys.argv[1:])
+
+    try:
+        from sqlalchemy import text
+
+        import Consultas_dbo.cadastrei.afastamento as modulo_afastamento
+        from Consultas_dbo.cadastrei.afastamento import RepositorioAfastamento
+        from Consultas_dbo.metadados import invalidar_metadados
+        from config.engine import ativar_engine
+        from config.settings import settings
+    except Exception as exc:
+        raise SystemExit(
+            "Falha ao carregar configuracao. "
+            "Defina DB_SERVER/DB_USER/DB_PASSWORD no .env ou passe via CLI "
+            "(--db-server --db-user --db-password). "
+            f"Detalhe: {exc}"
+        )
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark da insercao de eventos de afastamento: em massa x linha a linha"
+    )
+    parser.add_argument("--destino-db", default=settings.target_database)
+    parser.add_argument("--schema-destino", default=settings.target_schema)
+    parser.add_argument("--tabela-afastamento", default=settings.target_afastamento_table)
+    parser.add_argument(
+        "--tabela-benchmark",
+        default="AfastamentoBenchmark",
+        help="Copia vazia da fila usada no teste (criada e removida pelo script).",
+    )
+    parser.add_argument("--tamanhos", default="1000,10000,50000")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--manter-tabela", action="store_true")
+    args = parser.parse_args(argv)
+
+    schema = (args.schema_destino or "").strip() or settings.target_schema
+    origem = (args.tabela_afastamento or "").strip() or settings.target_afastamento_table
+    tabela = (args.tabela_benchmark or "").strip()
+    tamanhos = [int(parte) for parte in str(args.tamanhos).split(",") if parte.strip()]
+    repeticoes = max(1, int(args.repeticoes))
+    engine = ativar_engine((args.destino_db or "").strip() or settings.target_database)
+    # Valida schema/tabelas antes de montar o DDL.
+    repo = RepositorioAfastamento(engine, schema=schema, table_name=tabela)
+    RepositorioAfastamento(engine, schema=schema, table_name=origem)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"IF OBJECT_ID(N'[{schema}].[{tabela}]', 'U') IS NOT NULL DROP TABLE [{schema}].[{tabela}]"))
+        conn.execute(text(f"SELECT TOP (0) * INTO [{schema}].[{tabela}] FROM [{schema}].[{origem}]"))
+        # Mesmo apoio do UX_Afastamento_Idem ao NOT EXISTS, sem unicidade.
+        conn.execute(
+            text(
+                f"""
+                CREATE INDEX [IX_{tabela}_Idem] ON [{schema}].[{tabela}] (
+                    [NumeroDaEmpresa], [TipoDeColaborador], [NumeroDeOrigemDoColaborador],
+                    [DataDoAfastamento], [Situacao], [HashPayload], [Status]
+                )
+                """
+            )
+        )
+    invalidar_metadados(engine, schema, tabela)
+    minimo_em_massa = modulo_afastamento._MIN_EVENTOS_INSERCAO_EM_MASSA
+
+    def _medir(eventos: list[dict[str, Any]], *, em_massa: bool) -> float:
+        with engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE TABLE [{schema}].[{tabela}]"))
+        # Linha a linha = limite da insercao em massa acima do tamanho do lote.
+        modulo_afastamento._MIN_EVENTOS_INSERCAO_EM_MASSA = minimo_em_massa if em_massa else len(eventos) + 1
+        try:
+            inicio = time.perf_counter()
+            inseridos = repo.inserir_eventos(eventos)
+            duracao = time.perf_counter() - inicio
+        finally:
+            modulo_afastamento._MIN_EVENTOS_INSERCAO_EM_MASSA = minimo_em_massa
+        if inseridos != len(eventos):
+            raise SystemExit(f"Inseridos {inseridos} de {len(eventos)} eventos; benchmark invalido.")
+        return duracao
+
+    print(f"{'eventos':>8} {'modo':<12} {'melhor_s':>9} {'mediana_s':>9} {'eventos/s':>10}")
+    try:
+        for tamanho in tamanhos:
+            eventos = _gerar_eventos(tamanho, semente=tamanho)
+            medianas: dict[str, float] = {}
+            for modo, em_massa in (("linha", False), ("em_massa", True)):
+                duracoes = sorted(_medir(eventos, em_massa=em_massa) for _ in range(repeticoes))
+                mediana = duracoes[len(duracoes) // 2]
+                medianas[modo] = mediana
+                print(
+                    f"{tamanho:>8} {modo:<12} {duracoes[0]:>9.3f} {mediana:>9.3f} "
+                    f"{tamanho / mediana if mediana > 0 else 0:>10.0f}"
+                )
+            ganho = medianas["linha"] / medianas["em_massa"] if medianas["em_massa"] > 0 else 0
+            print(f"{tamanho:>8} {'ganho':<12} {ganho:>9.1f}x")
+    finally:
+        if not args.manter_tabela:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE [{schema}].[{tabela}]"))
+            invalidar_metadados(engine, schema, tabela)
+
+
+if __name__ == "__main__":
+    main()
@@ -65,6 +65,7 @@ def main() -> None:
     parser.add_argument("--retry-base-sec", type=int, default=settings.api_sync_retry_base_seconds)
     parser.add_argument("--retry-max-sec", type=int, default=settings.api_sync_retry_max_seconds)
     parser.add_argument("--timeout-api", type=float, default=settings.api_timeout_seconds)
+    parser.add_argument("--concorrencia", type=int, default=settings.api_sync_concorrencia)
     parser.add_argument("--uma-vez", action="store_true")
     args = parser.parse_args(argv)
 
@@ -84,6 +85,7 @@ def main() -> None:
         retry_base_seconds=args.retry_base_sec,
         retry_max_seconds=args.retry_max_sec,
         api_timeout_seconds=args.timeout_api,
+        concorrencia=args.concorrencia,
     )
 
     try:
@@ -96,9 +98,11 @@ def main() -> None:
                 f"CapM={resultado.motoristas_capturados}",
                 f"OkM={resultado.motoristas_sucesso}",
                 f"ErrM={resultado.motoristas_erro}",
+                f"RejM={resultado.motoristas_rejeitados}",
                 f"CapA={resultado.afastamentos_capturados}",
                 f"OkA={resultado.afastamentos_sucesso}",
                 f"ErrA={resultado.afastamentos_erro}",
+                f"RejA={resultado.afastamentos_rejeitados}",
             )
             return
 
@@ -113,6 +117,7 @@ def main() -> None:
             f"lote_m={max(1, args.batch_motoristas)}",
             f"lote_a={max(1, args.batch_afastamentos)}",
             f"max_tentativas={max(1, args.max_tentativas)}",
+            f"concorrencia={max(1, args.concorrencia)}",
         )
         service.executar_continuo(intervalo_segundos=args.intervalo, logger=print)
     finally:
@@ -80,6 +80,31 @@ def _carregar_config_api(*, registry_file: str, cliente_id: str, usar_registry:
     return active.to_runtime_dict() if active else None
 
 
+def _concorrencia_pool(args: argparse.Namespace) -> int:
+    # O pool do banco acompanha a maior concorrencia configurada: a do CLI e a
+    # de cada endpoint de afastamentos no registry (que pode chegar a 64).
+    maior = max(1, int(args.concorrencia))
+    try:
+        cfg_api = _carregar_config_api(
+            registry_file=args.registry_file,
+            cliente_id=args.cliente_id,
+            usar_registry=not bool(args.sem_registry),
+        )
+    except Exception:
+        return maior
+
+    for ep in (cfg_api or {}).get("endpoints") or []:
+        if not isinstance(ep, dict) or not bool(ep.get("ativo", True)):
+            continue
+        if _normalizar_tipo_endpoint(str(ep.get("tipo") or "")) not in {"afastamentos", "afastamento"}:
+            continue
+        try:
+            maior = max(maior, int(ep.get("concorrencia") or 0))
+        except (TypeError, ValueError):
+            continue
+    return maior
+
+
 def _listar_endpoints_afastamentos(
     cfg: dict[str, Any] | None,
     *,
@@ -98,6 +123,8 @@ def _listar_endpoints_afastamentos(
                 "endpoint": forced_endpoint,
                 "tabela_destino": tabela_padrao,
                 "de_para": [],
+                "concorrencia": None,
+                "requisicoes_por_segundo": None,
             }
         ]
 
@@ -133,6 +160,8 @@ def _listar_endpoints_afastamentos(
                 "endpoint": endpoint_path,
                 "tabela_destino": str(ep.get("tabela_destino") or "").strip(),
                 "de_para": [dict(item) for item in (ep.get("de_para") or []) if isinstance(item, dict)],
+                "concorrencia": ep.get("concorrencia"),
+                "requisicoes_por_segundo": ep.get("requisicoes_por_segundo"),
             }
         )
 
@@ -176,13 +205,14 @@ def _executar_ciclo_por_endpoints(
     retry_base_sec: int,
     retry_max_sec: int,
     timeout_api: float,
+    concorrencia: int,
     cfg_api: dict[str, Any] | None,
     endpoint_override: str,
     endpoint_id: str,
     logger,
+    servicos: Any,
 ) -> dict[str, int]:
     from config.settings import settings
-    from src.integradora.api_dispatch_service import ApiDispatchService
 
     endpoints = _listar_endpoints_afastamentos(
         cfg_api,
@@ -200,13 +230,22 @@ def _executar_ciclo_por_endpoints(
         "capturados": 0,
         "sucesso": 0,
         "erro": 0,
+        "rejeitados": 0,
+        "lotes_cheios": 0,
     }
 
+    servicos.iniciar_ciclo()
     for ep in endpoints:
+        if servicos.parando:
+            break
         tabela_destino = str(ep.get("tabela_destino") or "").strip() or tabela_afastamento
         de_para = [dict(item) for item in (ep.get("de_para") or []) if isinstance(item, dict)]
+        concorrencia_ep = int(ep.get("concorrencia") or 0) or concorrencia
 
-        service = ApiDispatchService(
+        service = servicos.obter(
+            cliente=str((cfg_api or {}).get("id") or ""),
+            endpoint=str(ep.get("id") or ep.get("endpoint") or ""),
+            tabela=tabela_destino,
             engine_destino=engine_destino,
             schema_destino=schema_destino,
             tabela_motorista=settings.target_motorista_table,
@@ -224,29 +263,36 @@ def _executar_ciclo_por_endpoints(
             processar_afastamentos=True,
             integration_config=cfg_api,
             payload_mapping=de_para,
+            concorrencia=concorrencia_ep,
+            requisicoes_por_segundo=ep.get("requisicoes_por_segundo"),
         )
 
-        try:
-            resultado = service.executar_ciclo()
-        finally:
-            service.close()
+        resultado = service.executar_ciclo()
 
         total["endpoints"] += 1
         total["locks"] += int(resultado.locks_liberados_afastamentos or 0)
         total["capturados"] += int(resultado.afastamentos_capturados or 0)
+        if resultado.afastamentos_lote_cheio:
+            total["lotes_cheios"] += 1
         total["sucesso"] += int(resultado.afastamentos_sucesso or 0)
         total["erro"] += int(resultado.afastamentos_erro or 0)
+        total["rejeitados"] += int(resultado.afastamentos_rejeitados or 0)
 
         logger(
             "[API Afastamentos] "
             f"endpoint_id={ep.get('id') or '-'} "
             f"path={ep.get('endpoint')} "
             f"de_para={len(de_para)} "
+            f"concorrencia={concorrencia_ep} "
+            f"rps={float(ep.get('requisicoes_por_segundo') or 0) or '-'} "
             f"CapA={resultado.afastamentos_capturados} "
             f"OkA={resultado.afastamentos_sucesso} "
-            f"ErrA={resultado.afastamentos_erro}"
+            f"ErrA={resultado.afastamentos_erro} "
+            f"RejA={resultado.afastamentos_rejeitados}"
+            + "".join(f" {ajuste}" for ajuste in resultado.ajustes_lote)
         )
 
+    servicos.encerrar_ciclo()
     return total
 
 
@@ -256,6 +302,9 @@ def main() -> None:
     try:
         from config.engine import ativar_engine
         from config.settings import settings
+        from src.integradora.agendador import AgendadorCiclos
+        from src.integradora.api_dispatch_registry import RegistroServicosApi
+        from src.integradora.parada import instalar_parada_graciosa
     except Exception as exc:
         raise SystemExit(
             "Falha ao carregar configuracao. "
@@ -302,13 +351,24 @@ def main() -> None:
     parser.add_argument("--retry-base-sec", type=int, default=settings.api_sync_retry_base_seconds)
     parser.add_argument("--retry-max-sec", type=int, default=settings.api_sync_retry_max_seconds)
     parser.add_argument("--timeout-api", type=float, default=settings.api_timeout_seconds)
+    parser.add_argument(
+        "--concorrencia",
+        type=int,
+        default=settings.api_sync_concorrencia,
+        help="Envios simultaneos por lote quando o endpoint nao define 'concorrencia' no registry.",
+    )
     parser.add_argument("--log-file", default="logs/api_afastamentos.log")
     parser.add_argument("--uma-vez", action="store_true")
     args = parser.parse_args(argv)
 
     logger = _logger_com_arquivo(Path(args.log_file))
-    engine_destino = ativar_engine((args.destino_db or "").strip() or settings.target_database)
+    engine_destino = ativar_engine(
+        (args.destino_db or "").strip() or settings.target_database,
+        concorrencia=_concorrencia_pool(args),
+    )
     intervalo = max(1, int(args.intervalo))
+    servicos = RegistroServicosApi()
+    parada = instalar_parada_graciosa(servicos.solicitar_parada)
 
     def _rodar_um_ciclo() -> dict[str, int]:
         cfg_api = _carregar_config_api(
@@ -327,21 +387,27 @@ def main() -> None:
             retry_base_sec=max(1, int(args.retry_base_sec)),
             retry_max_sec=max(1, int(args.retry_max_sec)),
             timeout_api=max(1.0, float(args.timeout_api)),
+            concorrencia=max(1, int(args.concorrencia)),
             cfg_api=cfg_api,
             endpoint_override=(args.endpoint_afastamento or "").strip(),
             endpoint_id=(args.endpoint_id or "").strip(),
             logger=logger,
+            servicos=servicos,
         )
 
     if args.uma_vez:
-        resumo = _rodar_um_ciclo()
+        try:
+            resumo = _rodar_um_ciclo()
+        finally:
+            servicos.close()
         logger(
             "Ciclo API Afastamentos concluido: "
             f"Endpoints={resumo['endpoints']} "
             f"LockA={resumo['locks']} "
             f"CapA={resumo['capturados']} "
             f"OkA={resumo['sucesso']} "
-            f"ErrA={resumo['erro']}"
+            f"ErrA={resumo['erro']} "
+            f"RejA={resumo['rejeitados']}"
         )
         return
 
@@ -351,6 +417,7 @@ def main() -> None:
         f"intervalo={intervalo}s "
         f"lote={max(1, int(args.batch_afastamentos))} "
         f"max_tentativas={max(1, int(args.max_tentativas))} "
+        f"concorrencia={max(1, int(args.concorrencia))} "
         f"registry={'OFF' if args.sem_registry else 'ON'} "
         f"cliente_id={(args.cliente_id or '').strip() or 'active_id'} "
         f"endpoint_id={(args.endpoint_id or '').strip() or '-'} "
@@ -358,25 +425,36 @@ def main() -> None:
         f"log={Path(args.log_file).resolve()}"
     )
 
-    while True:
-        started = time.time()
-        try:
-            resumo = _rodar_um_ciclo()
-            logger(
-                "Ciclo API Afastamentos: "
-                f"Endpoints={resumo['endpoints']} "
-                f"LockA={resumo['locks']} "
-                f"CapA={resumo['capturados']} "
-                f"OkA={resumo['sucesso']} "
-                f"ErrA={resumo['erro']}"
-            )
-        except Exception as exc:
-            logger(f"ERRO: {exc}")
-
-        elapsed = time.time() - started
-        sleep_for = intervalo - elapsed
-        if sleep_for > 0:
-            time.sleep(sleep_for)
+    agendador = AgendadorCiclos(intervalo)
+    try:
+        while not parada.is_set():
+            started = time.time()
+            try:
+                resumo = _rodar_um_ciclo()
+                sleep_for = agendador.registrar_ciclo(
+                    itens=resumo["capturados"],
+                    lote_cheio=resumo["lotes_cheios"] > 0,
+                    inicio=started,
+                )
+                logger(
+                    "Ciclo API Afastamentos: "
+                    f"Endpoints={resumo['endpoints']} "
+                    f"LockA={resumo['locks']} "
+                    f"CapA={resumo['capturados']} "
+                    f"OkA={resumo['sucesso']} "
+                    f"ErrA={resumo['erro']} "
+                    f"RejA={resumo['rejeitados']} "
+                    f"{agendador.resumo(sleep_for)}"
+                )
+            except Exception as exc:
+                logger(f"ERRO: {exc}")
+                sleep_for = intervalo - (time.time() - started)
+
+            if sleep_for > 0 and parada.wait(sleep_for):
+                break
+        logger("Servico API Afastamentos encerrado: eventos nao enviados devolvidos a fila.")
+    finally:
+        servicos.close()
 
 
 if __name__ == "__main__":
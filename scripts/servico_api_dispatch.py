@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 from datetime import datetime
 import os
 from pathlib import Path
@@ -51,9 +52,10 @@ def main() -> None:
     argv = _aplicar_overrides_de_conexao(sys.argv[1:])
 
     try:
-        from config.engine import ativar_engine
+        from config.engine import ativar_engine, estatisticas_pools
         from config.settings import settings
         from src.integradora.api_dispatch_service import ApiDispatchService
+        from src.integradora.parada import instalar_parada_graciosa
     except Exception as exc:
         raise SystemExit(
             "Falha ao carregar configuracao. "
@@ -79,13 +81,28 @@ def main() -> None:
     parser.add_argument("--retry-base-sec", type=int, default=settings.api_sync_retry_base_seconds)
     parser.add_argument("--retry-max-sec", type=int, default=settings.api_sync_retry_max_seconds)
     parser.add_argument("--timeout-api", type=float, default=settings.api_timeout_seconds)
+    parser.add_argument("--concorrencia", type=int, default=settings.api_sync_concorrencia)
+    parser.add_argument(
+        "--assincrono",
+        action="store_true",
+        help="Usa o motor asyncio (httpx.AsyncClient); --concorrencia vira o limite de requisicoes em voo.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=settings.api_sync_pipeline_profundidade,
+        help="Lotes capturados antecipadamente enquanto o atual e enviado (0 desliga; apenas modo threads).",
+    )
     parser.add_argument("--log-file", default="logs/api_dispatch.log")
     parser.add_argument("--uma-vez", action="store_true")
     args = parser.parse_args(argv)
 
     logger = _logger_com_arquivo(Path(args.log_file))
 
-    engine_destino = ativar_engine((args.destino_db or "").strip() or settings.target_database)
+    engine_destino = ativar_engine(
+        (args.destino_db or "").strip() or settings.target_database,
+        concorrencia=args.concorrencia,
+    )
     service = ApiDispatchService(
         engine_destino=engine_destino,
         schema_destino=(args.schema_destino or "").strip() or settings.target_schema,
@@ -100,41 +117,102 @@ def main() -> None:
         retry_base_seconds=args.retry_base_sec,
         retry_max_seconds=args.retry_max_sec,
         api_timeout_seconds=args.timeout_api,
+        concorrencia=args.concorrencia,
+        pipeline_profundidade=args.pipeline,
     )
+    instalar_parada_graciosa(service.solicitar_parada)
+
+    if args.assincrono:
+        try:
+            asyncio.run(_executar_assincrono(service, args, logger))
+        finally:
+            service.close()
+            _log_pools(logger, estatisticas_pools())
+            _log_comandos_sql(logger, service.repo.estatisticas_comandos_sql())
+        return
 
     try:
         if args.uma_vez:
             resultado = service.executar_ciclo()
-            logger(
-                "Ciclo API concluido: "
-                f"LockM={resultado.locks_liberados_motoristas} "
-                f"LockA={resultado.locks_liberados_afastamentos} "
-                f"CapM={resultado.motoristas_capturados} "
-                f"OkM={resultado.motoristas_sucesso} "
-                f"ErrM={resultado.motoristas_erro} "
-                f"CapA={resultado.afastamentos_capturados} "
-                f"OkA={resultado.afastamentos_sucesso} "
-                f"ErrA={resultado.afastamentos_erro}"
-            )
+            _log_ciclo_concluido(logger, resultado)
             return
 
-        logger(
-            "Servico API iniciado: "
-            f"destino={args.destino_db}.{args.schema_destino} "
-            f"motoristas={args.tabela_motorista} "
-            f"afastamentos={args.tabela_afastamento} "
-            f"endpoint_m={args.endpoint_motorista} "
-            f"endpoint_a={args.endpoint_afastamento} "
-            f"intervalo={max(1, args.intervalo)}s "
-            f"lote_m={max(1, args.batch_motoristas)} "
-            f"lote_a={max(1, args.batch_afastamentos)} "
-            f"max_tentativas={max(1, args.max_tentativas)} "
-            f"log={Path(args.log_file).resolve()}"
-        )
+        _log_inicio(logger, args)
         service.executar_continuo(intervalo_segundos=args.intervalo, logger=logger)
     finally:
         service.close()
+        _log_pools(logger, estatisticas_pools())
+        _log_comandos_sql(logger, service.repo.estatisticas_comandos_sql())
 
 
+async def _executar_assincrono(service, args, logger) -> None:
+    try:
+        if args.uma_vez:
+            resultado = await service.executar_ciclo_async()
+            _log_ciclo_concluido(logger, resultado)
+            return
+
+        _log_inicio(logger, args)
+        await service.executar_continuo_async(intervalo_segundos=args.intervalo, logger=logger)
+    finally:
+        await service.aclose()
+
+
+def _log_ciclo_concluido(logger, resultado) -> None:
+    logger(
+        "Ciclo API concluido: "
+        f"LockM={resultado.locks_liberados_motoristas} "
+        f"LockA={resultado.locks_liberados_afastamentos} "
+        f"CapM={resultado.motoristas_capturados} "
+        f"OkM={resultado.motoristas_sucesso} "
+        f"ErrM={resultado.motoristas_erro} "
+        f"RejM={resultado.motoristas_rejeitados} "
+        f"CapA={resultado.afastamentos_capturados} "
+        f"OkA={resultado.afastamentos_sucesso} "
+        f"ErrA={resultado.afastamentos_erro} "
+        f"RejA={resultado.afastamentos_rejeitados}"
+    )
+
+
+def _log_pools(logger, pools) -> None:
+    for nome, stats in pools.items():
+        logger(
+            f"Pool DB {nome}: "
+            f"size={stats['pool_size']} "
+            f"checkouts={stats['checkouts']} "
+            f"esperas={stats['esperas']} "
+            f"espera_media={stats['espera_media_segundos']:.3f}s "
+            f"espera_max={stats['espera_maxima_segundos']:.3f}s "
+            f"timeouts={stats['timeouts']}"
+        )
+
+
+def _log_comandos_sql(logger, stats) -> None:
+    logger(
+        "Comandos SQL: "
+        f"em_cache={stats['comandos']} "
+        f"acertos={stats['acertos']} "
+        f"construidos={stats['construidos']}"
+    )
+
+
+def _log_inicio(logger, args) -> None:
+    logger(
+        "Servico API iniciado: "
+        f"destino={args.destino_db}.{args.schema_destino} "
+        f"motoristas={args.tabela_motorista} "
+        f"afastamentos={args.tabela_afastamento} "
+        f"endpoint_m={args.endpoint_motorista} "
+        f"endpoint_a={args.endpoint_afastamento} "
+        f"intervalo={max(1, args.intervalo)}s "
+        f"lote_m={max(1, args.batch_motoristas)} "
+        f"lote_a={max(1, args.batch_afastamentos)} "
+        f"max_tentativas={max(1, args.max_tentativas)} "
+        f"concorrencia={max(1, args.concorrencia)} "
+        f"modo={'asyncio' if args.assincrono else 'threads'} "
+        f"pipeline={max(0, args.pipeline)} "
+        f"log={Path(args.log_file).resolve()}"
+    )
+
 if __name__ == "__main__":
     main()
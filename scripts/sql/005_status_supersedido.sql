@@ -0,0 +1,44 @@
+/*
+Status terminal SUPERSEDIDO nas filas de integracao (MotoristaCadastro/Afastamento).
+
+Antes de cada captura o servico de envio mantem apenas o evento PENDENTE/ERRO
+mais novo por chave (IdDeOrigem/NumEmp no motorista; empresa, tipo, colaborador
+e data no afastamento). Os anteriores passam a SUPERSEDIDO e nao vao para a API.
+
+O CHECK de Status existente e mantido: a nova regra e "(definicao antiga) OR
+[Status] = 'SUPERSEDIDO'". Sem este script a compactacao fica desligada.
+*/
+USE [Cadastrei];
+GO
+
+DECLARE @tabela SYSNAME;
+DECLARE @constraint SYSNAME;
+DECLARE @definicao NVARCHAR(MAX);
+DECLARE @sql NVARCHAR(MAX);
+
+DECLARE cur CURSOR LOCAL FAST_FORWARD FOR
+    SELECT t.[name], cc.[name], cc.[definition]
+    FROM sys.check_constraints AS cc
+    INNER JOIN sys.tables AS t
+        ON t.[object_id] = cc.[parent_object_id]
+    INNER JOIN sys.schemas AS s
+        ON s.[schema_id] = t.[schema_id]
+    WHERE s.[name] = N'dbo'
+      AND t.[name] IN (N'MotoristaCadastro', N'Afastamento')
+      AND cc.[definition] LIKE N'%Status%'
+      AND cc.[definition] NOT LIKE N'%SUPERSEDIDO%';
+
+OPEN cur;
+FETCH NEXT FROM cur INTO @tabela, @constraint, @definicao;
+WHILE @@FETCH_STATUS = 0
+BEGIN
+    SET @sql =
+        N'ALTER TABLE [dbo].' + QUOTENAME(@tabela) + N' DROP CONSTRAINT ' + QUOTENAME(@constraint) + N'; '
+        + N'ALTER TABLE [dbo].' + QUOTENAME(@tabela) + N' ADD CONSTRAINT ' + QUOTENAME(@constraint)
+        + N' CHECK (' + @definicao + N' OR [Status] = ''SUPERSEDIDO'');';
+    EXEC sys.sp_executesql @sql;
+    FETCH NEXT FROM cur INTO @tabela, @constraint, @definicao;
+END;
+CLOSE cur;
+DEALLOCATE cur;
+GO
@@ -1,4 +1,6 @@
+from src.integradora.agendador import AgendadorCiclos
 from src.integradora.afastamento_sync_service import AfastamentoSyncService, ResultadoCicloAfastamentos
+from src.integradora.api_dispatch_registry import RegistroServicosApi
 from src.integradora.api_dispatch_service import ApiDispatchService, ResultadoCicloApi
 from src.integradora.motorista_sync_service import MotoristaSyncService, ResultadoCicloMotoristas
 
@@ -9,4 +11,6 @@ __all__ = [
     "ResultadoCicloAfastamentos",
     "ApiDispatchService",
     "ResultadoCicloApi",
+    "RegistroServicosApi",
+    "AgendadorCiclos",
 ]
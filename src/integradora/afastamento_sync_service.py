@@ -11,8 +11,10 @@ from sqlalchemy.engine import Engine
 
 from Consultas_dbo.afastamentos.afastamentos import RepositorioAfastamentos
 from Consultas_dbo.cadastrei.afastamento import RepositorioAfastamento
+from Consultas_dbo.metadados import configurar_ttl_metadados
 from Ferramentas.montar_payload_afastamentos import montar_payload_afastamentos
 from config.settings import settings
+from src.integradora.agendador import AgendadorCiclos
 
 
 @dataclass
@@ -51,6 +53,13 @@ class AfastamentoSyncService:
             schema=schema_destino,
             table_name=tabela_destino,
         )
+        configurar_ttl_metadados(settings.db_metadados_ttl_seconds)
+        try:
+            self.repo_destino.aquecer_metadados()
+        except Exception:
+            # Catalogo inacessivel no startup: as colunas sao carregadas (e ficam
+            # no cache do processo) na primeira consulta.
+            pass
 
     def resetar_estado_sync(self) -> None:
         self.repo_destino.garantir_estruturas_auxiliares()
@@ -194,7 +203,7 @@ class AfastamentoSyncService:
         logger: Callable[[str], None] | None = None,
         stop_event: Any | None = None,
     ) -> None:
-        intervalo = max(1, int(intervalo_segundos))
+        agendador = AgendadorCiclos(intervalo_segundos)
         sink = logger or (lambda _: None)
 
         while True:
@@ -203,6 +212,11 @@ class AfastamentoSyncService:
             inicio = time.time()
             try:
                 resultado = self.executar_ciclo()
+                sleep_for = agendador.registrar_ciclo(
+                    itens=resultado.registros_origem,
+                    lote_cheio=resultado.registros_origem >= self.batch_size,
+                    inicio=inicio,
+                )
                 sink(
                     (
                         f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] "
@@ -210,14 +224,14 @@ class AfastamentoSyncService:
                         f"Payload={resultado.payloads_validos} "
                         f"Eventos={resultado.eventos_gerados} "
                         f"Inseridos={resultado.eventos_inseridos} "
-                        f"ResetCursor={resultado.cursor_reiniciado}"
+                        f"ResetCursor={resultado.cursor_reiniciado} "
+                        f"{agendador.resumo(sleep_for)}"
                     )
                 )
             except Exception as exc:
                 sink(f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] ERRO: {exc}")
+                sleep_for = agendador.intervalo - (time.time() - inicio)
 
-            elapsed = time.time() - inicio
-            sleep_for = intervalo - elapsed
             if sleep_for > 0:
                 if stop_event is not None:
                     if stop_event.wait(sleep_for):
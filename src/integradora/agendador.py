@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+
+# Primeira espera apos a fila esvaziar; dobra a cada ciclo ocioso ate o intervalo.
+_ESPERA_INICIAL_SEGUNDOS = 1.0
+_JANELA_TAXA_SEGUNDOS = 60.0
+
+
+class AgendadorCiclos:
+    # Modo "drenagem": enquanto o ciclo volta com lote cheio, o proximo roda
+    # sem espera; quando a fila esvazia, a espera cresce exponencialmente ate
+    # o intervalo configurado.
+    def __init__(self, intervalo_segundos: float) -> None:
+        self.intervalo = max(1.0, float(intervalo_segundos))
+        self._espera_ociosa = 0.0
+        self._historico: deque[tuple[float, int]] = deque()
+
+    def registrar_ciclo(self, *, itens: int, lote_cheio: bool, inicio: float) -> float:
+        agora = time.time()
+        self._historico.append((inicio, max(0, int(itens))))
+        while self._historico and self._historico[0][0] < agora - _JANELA_TAXA_SEGUNDOS:
+            self._historico.popleft()
+
+        if lote_cheio:
+            self._espera_ociosa = 0.0
+            return 0.0
+
+        if self._espera_ociosa <= 0:
+            self._espera_ociosa = min(self.intervalo, _ESPERA_INICIAL_SEGUNDOS)
+        else:
+            self._espera_ociosa = min(self.intervalo, self._espera_ociosa * 2)
+        return max(0.0, self._espera_ociosa - (agora - inicio))
+
+    def taxa_efetiva(self) -> float:
+        if not self._historico:
+            return 0.0
+        decorrido = max(1.0, time.time() - self._historico[0][0])
+        return sum(itens for _, itens in self._historico) / decorrido
+
+    def resumo(self, espera: float) -> str:
+        return f"Taxa={self.taxa_efetiva():.1f}/s Espera={espera:.1f}s"
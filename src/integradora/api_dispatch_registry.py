@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from threading import Lock
+from typing import Any
+
+from src.integradora.api_dispatch_service import ApiDispatchService
+
+
+def _hash_config(value: Any) -> str:
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class RegistroServicosApi:
+    # Mantem um ApiDispatchService vivo por (cliente, endpoint, tabela, de_para)
+    # entre ciclos, preservando pool HTTP, token e caches do repositorio.
+    # A entrada so e recriada quando a configuracao dela muda.
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._entradas: dict[tuple[str, str, str, str], tuple[str, ApiDispatchService]] = {}
+        self._usadas: set[tuple[str, str, str, str]] = set()
+        self._parando = False
+
+    @property
+    def parando(self) -> bool:
+        return self._parando
+
+    def solicitar_parada(self) -> None:
+        # Propaga a parada graciosa para todos os servicos (e os criados depois).
+        with self._lock:
+            self._parando = True
+            for _, service in self._entradas.values():
+                service.solicitar_parada()
+
+    def iniciar_ciclo(self) -> None:
+        with self._lock:
+            self._usadas = set()
+
+    def obter(
+        self,
+        *,
+        cliente: str,
+        endpoint: str,
+        tabela: str,
+        **parametros: Any,
+    ) -> ApiDispatchService:
+        chave = (
+            str(cliente or ""),
+            str(endpoint or ""),
+            str(tabela or ""),
+            _hash_config(parametros.get("payload_mapping") or []),
+        )
+        assinatura = self._assinatura(parametros)
+
+        with self._lock:
+            self._usadas.add(chave)
+            atual = self._entradas.get(chave)
+            if atual is not None and atual[0] == assinatura:
+                return atual[1]
+
+            if atual is not None:
+                atual[1].close()
+            service = ApiDispatchService(**parametros)
+            if self._parando:
+                service.solicitar_parada()
+            self._entradas[chave] = (assinatura, service)
+            return service
+
+    def encerrar_ciclo(self) -> int:
+        # Endpoints removidos/desativados no registry deixam de ser usados;
+        # seus servicos sao fechados ao fim do ciclo.
+        with self._lock:
+            obsoletas = [chave for chave in self._entradas if chave not in self._usadas]
+            for chave in obsoletas:
+                _, service = self._entradas.pop(chave)
+                service.close()
+            return len(obsoletas)
+
+    def close(self) -> None:
+        with self._lock:
+            for _, service in self._entradas.values():
+                service.close()
+            self._entradas.clear()
+            self._usadas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @staticmethod
+    def _assinatura(parametros: dict[str, Any]) -> str:
+        normalizado: dict[str, Any] = {}
+        for nome, valor in parametros.items():
+            if nome == "engine_destino":
+                normalizado[nome] = id(valor)
+            elif nome == "integration_config":
+                # A lista de endpoints do cliente nao afeta este servico; sem
+                # ela, editar outro endpoint nao recria todas as entradas.
+                normalizado[nome] = {
+                    k: v for k, v in dict(valor or {}).items() if k != "endpoints"
+                }
+            else:
+                normalizado[nome] = valor
+        return _hash_config(normalizado)
@@ -1,18 +1,43 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import random
+import threading
 import time
 import uuid
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Callable, Mapping
+from typing import Any, Awaitable, Callable, Mapping
 
 from sqlalchemy.engine import Engine
 
-from Cadastro_API.client import ApiResponse, AtsApiClient
+from Cadastro_API.client import ApiResponse, AsyncAtsApiClient, AtsApiClient
 from Consultas_dbo.cadastrei.fila_integracao_api import RepositorioFilaIntegracaoApi
+from Consultas_dbo.metadados import configurar_ttl_metadados
+from src.integradora.agendador import AgendadorCiclos
+from src.integradora.controle_lote import ControladorLote
+from src.integradora.disjuntor import FECHADO, DisjuntorApi
+from src.integradora.lease import RenovadorLease
 from config.settings import settings
 
+# Lotes capturados antecipadamente nao podem envelhecer alem desta fracao do
+# lock_timeout_minutes antes do ack, senao outro worker os recaptura.
+_PIPELINE_FRACAO_LOCK_TIMEOUT = 0.5
+# Rejeicoes de conteudo: o mesmo payload falharia de novo em qualquer tentativa.
+# 404/405 indicam endpoint mal configurado, nao registro ruim: seguem o retry.
+_STATUS_REJEICAO_PERMANENTE = frozenset({400, 410, 413, 415, 422})
+
+
+class PayloadInvalido(ValueError):
+    # Evento cujo payload nunca sera aceito (forma/schema: campo obrigatorio
+    # ausente, JSON invalido, transformacao do de-para impossivel, de-para
+    # vazio): rejeitado sem novas tentativas. Falhas de lookup (EmpresaDict/
+    # SindicatoDict) nao entram aqui: podem se resolver e seguem o retry.
+    pass
+
 
 @dataclass
 class ResultadoCicloApi:
@@ -24,6 +49,18 @@ class ResultadoCicloApi:
     afastamentos_capturados: int = 0
     afastamentos_sucesso: int = 0
     afastamentos_erro: int = 0
+    motoristas_rejeitados: int = 0
+    afastamentos_rejeitados: int = 0
+    motoristas_liberados: int = 0
+    afastamentos_liberados: int = 0
+    motoristas_supersedidos: int = 0
+    afastamentos_supersedidos: int = 0
+    # Ultimo lote capturado veio com o tamanho pedido (ha mais na fila).
+    motoristas_lote_cheio: bool = False
+    afastamentos_lote_cheio: bool = False
+    disjuntor_motoristas: str = FECHADO
+    disjuntor_afastamentos: str = FECHADO
+    ajustes_lote: list[str] = field(default_factory=list)
 
 
 class ApiDispatchService:
@@ -47,6 +84,11 @@ class ApiDispatchService:
         processar_afastamentos: bool = True,
         integration_config: Mapping[str, Any] | None = None,
         payload_mapping: list[dict[str, Any]] | None = None,
+        concorrencia: int | None = None,
+        pipeline_profundidade: int | None = None,
+        pipeline_max_lotes: int | None = None,
+        lote_adaptativo: bool | None = None,
+        requisicoes_por_segundo: float | None = None,
     ) -> None:
         self.processar_motoristas = bool(processar_motoristas)
         self.processar_afastamentos = bool(processar_afastamentos)
@@ -74,235 +116,975 @@ class ApiDispatchService:
         if mapping_raw is None:
             mapping_raw = self.integration_config.get("de_para")  # type: ignore[assignment]
         self.payload_mapping = self._normalizar_de_para(mapping_raw)
+        politica_raw = self.integration_config.get("politica_retry")
+        self.politica_retry: dict[str, dict[str, Any]] = {
+            str(chave).strip().lower(): dict(regra)
+            for chave, regra in (politica_raw.items() if isinstance(politica_raw, Mapping) else [])
+            if isinstance(regra, Mapping)
+        }
         self.colunas_origem_de_para = self._extrair_colunas_origem(self.payload_mapping)
         timeout_api = float(self.integration_config.get("timeout_seconds") or api_timeout_seconds)
+        self.concorrencia = max(1, int(concorrencia or settings.api_sync_concorrencia or 1))
+        if pipeline_profundidade is None:
+            pipeline_profundidade = settings.api_sync_pipeline_profundidade
+        self.pipeline_profundidade = max(0, int(pipeline_profundidade or 0))
+        self.pipeline_max_lotes = max(1, int(pipeline_max_lotes or settings.api_sync_pipeline_max_lotes or 1))
+        if lote_adaptativo is None:
+            lote_adaptativo = settings.api_sync_lote_adaptativo
+        # Parada graciosa: eventos ainda nao enviados voltam ao status anterior.
+        # Esgotado prazo_parada_segundos, grupos que nao comecaram sao
+        # cancelados; POSTs ja em voo terminam (limitados pelo timeout da API)
+        # e tem o resultado real gravado, para nao serem reenviados.
+        self.prazo_parada_segundos = max(0.0, float(settings.api_sync_prazo_parada_segundos))
+        self._parada = threading.Event()
+        self._parada_externa: Any | None = None
+        # Saida de log do executar_continuo em andamento (nenhuma fora dele).
+        self._log: Callable[[str], None] = lambda _: None
+        self._parada_em: float | None = None
+        self._lease = RenovadorLease(
+            renovar=self._renovar_locks,
+            intervalo_segundos=settings.api_sync_lease_intervalo_segundos,
+            lock_timeout_minutes=self.lock_timeout_minutes,
+        )
+        self._disjuntores = {
+            nome: DisjuntorApi(
+                limite_falhas=settings.api_sync_disjuntor_falhas,
+                espera_segundos=settings.api_sync_disjuntor_espera_segundos,
+            )
+            for nome in ("M", "A")
+        }
+        self._controles_lote: dict[str, ControladorLote] = {}
+        if lote_adaptativo:
+            alvo_segundos = self.lock_timeout_minutes * 60 * float(settings.api_sync_lote_fracao_lock_timeout)
+            for nome, inicial in (("M", self.batch_size_motoristas), ("A", self.batch_size_afastamentos)):
+                self._controles_lote[nome] = ControladorLote(
+                    nome=nome,
+                    inicial=inicial,
+                    minimo=settings.api_sync_lote_minimo,
+                    maximo=settings.api_sync_lote_maximo,
+                    alvo_segundos=alvo_segundos,
+                    concorrencia=self.concorrencia,
+                )
+            self.batch_size_motoristas = self._controles_lote["M"].tamanho
+            self.batch_size_afastamentos = self._controles_lote["A"].tamanho
 
         self.repo = RepositorioFilaIntegracaoApi(
             engine_destino,
             schema=schema_destino,
             tabela_motorista=tabela_motorista,
             tabela_afastamento=tabela_afastamento,
+            cache_dict_ttl_seconds=settings.api_sync_cache_dict_ttl_seconds,
         )
+        try:
+            self.repo.precarregar_pessoas_juridicas()
+        except Exception:
+            # Sem EmpresaDict/SindicatoDict acessiveis o enriquecimento usa os
+            # padroes configurados; a carga e retomada na primeira consulta.
+            pass
+        configurar_ttl_metadados(settings.db_metadados_ttl_seconds)
+        try:
+            self.repo.aquecer_metadados()
+        except Exception:
+            # Catalogo inacessivel no startup: colunas e CHECKs sao carregados
+            # (e ficam no cache do processo) na primeira consulta.
+            pass
+        self.timeout_api = timeout_api
         self.api_client = AtsApiClient(timeout_seconds=timeout_api, integration_config=self.integration_config)
+        if requisicoes_por_segundo is None:
+            requisicoes_por_segundo = settings.api_sync_requisicoes_por_segundo
+        self.requisicoes_por_segundo = max(0.0, float(requisicoes_por_segundo or 0))
+        # Controle de fluxo compartilhado por endpoint no processo: cada servico
+        # soma seus limites (vale o maior). A janela AIMD so se adapta com
+        # concorrencia > 1; com 1 o envio segue serial.
+        for endpoint, ativo in (
+            (self.endpoint_motorista, self.processar_motoristas),
+            (self.endpoint_afastamento, self.processar_afastamentos),
+        ):
+            if ativo:
+                self.api_client.configurar_fluxo(
+                    endpoint,
+                    requisicoes_por_segundo=self.requisicoes_por_segundo,
+                    concorrencia_maxima=self.concorrencia,
+                )
+        self._async_api_client: AsyncAtsApiClient | None = None
+
+    def solicitar_parada(self) -> None:
+        self._parada.set()
+
+    def _parando(self) -> bool:
+        if not self._parada.is_set():
+            externa = self._parada_externa
+            if externa is None or not externa.is_set():
+                return False
+            self._parada.set()
+        if self._parada_em is None:
+            self._parada_em = time.monotonic()
+        return True
+
+    def _aguardar_parada(self, segundos: float) -> bool:
+        # Espera entre ciclos; retorna True se a parada chegar antes do fim.
+        limite = time.monotonic() + segundos
+        while not self._parando():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            (self._parada_externa or self._parada).wait(min(restante, 0.5))
+        return True
+
+    def _prazo_parada_esgotado(self) -> bool:
+        if not self._parando():
+            return False
+        return time.monotonic() - float(self._parada_em or 0) >= self.prazo_parada_segundos
 
     def close(self) -> None:
+        self._lease.encerrar()
         self.api_client.close()
 
+    async def aclose(self) -> None:
+        self._lease.encerrar()
+        if self._async_api_client is not None:
+            await self._async_api_client.aclose()
+            self._async_api_client = None
+
     def executar_ciclo(self) -> ResultadoCicloApi:
+        if self.pipeline_profundidade > 0:
+            return self.executar_ciclo_pipeline()
+        try:
+            return self._executar_ciclo_sequencial()
+        finally:
+            # Lotes que nao chegaram ao ack (erro no meio do ciclo) saem do
+            # heartbeat e voltam a expirar normalmente.
+            self._lease.limpar()
+
+    def _executar_ciclo_sequencial(self) -> ResultadoCicloApi:
         resultado = ResultadoCicloApi()
 
         if self.processar_motoristas:
             resultado.locks_liberados_motoristas = self.repo.liberar_locks_expirados_motoristas(
                 lock_timeout_minutes=self.lock_timeout_minutes
             )
+            resultado.motoristas_supersedidos = self._supersedir_fila("M")
             lock_id_motoristas = str(uuid.uuid4())
-            eventos_motoristas = self.repo.capturar_motoristas_pendentes(
-                lock_id=lock_id_motoristas,
-                batch_size=self.batch_size_motoristas,
-                max_tentativas=self.max_tentativas,
-                lock_timeout_minutes=self.lock_timeout_minutes,
-            )
+            tamanho = self.batch_size_motoristas
+            eventos_motoristas = self._capturar_fila("M", lock_id_motoristas, tamanho)
             resultado.motoristas_capturados = len(eventos_motoristas)
-            for evento in eventos_motoristas:
-                if self._processar_motorista(evento, lock_id_motoristas):
-                    resultado.motoristas_sucesso += 1
-                else:
-                    resultado.motoristas_erro += 1
+            resultado.motoristas_lote_cheio = len(eventos_motoristas) >= tamanho
+            resultados = self._despachar_lote(
+                eventos_motoristas,
+                processar=self._processar_motorista,
+                chave_ordem=self._chave_ordem_motorista,
+            )
+            self._acumular_fechamento(resultado, "M", self._fechar_lote("M", lock_id_motoristas, resultados))
+            self._ajustar_lote("M", resultados, resultado)
 
         if self.processar_afastamentos:
             resultado.locks_liberados_afastamentos = self.repo.liberar_locks_expirados_afastamentos(
                 lock_timeout_minutes=self.lock_timeout_minutes
             )
+            resultado.afastamentos_supersedidos = self._supersedir_fila("A")
             lock_id_afastamentos = str(uuid.uuid4())
-            eventos_afastamentos = self.repo.capturar_afastamentos_pendentes(
-                lock_id=lock_id_afastamentos,
-                batch_size=self.batch_size_afastamentos,
-                max_tentativas=self.max_tentativas,
+            tamanho = self.batch_size_afastamentos
+            eventos_afastamentos = self._capturar_fila("A", lock_id_afastamentos, tamanho)
+            resultado.afastamentos_capturados = len(eventos_afastamentos)
+            resultado.afastamentos_lote_cheio = len(eventos_afastamentos) >= tamanho
+            resultados = self._despachar_lote(
+                eventos_afastamentos,
+                processar=self._processar_afastamento,
+                chave_ordem=self._chave_ordem_afastamento,
+            )
+            self._acumular_fechamento(resultado, "A", self._fechar_lote("A", lock_id_afastamentos, resultados))
+            self._ajustar_lote("A", resultados, resultado)
+
+        self._registrar_disjuntores(resultado)
+        return resultado
+
+    def executar_ciclo_pipeline(self, *, stop_event: Any | None = None) -> ResultadoCicloApi:
+        if stop_event is not None:
+            self._parada_externa = stop_event
+        try:
+            return self._executar_ciclo_pipeline()
+        finally:
+            self._lease.limpar()
+
+    def _executar_ciclo_pipeline(self) -> ResultadoCicloApi:
+        resultado = ResultadoCicloApi()
+
+        if self.processar_motoristas:
+            resultado.locks_liberados_motoristas = self.repo.liberar_locks_expirados_motoristas(
+                lock_timeout_minutes=self.lock_timeout_minutes
+            )
+            resultado.motoristas_supersedidos = self._supersedir_fila("M")
+            self._executar_pipeline_fila(
+                nome="M",
+                resultado=resultado,
+                processar=self._processar_motorista,
+                chave_ordem=self._chave_ordem_motorista,
+                tamanho_lote=lambda: self.batch_size_motoristas,
+            )
+
+        if self.processar_afastamentos:
+            resultado.locks_liberados_afastamentos = self.repo.liberar_locks_expirados_afastamentos(
+                lock_timeout_minutes=self.lock_timeout_minutes
+            )
+            resultado.afastamentos_supersedidos = self._supersedir_fila("A")
+            self._executar_pipeline_fila(
+                nome="A",
+                resultado=resultado,
+                processar=self._processar_afastamento,
+                chave_ordem=self._chave_ordem_afastamento,
+                tamanho_lote=lambda: self.batch_size_afastamentos,
+            )
+
+        self._registrar_disjuntores(resultado)
+        return resultado
+
+    def _executar_pipeline_fila(
+        self,
+        *,
+        nome: str,
+        resultado: ResultadoCicloApi,
+        processar: Callable[[dict[str, Any]], dict[str, Any]],
+        chave_ordem: Callable[[dict[str, Any]], Any],
+        tamanho_lote: Callable[[], int],
+    ) -> None:
+        # Enquanto o lote N e enviado, o N+1 ja e capturado (lock_id proprio)
+        # e o ack do N-1 e gravado em segundo plano. Captura e ack usam uma
+        # thread cada, preservando a ordem entre lotes.
+        lotes_agendados = 0
+        duracao_lote = 0.0
+        fila: deque[tuple[str, int, Future]] = deque()
+        ack_pendente: Future | None = None
+
+        pool_captura = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-captura")
+        pool_ack = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-ack")
+
+        def _agendar_captura() -> None:
+            nonlocal lotes_agendados
+            lock_id = str(uuid.uuid4())
+            tamanho = tamanho_lote()
+            fila.append((lock_id, tamanho, pool_captura.submit(self._capturar_fila, nome, lock_id, tamanho)))
+            lotes_agendados += 1
+
+        try:
+            _agendar_captura()
+            while fila:
+                lock_id, tamanho, futuro = fila.popleft()
+                eventos = futuro.result()
+                # Drenagem olha so o ultimo lote contra o tamanho pedido nele.
+                if nome == "M":
+                    resultado.motoristas_lote_cheio = len(eventos) >= tamanho
+                else:
+                    resultado.afastamentos_lote_cheio = len(eventos) >= tamanho
+                if not eventos:
+                    continue
+                if nome == "M":
+                    resultado.motoristas_capturados += len(eventos)
+                else:
+                    resultado.afastamentos_capturados += len(eventos)
+
+                continuar = (
+                    len(eventos) >= tamanho
+                    and self._disjuntores[nome].estado == FECHADO
+                    and not self._parando()
+                )
+                profundidade = self._profundidade_pipeline(duracao_lote)
+                while continuar and len(fila) < profundidade and lotes_agendados < self.pipeline_max_lotes:
+                    _agendar_captura()
+
+                inicio = time.monotonic()
+                resultados = self._despachar_lote(eventos, processar=processar, chave_ordem=chave_ordem)
+                duracao_lote = time.monotonic() - inicio
+                self._ajustar_lote(nome, resultados, resultado)
+
+                if ack_pendente is not None:
+                    self._acumular_fechamento(resultado, nome, ack_pendente.result())
+                ack_pendente = pool_ack.submit(self._fechar_lote, nome, lock_id, resultados)
+
+                # Sem lote antecipado (profundidade 0 pelo tempo de envio),
+                # a captura seguinte so comeca depois do envio atual.
+                if not fila and continuar and lotes_agendados < self.pipeline_max_lotes:
+                    _agendar_captura()
+        except BaseException:
+            self._devolver_lotes_antecipados(nome, fila)
+            if ack_pendente is not None:
+                # Falha no ack do lote anterior nao pode esconder o erro que
+                # interrompeu o pipeline: registra e segue com o original.
+                try:
+                    self._acumular_fechamento(resultado, nome, ack_pendente.result())
+                except Exception as exc_ack:
+                    self._log(
+                        f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] "
+                        f"ERRO: falha no ack do lote anterior ({nome}): {exc_ack}"
+                    )
+                ack_pendente = None
+            raise
+        finally:
+            try:
+                if ack_pendente is not None:
+                    self._acumular_fechamento(resultado, nome, ack_pendente.result())
+            finally:
+                pool_captura.shutdown(wait=True)
+                pool_ack.shutdown(wait=True)
+
+    def _devolver_lotes_antecipados(self, nome: str, fila: deque[tuple[str, int, Future]]) -> None:
+        # Erro no meio do pipeline: capturas ainda na fila sao canceladas e os
+        # lotes ja capturados (e nao enviados) voltam ao status anterior na
+        # hora, em vez de esperar o lock expirar sem heartbeat.
+        liberar = (
+            self.repo.liberar_motoristas_em_lote
+            if nome == "M"
+            else self.repo.liberar_afastamentos_em_lote
+        )
+        capturados = [(lock_id, futuro) for lock_id, _, futuro in fila if not futuro.cancel()]
+        fila.clear()
+        for lock_id, futuro in capturados:
+            try:
+                eventos = futuro.result()
+                if eventos:
+                    liberar(lock_id=lock_id, eventos=eventos)
+            except Exception:
+                # Sem devolucao o lote volta pela expiracao do lock.
+                pass
+            finally:
+                self._lease.remover(lock_id)
+
+    def _supersedir_fila(self, nome: str) -> int:
+        # Uma vez por ciclo, antes da captura: so o evento mais novo de cada
+        # chave segue para a API.
+        if not settings.api_sync_supersedir_eventos:
+            return 0
+        if nome == "M":
+            return self.repo.supersedir_motoristas_pendentes()
+        return self.repo.supersedir_afastamentos_pendentes()
+
+    def _capturar_fila(self, nome: str, lock_id: str, tamanho: int) -> list[dict[str, Any]]:
+        # Parando ou disjuntor aberto: nao captura; meio-aberto: captura 1 evento de sondagem.
+        if self._parando():
+            return []
+        tamanho = self._disjuntores[nome].tamanho_captura(tamanho)
+        if tamanho <= 0:
+            return []
+        capturar = (
+            self.repo.capturar_motoristas_pendentes
+            if nome == "M"
+            else self.repo.capturar_afastamentos_pendentes
+        )
+        eventos = capturar(
+            lock_id=lock_id,
+            batch_size=tamanho,
+            max_tentativas=self.max_tentativas,
+            lock_timeout_minutes=self.lock_timeout_minutes,
+            colunas_extras=self._colunas_extras_captura(),
+        )
+        if eventos:
+            # Da captura ao ack o lote fica sob heartbeat (ver _fechar_lote).
+            self._lease.registrar(nome, lock_id)
+        else:
+            # Sondagem do meio-aberto sem evento: nao fica preso em lotes de 1.
+            self._disjuntores[nome].registrar_sem_envio()
+        return eventos
+
+    def _renovar_locks(self, nome: str, lock_ids: list[str]) -> int:
+        if nome == "M":
+            return self.repo.renovar_locks_motoristas(lock_ids)
+        return self.repo.renovar_locks_afastamentos(lock_ids)
+
+    def _fechar_lote(self, nome: str, lock_id: str, resultados: list[dict[str, Any]]) -> dict[str, int]:
+        enviados = [item for item in resultados if not item.get("liberar")]
+        devolvidos = [item["evento"] for item in resultados if item.get("liberar")]
+
+        try:
+            if nome == "M":
+                aplicados = self.repo.marcar_motoristas_em_lote(lock_id=lock_id, resultados=enviados)
+                liberados = self.repo.liberar_motoristas_em_lote(lock_id=lock_id, eventos=devolvidos)
+            else:
+                aplicados = self.repo.marcar_afastamentos_em_lote(lock_id=lock_id, resultados=enviados)
+                liberados = self.repo.liberar_afastamentos_em_lote(lock_id=lock_id, eventos=devolvidos)
+        finally:
+            self._lease.remover(lock_id)
+
+        contagens = self._contar_resultados(enviados, aplicados)
+        contagens["liberados"] = liberados
+        return contagens
+
+    @staticmethod
+    def _acumular_fechamento(resultado: ResultadoCicloApi, nome: str, contagens: dict[str, int]) -> None:
+        prefixo = "motoristas" if nome == "M" else "afastamentos"
+        for chave, valor in contagens.items():
+            campo = f"{prefixo}_{chave}"
+            setattr(resultado, campo, getattr(resultado, campo) + int(valor))
+
+    def _profundidade_pipeline(self, duracao_lote: float) -> int:
+        if duracao_lote <= 0:
+            return min(1, self.pipeline_profundidade)
+        # O k-esimo lote antecipado espera ~(k+1) envios ate ser processado.
+        limite = self.lock_timeout_minutes * 60 * _PIPELINE_FRACAO_LOCK_TIMEOUT
+        permitido = int(limite // duracao_lote) - 1
+        return max(0, min(self.pipeline_profundidade, permitido))
+
+    def executar_continuo(
+        self,
+        *,
+        intervalo_segundos: int,
+        logger: Callable[[str], None] | None = None,
+        stop_event: Any | None = None,
+    ) -> None:
+        agendador = AgendadorCiclos(intervalo_segundos)
+        sink = logger or (lambda _: None)
+        self._log = sink
+        self._parada_externa = stop_event
+
+        while True:
+            if self._parando():
+                break
+
+            inicio = time.time()
+            try:
+                if self.pipeline_profundidade > 0:
+                    resultado = self.executar_ciclo_pipeline(stop_event=stop_event)
+                else:
+                    resultado = self.executar_ciclo()
+                sleep_for = agendador.registrar_ciclo(
+                    itens=resultado.motoristas_capturados + resultado.afastamentos_capturados,
+                    lote_cheio=self._lote_cheio(resultado),
+                    inicio=inicio,
+                )
+                sink(f"{self._linha_resumo(resultado)} {agendador.resumo(sleep_for)}")
+            except Exception as exc:
+                sink(f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] ERRO: {exc}")
+                sleep_for = agendador.intervalo - (time.time() - inicio)
+
+            if sleep_for > 0 and self._aguardar_parada(sleep_for):
+                break
+
+    async def executar_ciclo_async(self) -> ResultadoCicloApi:
+        try:
+            return await self._executar_ciclo_async()
+        finally:
+            self._lease.limpar()
+
+    async def _executar_ciclo_async(self) -> ResultadoCicloApi:
+        resultado = ResultadoCicloApi()
+
+        if self.processar_motoristas:
+            resultado.locks_liberados_motoristas = await asyncio.to_thread(
+                self.repo.liberar_locks_expirados_motoristas,
+                lock_timeout_minutes=self.lock_timeout_minutes,
+            )
+            resultado.motoristas_supersedidos = await asyncio.to_thread(self._supersedir_fila, "M")
+            lock_id_motoristas = str(uuid.uuid4())
+            tamanho = self.batch_size_motoristas
+            eventos_motoristas = await asyncio.to_thread(self._capturar_fila, "M", lock_id_motoristas, tamanho)
+            resultado.motoristas_capturados = len(eventos_motoristas)
+            resultado.motoristas_lote_cheio = len(eventos_motoristas) >= tamanho
+            resultados = await self._despachar_lote_async(
+                eventos_motoristas,
+                processar=self._processar_motorista_async,
+                chave_ordem=self._chave_ordem_motorista,
+            )
+            fechamento = await asyncio.to_thread(self._fechar_lote, "M", lock_id_motoristas, resultados)
+            self._acumular_fechamento(resultado, "M", fechamento)
+            self._ajustar_lote("M", resultados, resultado)
+
+        if self.processar_afastamentos:
+            resultado.locks_liberados_afastamentos = await asyncio.to_thread(
+                self.repo.liberar_locks_expirados_afastamentos,
                 lock_timeout_minutes=self.lock_timeout_minutes,
             )
+            resultado.afastamentos_supersedidos = await asyncio.to_thread(self._supersedir_fila, "A")
+            lock_id_afastamentos = str(uuid.uuid4())
+            tamanho = self.batch_size_afastamentos
+            eventos_afastamentos = await asyncio.to_thread(self._capturar_fila, "A", lock_id_afastamentos, tamanho)
             resultado.afastamentos_capturados = len(eventos_afastamentos)
-            for evento in eventos_afastamentos:
-                if self._processar_afastamento(evento, lock_id_afastamentos):
-                    resultado.afastamentos_sucesso += 1
-                else:
-                    resultado.afastamentos_erro += 1
+            resultado.afastamentos_lote_cheio = len(eventos_afastamentos) >= tamanho
+            resultados = await self._despachar_lote_async(
+                eventos_afastamentos,
+                processar=self._processar_afastamento_async,
+                chave_ordem=self._chave_ordem_afastamento,
+            )
+            fechamento = await asyncio.to_thread(self._fechar_lote, "A", lock_id_afastamentos, resultados)
+            self._acumular_fechamento(resultado, "A", fechamento)
+            self._ajustar_lote("A", resultados, resultado)
 
+        self._registrar_disjuntores(resultado)
         return resultado
 
-    def executar_continuo(
+    async def executar_continuo_async(
         self,
         *,
         intervalo_segundos: int,
         logger: Callable[[str], None] | None = None,
         stop_event: Any | None = None,
     ) -> None:
-        intervalo = max(1, int(intervalo_segundos))
+        agendador = AgendadorCiclos(intervalo_segundos)
         sink = logger or (lambda _: None)
+        self._log = sink
+        self._parada_externa = stop_event
 
         while True:
-            if stop_event is not None and stop_event.is_set():
+            if self._parando():
                 break
 
             inicio = time.time()
             try:
-                resultado = self.executar_ciclo()
-                sink(
-                    (
-                        f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] "
-                        f"LockM={resultado.locks_liberados_motoristas} "
-                        f"LockA={resultado.locks_liberados_afastamentos} "
-                        f"CapM={resultado.motoristas_capturados} "
-                        f"OkM={resultado.motoristas_sucesso} "
-                        f"ErrM={resultado.motoristas_erro} "
-                        f"CapA={resultado.afastamentos_capturados} "
-                        f"OkA={resultado.afastamentos_sucesso} "
-                        f"ErrA={resultado.afastamentos_erro}"
-                    )
+                resultado = await self.executar_ciclo_async()
+                sleep_for = agendador.registrar_ciclo(
+                    itens=resultado.motoristas_capturados + resultado.afastamentos_capturados,
+                    lote_cheio=self._lote_cheio(resultado),
+                    inicio=inicio,
                 )
+                sink(f"{self._linha_resumo(resultado)} {agendador.resumo(sleep_for)}")
             except Exception as exc:
                 sink(f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] ERRO: {exc}")
+                sleep_for = agendador.intervalo - (time.time() - inicio)
 
-            elapsed = time.time() - inicio
-            sleep_for = intervalo - elapsed
-            if sleep_for > 0:
-                if stop_event is not None:
-                    if stop_event.wait(sleep_for):
-                        break
-                else:
-                    time.sleep(sleep_for)
+            if sleep_for > 0 and await asyncio.to_thread(self._aguardar_parada, sleep_for):
+                break
+
+    def _ajustar_lote(self, nome: str, resultados: list[dict[str, Any]], resultado: ResultadoCicloApi) -> None:
+        controle = self._controles_lote.get(nome)
+        if controle is None:
+            return
+        decisao = controle.registrar(resultados)
+        if decisao is None:
+            return
+        if nome == "M":
+            self.batch_size_motoristas = controle.tamanho
+        else:
+            self.batch_size_afastamentos = controle.tamanho
+        resultado.ajustes_lote.append(decisao)
+
+    def _registrar_disjuntores(self, resultado: ResultadoCicloApi) -> None:
+        resultado.disjuntor_motoristas = self._disjuntores["M"].estado
+        resultado.disjuntor_afastamentos = self._disjuntores["A"].estado
+
+    @staticmethod
+    def _lote_cheio(resultado: ResultadoCicloApi) -> bool:
+        # O total do ciclo soma os lotes do pipeline e o tamanho atual ja pode
+        # ter sido ajustado: vale o ultimo lote contra o tamanho pedido nele.
+        return resultado.motoristas_lote_cheio or resultado.afastamentos_lote_cheio
+
+    @staticmethod
+    def _linha_resumo(resultado: ResultadoCicloApi) -> str:
+        return (
+            f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] "
+            f"LockM={resultado.locks_liberados_motoristas} "
+            f"LockA={resultado.locks_liberados_afastamentos} "
+            f"CapM={resultado.motoristas_capturados} "
+            f"OkM={resultado.motoristas_sucesso} "
+            f"ErrM={resultado.motoristas_erro} "
+            f"CapA={resultado.afastamentos_capturados} "
+            f"OkA={resultado.afastamentos_sucesso} "
+            f"ErrA={resultado.afastamentos_erro}"
+            + (f" RejM={resultado.motoristas_rejeitados}" if resultado.motoristas_rejeitados else "")
+            + (f" RejA={resultado.afastamentos_rejeitados}" if resultado.afastamentos_rejeitados else "")
+            + (f" SupM={resultado.motoristas_supersedidos}" if resultado.motoristas_supersedidos else "")
+            + (f" SupA={resultado.afastamentos_supersedidos}" if resultado.afastamentos_supersedidos else "")
+            + (f" LibM={resultado.motoristas_liberados}" if resultado.motoristas_liberados else "")
+            + (f" LibA={resultado.afastamentos_liberados}" if resultado.afastamentos_liberados else "")
+            + (f" DisjM={resultado.disjuntor_motoristas}" if resultado.disjuntor_motoristas != FECHADO else "")
+            + (f" DisjA={resultado.disjuntor_afastamentos}" if resultado.disjuntor_afastamentos != FECHADO else "")
+            + "".join(f" {ajuste}" for ajuste in resultado.ajustes_lote)
+        )
+
+    @staticmethod
+    def _falha_infraestrutura(resultado: dict[str, Any]) -> bool:
+        # Falha de conexao/timeout (sem HTTP) ou 5xx: a API, nao o evento, falhou.
+        if resultado.get("sucesso"):
+            return False
+        http_status = resultado.get("http_status")
+        return http_status is None or int(http_status) >= 500
 
-    def _processar_motorista(self, evento: dict[str, Any], lock_id: str) -> bool:
+    @staticmethod
+    def _contar_resultados(resultados: list[dict[str, Any]], aplicados: list[bool]) -> dict[str, int]:
+        # Sucesso/rejeitado so contam quando a marcacao foi aplicada; um evento
+        # cujo lock foi perdido (ou que falhou de forma transitoria) entra como erro.
+        sucesso = rejeitados = 0
+        for item, aplicado in zip(resultados, aplicados):
+            if not aplicado:
+                continue
+            if item.get("sucesso"):
+                sucesso += 1
+            elif item.get("permanente"):
+                rejeitados += 1
+        return {
+            "sucesso": sucesso,
+            "erro": len(resultados) - sucesso - rejeitados,
+            "rejeitados": rejeitados,
+        }
+
+    def _despachar_lote(
+        self,
+        eventos: list[dict[str, Any]],
+        *,
+        processar: Callable[[dict[str, Any]], dict[str, Any]],
+        chave_ordem: Callable[[dict[str, Any]], Any],
+    ) -> list[dict[str, Any]]:
+        if self.concorrencia <= 1 or len(eventos) <= 1:
+            return [processar(evento) for evento in eventos]
+
+        # Eventos da mesma origem ficam no mesmo grupo e seguem em sequencia,
+        # preservando a ordem de captura; grupos distintos rodam em paralelo.
+        grupos: dict[Any, list[int]] = {}
+        for idx, evento in enumerate(eventos):
+            grupos.setdefault(chave_ordem(evento), []).append(idx)
+
+        resultados: list[dict[str, Any]] = [{} for _ in eventos]
+
+        def _executar_grupo(indices: list[int]) -> None:
+            for idx in indices:
+                resultados[idx] = processar(eventos[idx])
+
+        workers = min(self.concorrencia, len(grupos))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-dispatch")
+        pendentes = {pool.submit(_executar_grupo, indices) for indices in grupos.values()}
         try:
-            payload = self._carregar_payload(evento)
-            if self.payload_mapping:
-                colunas_origem = self.repo.buscar_colunas_motorista_por_evento(
-                    evento=evento,
-                    colunas=self.colunas_origem_de_para,
+            while pendentes:
+                concluidos, pendentes = wait(pendentes, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in concluidos:
+                    future.result()
+                if pendentes and self._prazo_parada_esgotado():
+                    break
+        finally:
+            # Prazo de parada esgotado (ou erro): cancela so os grupos que nao
+            # comecaram. Os em execucao terminam o POST atual (os seguintes ja
+            # voltam como "liberar" por _parando) e o resultado real e gravado;
+            # devolver um POST em voo como PENDENTE duplicaria o envio na API.
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        return self._completar_com_liberados(eventos, resultados)
+
+    async def _despachar_lote_async(
+        self,
+        eventos: list[dict[str, Any]],
+        *,
+        processar: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+        chave_ordem: Callable[[dict[str, Any]], Any],
+    ) -> list[dict[str, Any]]:
+        grupos: dict[Any, list[int]] = {}
+        for idx, evento in enumerate(eventos):
+            grupos.setdefault(chave_ordem(evento), []).append(idx)
+
+        resultados: list[dict[str, Any]] = [{} for _ in eventos]
+        semaforo = asyncio.Semaphore(self.concorrencia)
+
+        async def _executar_grupo(indices: list[int]) -> None:
+            for idx in indices:
+                async with semaforo:
+                    resultados[idx] = await processar(eventos[idx])
+
+        pendentes = {asyncio.ensure_future(_executar_grupo(indices)) for indices in grupos.values()}
+        try:
+            while pendentes:
+                concluidos, pendentes = await asyncio.wait(
+                    pendentes,
+                    timeout=0.5,
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-                payload_origem = self._montar_origem_de_para(payload, evento=evento, colunas=colunas_origem)
-                payload = self._aplicar_de_para(payload_origem, contexto="motoristas")
-            payload = self._enriquecer_payload_motorista(payload)
-            payload = self._enriquecer_payload_empregador(payload, evento=evento)
-            payload = self._enriquecer_payload_sindicato(payload, evento=evento)
-            self._validar_payload_motorista(payload)
-            response = self.api_client.post_json(self.endpoint_motorista, payload)
+                for tarefa in concluidos:
+                    tarefa.result()
+                if pendentes and self._prazo_parada_esgotado():
+                    break
+        finally:
+            # Mesmo criterio do modo threads: cancelar uma tarefa no meio do
+            # POST perderia o resultado de um envio que pode ter sido aceito.
+            # As tarefas restantes terminam o envio atual e devolvem o resto.
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+
+        return self._completar_com_liberados(eventos, resultados)
+
+    @staticmethod
+    def _completar_com_liberados(
+        eventos: list[dict[str, Any]],
+        resultados: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        # Eventos sem resultado (grupo cancelado antes de comecar no prazo de
+        # parada) nunca foram enviados: voltam ao status anterior, sem consumir
+        # tentativa.
+        return [
+            resultado if resultado else {"evento": evento, "liberar": True}
+            for evento, resultado in zip(eventos, resultados)
+        ]
+
+    def _obter_cliente_async(self) -> AsyncAtsApiClient:
+        if self._async_api_client is None:
+            self._async_api_client = AsyncAtsApiClient(
+                timeout_seconds=self.timeout_api,
+                integration_config=self.integration_config,
+                max_conexoes=self.concorrencia,
+            )
+        return self._async_api_client
+
+    async def _processar_motorista_async(self, evento: dict[str, Any]) -> dict[str, Any]:
+        # A preparacao acessa o banco (sincrono) e roda no executor;
+        # apenas o POST fica no event loop. Parada/disjuntor: devolve sem enviar.
+        if self._parando() or not self._disjuntores["M"].permitir():
+            return {"evento": evento, "liberar": True}
+        try:
+            payload = await asyncio.to_thread(self._preparar_payload_motorista, evento)
         except Exception as exc:
-            return self._registrar_erro_motorista(
-                evento=evento,
-                lock_id=lock_id,
+            self._disjuntores["M"].registrar_sem_envio()
+            # PayloadInvalido (validacao/de-para): nao adianta repetir. Erros de
+            # schema/config (coluna/tabela ausente) seguem o retry normal.
+            return self._resultado_erro(
+                evento,
                 http_status=None,
                 resposta_resumo=None,
                 detalhe_erro=str(exc),
+                permanente=isinstance(exc, PayloadInvalido),
             )
 
-        if self._resposta_indica_sucesso(response):
-            return self.repo.marcar_motorista_sucesso(
-                evento=evento,
-                lock_id=lock_id,
-                http_status=response.status_code,
-                resposta_resumo=self._resumo_resposta(response),
+        inicio = time.monotonic()
+        try:
+            response = await self._obter_cliente_async().post_json(self.endpoint_motorista, payload)
+        except Exception as exc:
+            resultado = self._resultado_erro(evento, http_status=None, resposta_resumo=None, detalhe_erro=str(exc))
+        else:
+            resultado = self._resultado_resposta(evento, response)
+        resultado["latencia"] = time.monotonic() - inicio
+        self._disjuntores["M"].registrar(falha=self._falha_infraestrutura(resultado))
+        return resultado
+
+    async def _processar_afastamento_async(self, evento: dict[str, Any]) -> dict[str, Any]:
+        if self._parando() or not self._disjuntores["A"].permitir():
+            return {"evento": evento, "liberar": True}
+        try:
+            payload = await asyncio.to_thread(self._preparar_payload_afastamento, evento)
+        except Exception as exc:
+            self._disjuntores["A"].registrar_sem_envio()
+            # PayloadInvalido (validacao/de-para): nao adianta repetir. Erros de
+            # schema/config (coluna/tabela ausente) seguem o retry normal.
+            return self._resultado_erro(
+                evento,
+                http_status=None,
+                resposta_resumo=None,
+                detalhe_erro=str(exc),
+                permanente=isinstance(exc, PayloadInvalido),
             )
 
-        return self._registrar_erro_motorista(
-            evento=evento,
-            lock_id=lock_id,
-            http_status=response.status_code,
-            resposta_resumo=self._resumo_resposta(response),
-            detalhe_erro=self._mensagem_erro_resposta(response),
+        inicio = time.monotonic()
+        try:
+            response = await self._obter_cliente_async().post_json(self.endpoint_afastamento, payload)
+        except Exception as exc:
+            resultado = self._resultado_erro(evento, http_status=None, resposta_resumo=None, detalhe_erro=str(exc))
+        else:
+            resultado = self._resultado_resposta(evento, response)
+        resultado["latencia"] = time.monotonic() - inicio
+        self._disjuntores["A"].registrar(falha=self._falha_infraestrutura(resultado))
+        return resultado
+
+    def _colunas_extras_captura(self) -> list[str] | None:
+        if not self.payload_mapping or not self.colunas_origem_de_para:
+            return None
+        return self.colunas_origem_de_para
+
+    @staticmethod
+    def _chave_ordem_motorista(evento: dict[str, Any]) -> Any:
+        return evento.get("id_de_origem")
+
+    @staticmethod
+    def _chave_ordem_afastamento(evento: dict[str, Any]) -> Any:
+        return (
+            evento.get("numempresa"),
+            evento.get("tipocolaborador"),
+            evento.get("numorigem"),
         )
 
-    def _processar_afastamento(self, evento: dict[str, Any], lock_id: str) -> bool:
+    def _processar_motorista(self, evento: dict[str, Any]) -> dict[str, Any]:
+        # Parada solicitada ou disjuntor aberto: devolve o evento sem enviar.
+        if self._parando() or not self._disjuntores["M"].permitir():
+            return {"evento": evento, "liberar": True}
         try:
-            payload = self._carregar_payload(evento)
-            if self.payload_mapping:
-                colunas_origem = self.repo.buscar_colunas_afastamento_por_evento(
+            payload = self._preparar_payload_motorista(evento)
+        except Exception as exc:
+            self._disjuntores["M"].registrar_sem_envio()
+            # PayloadInvalido (validacao/de-para): nao adianta repetir. Erros de
+            # schema/config (coluna/tabela ausente) seguem o retry normal.
+            return self._resultado_erro(
+                evento,
+                http_status=None,
+                resposta_resumo=None,
+                detalhe_erro=str(exc),
+                permanente=isinstance(exc, PayloadInvalido),
+            )
+
+        inicio = time.monotonic()
+        try:
+            response = self.api_client.post_json(self.endpoint_motorista, payload)
+        except Exception as exc:
+            resultado = self._resultado_erro(evento, http_status=None, resposta_resumo=None, detalhe_erro=str(exc))
+        else:
+            resultado = self._resultado_resposta(evento, response)
+        resultado["latencia"] = time.monotonic() - inicio
+        self._disjuntores["M"].registrar(falha=self._falha_infraestrutura(resultado))
+        return resultado
+
+    def _preparar_payload_motorista(self, evento: dict[str, Any]) -> dict[str, Any]:
+        payload = self._carregar_payload(evento)
+        if self.payload_mapping:
+            colunas_origem = evento.get("colunas_origem")
+            if colunas_origem is None:
+                colunas_origem = self.repo.buscar_colunas_motorista_por_evento(
                     evento=evento,
                     colunas=self.colunas_origem_de_para,
                 )
-                payload_origem = self._montar_origem_de_para(payload, evento=evento, colunas=colunas_origem)
-                payload = self._aplicar_de_para(payload_origem, contexto="afastamentos")
-            payload = self._enriquecer_payload_empregador(payload, evento=evento)
-            self._validar_payload_afastamento(payload)
-            response = self.api_client.post_json(self.endpoint_afastamento, payload)
+            payload_origem = self._montar_origem_de_para(payload, evento=evento, colunas=colunas_origem)
+            payload = self._aplicar_de_para(payload_origem, contexto="motoristas")
+        payload = self._enriquecer_payload_motorista(payload)
+        payload = self._enriquecer_payload_empregador(payload, evento=evento)
+        payload = self._enriquecer_payload_sindicato(payload, evento=evento)
+        self._validar_payload_motorista(payload)
+        return payload
+
+    def _processar_afastamento(self, evento: dict[str, Any]) -> dict[str, Any]:
+        # Parada solicitada ou disjuntor aberto: devolve o evento sem enviar.
+        if self._parando() or not self._disjuntores["A"].permitir():
+            return {"evento": evento, "liberar": True}
+        try:
+            payload = self._preparar_payload_afastamento(evento)
         except Exception as exc:
-            return self._registrar_erro_afastamento(
-                evento=evento,
-                lock_id=lock_id,
+            self._disjuntores["A"].registrar_sem_envio()
+            # PayloadInvalido (validacao/de-para): nao adianta repetir. Erros de
+            # schema/config (coluna/tabela ausente) seguem o retry normal.
+            return self._resultado_erro(
+                evento,
                 http_status=None,
                 resposta_resumo=None,
                 detalhe_erro=str(exc),
+                permanente=isinstance(exc, PayloadInvalido),
             )
 
+        inicio = time.monotonic()
+        try:
+            response = self.api_client.post_json(self.endpoint_afastamento, payload)
+        except Exception as exc:
+            resultado = self._resultado_erro(evento, http_status=None, resposta_resumo=None, detalhe_erro=str(exc))
+        else:
+            resultado = self._resultado_resposta(evento, response)
+        resultado["latencia"] = time.monotonic() - inicio
+        self._disjuntores["A"].registrar(falha=self._falha_infraestrutura(resultado))
+        return resultado
+
+    def _preparar_payload_afastamento(self, evento: dict[str, Any]) -> dict[str, Any]:
+        payload = self._carregar_payload(evento)
+        if self.payload_mapping:
+            colunas_origem = evento.get("colunas_origem")
+            if colunas_origem is None:
+                colunas_origem = self.repo.buscar_colunas_afastamento_por_evento(
+                    evento=evento,
+                    colunas=self.colunas_origem_de_para,
+                )
+            payload_origem = self._montar_origem_de_para(payload, evento=evento, colunas=colunas_origem)
+            payload = self._aplicar_de_para(payload_origem, contexto="afastamentos")
+        payload = self._enriquecer_payload_empregador(payload, evento=evento)
+        self._validar_payload_afastamento(payload)
+        return payload
+
+    def _resultado_resposta(self, evento: dict[str, Any], response: ApiResponse) -> dict[str, Any]:
         if self._resposta_indica_sucesso(response):
-            return self.repo.marcar_afastamento_sucesso(
-                evento=evento,
-                lock_id=lock_id,
-                http_status=response.status_code,
-                resposta_resumo=self._resumo_resposta(response),
-            )
+            return {
+                "evento": evento,
+                "sucesso": True,
+                "http_status": response.status_code,
+                "resposta_resumo": self._resumo_resposta(response),
+                "ultimo_erro": None,
+                "proxima_tentativa": None,
+            }
 
-        return self._registrar_erro_afastamento(
-            evento=evento,
-            lock_id=lock_id,
+        return self._resultado_erro(
+            evento,
             http_status=response.status_code,
             resposta_resumo=self._resumo_resposta(response),
             detalhe_erro=self._mensagem_erro_resposta(response),
+            retry_after=response.retry_after_segundos(),
+            permanente=self._erro_permanente(response.status_code),
         )
 
-    def _registrar_erro_motorista(
+    def _resultado_erro(
         self,
-        *,
         evento: dict[str, Any],
-        lock_id: str,
+        *,
         http_status: int | None,
         resposta_resumo: str | None,
         detalhe_erro: str,
-    ) -> bool:
+        retry_after: float | None = None,
+        permanente: bool = False,
+    ) -> dict[str, Any]:
         tentativa_atual = int(evento.get("tentativas") or 0)
-        proxima = self._calcular_proxima_tentativa(tentativa_atual + 1)
-        return self.repo.marcar_motorista_erro(
-            evento=evento,
-            lock_id=lock_id,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=self._limitar_texto(detalhe_erro),
-            proxima_tentativa=proxima,
-        )
+        if permanente:
+            # Erro que nenhuma nova tentativa corrige: status terminal REJEITADO.
+            return {
+                "evento": evento,
+                "sucesso": False,
+                "permanente": True,
+                "http_status": http_status,
+                "resposta_resumo": resposta_resumo,
+                "ultimo_erro": self._limitar_texto(detalhe_erro),
+                "proxima_tentativa": None,
+                "tentativas_limite": max(self.max_tentativas, tentativa_atual + 1),
+            }
+        return {
+            "evento": evento,
+            "sucesso": False,
+            "http_status": http_status,
+            "resposta_resumo": resposta_resumo,
+            "ultimo_erro": self._limitar_texto(detalhe_erro),
+            "proxima_tentativa": self._calcular_proxima_tentativa(
+                tentativa_atual + 1,
+                http_status=http_status,
+                retry_after=retry_after,
+            ),
+        }
+
+    def _erro_permanente(self, http_status: int | None) -> bool:
+        # Regra da politica_retry tem precedencia; sem ela, so as rejeicoes 4xx
+        # de conteudo sao permanentes (401/403/408/409/429 etc. podem passar).
+        if http_status is None:
+            return False
+        regra = self._regra_retry(http_status)
+        if "permanente" in regra:
+            return bool(regra["permanente"])
+        return int(http_status) in _STATUS_REJEICAO_PERMANENTE
 
-    def _registrar_erro_afastamento(
+    def _calcular_proxima_tentativa(
         self,
+        tentativas_apos_erro: int,
         *,
-        evento: dict[str, Any],
-        lock_id: str,
-        http_status: int | None,
-        resposta_resumo: str | None,
-        detalhe_erro: str,
-    ) -> bool:
-        tentativa_atual = int(evento.get("tentativas") or 0)
-        proxima = self._calcular_proxima_tentativa(tentativa_atual + 1)
-        return self.repo.marcar_afastamento_erro(
-            evento=evento,
-            lock_id=lock_id,
-            http_status=http_status,
-            resposta_resumo=resposta_resumo,
-            ultimo_erro=self._limitar_texto(detalhe_erro),
-            proxima_tentativa=proxima,
-        )
-
-    def _calcular_proxima_tentativa(self, tentativas_apos_erro: int) -> datetime | None:
+        http_status: int | None = None,
+        retry_after: float | None = None,
+    ) -> datetime | None:
         if tentativas_apos_erro >= self.max_tentativas:
             return None
 
+        regra = self._regra_retry(http_status)
+        base = int(regra.get("base_segundos") or self.retry_base_seconds)
+        maximo = max(base, int(regra.get("max_segundos") or self.retry_max_seconds))
+
+        # Jitter com piso na base (ate o dobro do backoff nominal): eventos que
+        # falharam juntos (ex.: queda da API) voltam espalhados, nao no mesmo instante.
         fator = max(0, int(tentativas_apos_erro) - 1)
-        delay = self.retry_base_seconds * (2 ** fator)
-        delay = min(delay, self.retry_max_seconds)
-        return datetime.utcnow() + timedelta(seconds=int(delay))
+        teto = min(base * (2 ** (fator + 1)), maximo)
+        delay = random.uniform(base, max(base, teto))
+
+        if retry_after is not None and regra.get("respeitar_retry_after", True):
+            # Retry-After e piso; o jitter evita que todos voltem juntos nele.
+            delay = max(delay, min(float(retry_after), maximo) + random.uniform(0, base))
+
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    def _regra_retry(self, http_status: int | None) -> dict[str, Any]:
+        # Status exato > classe (4xx/5xx) > "conexao" para falhas sem resposta HTTP.
+        if http_status is None:
+            return self.politica_retry.get("conexao") or {}
+        status = int(http_status)
+        return self.politica_retry.get(str(status)) or self.politica_retry.get(f"{status // 100}xx") or {}
 
     @staticmethod
     def _carregar_payload(evento: dict[str, Any]) -> dict[str, Any]:
         payload_raw = evento.get("payload_json")
         if payload_raw is None:
-            raise ValueError("Evento sem PayloadJson.")
+            raise PayloadInvalido("Evento sem PayloadJson.")
 
         if isinstance(payload_raw, dict):
             return dict(payload_raw)
@@ -310,10 +1092,10 @@ class ApiDispatchService:
         try:
             parsed = json.loads(str(payload_raw))
         except Exception as exc:
-            raise ValueError(f"PayloadJson invalido: {exc}") from exc
+            raise PayloadInvalido(f"PayloadJson invalido: {exc}") from exc
 
         if not isinstance(parsed, dict):
-            raise ValueError("PayloadJson precisa representar um objeto JSON.")
+            raise PayloadInvalido("PayloadJson precisa representar um objeto JSON.")
         return parsed
 
     def _enriquecer_payload_motorista(self, payload: dict[str, Any]) -> dict[str, Any]:
@@ -551,11 +1333,11 @@ class ApiDispatchService:
         datainicio = str(payload.get("datainicio") or "").strip()
 
         if not cpf:
-            raise ValueError("Payload de afastamento sem CPF.")
+            raise PayloadInvalido("Payload de afastamento sem CPF.")
         if not descricao:
-            raise ValueError("Payload de afastamento sem descricao.")
+            raise PayloadInvalido("Payload de afastamento sem descricao.")
         if not datainicio:
-            raise ValueError("Payload de afastamento sem datainicio.")
+            raise PayloadInvalido("Payload de afastamento sem datainicio.")
         ApiDispatchService._validar_pessoa_juridica_obrigatoria(
             payload.get("empregador"),
             "empregador",
@@ -569,15 +1351,15 @@ class ApiDispatchService:
         endereco = payload.get("endereco")
 
         if not nome:
-            raise ValueError("Payload de motorista sem nome.")
+            raise PayloadInvalido("Payload de motorista sem nome.")
         if not cpf:
-            raise ValueError("Payload de motorista sem CPF.")
+            raise PayloadInvalido("Payload de motorista sem CPF.")
         if not dataadmissao:
-            raise ValueError("Payload de motorista sem dataadmissao.")
+            raise PayloadInvalido("Payload de motorista sem dataadmissao.")
         if not isinstance(endereco, dict):
-            raise ValueError("Payload de motorista sem endereco.")
+            raise PayloadInvalido("Payload de motorista sem endereco.")
         if not str(endereco.get("cidade") or "").strip() or not str(endereco.get("uf") or "").strip():
-            raise ValueError("Endereco do motorista sem cidade/UF.")
+            raise PayloadInvalido("Endereco do motorista sem cidade/UF.")
         ApiDispatchService._validar_pessoa_juridica_obrigatoria(
             payload.get("empregador"),
             "empregador",
@@ -589,6 +1371,9 @@ class ApiDispatchService:
 
     @staticmethod
     def _validar_pessoa_juridica_obrigatoria(pessoa: Any, campo: str) -> None:
+        # Empregador/sindicato vem do EmpresaDict/SindicatoDict: falta aqui
+        # costuma ser transitoria (cache vazio apos falha de carga, empresa
+        # nova ainda nao cadastrada), entao e ValueError comum, com retry.
         if not isinstance(pessoa, dict):
             raise ValueError(f"Payload sem {campo}.")
 
@@ -778,17 +1563,23 @@ class ApiDispatchService:
 
             if self._valor_vazio(valor):
                 if obrigatorio:
-                    raise ValueError(
+                    raise PayloadInvalido(
                         f"Campo obrigatorio ausente no de-para ({contexto}): '{nome}' "
                         f"(origem='{origem}', destino='{destino}')"
                     )
                 continue
 
-            valor = self._aplicar_transformacao(valor, transformacao)
+            try:
+                valor = self._aplicar_transformacao(valor, transformacao)
+            except (TypeError, ValueError) as exc:
+                # Valor de origem fora do formato da regra: defeito do dado.
+                raise PayloadInvalido(
+                    f"Transformacao '{transformacao}' invalida no de-para ({contexto}) para '{nome}': {exc}"
+                ) from exc
             self._definir_valor_por_caminho(payload_destino, destino, valor)
 
         if not payload_destino:
-            raise ValueError(f"De-para de {contexto} gerou payload vazio.")
+            raise PayloadInvalido(f"De-para de {contexto} gerou payload vazio.")
 
         return payload_destino
 
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+_AMOSTRAS_MAXIMAS = 500
+_AMOSTRAS_MINIMAS = 5
+# Acima desta taxa de erro o lote encolhe mesmo com latencia baixa.
+_TAXA_ERRO_REDUCAO = 0.5
+# Variacoes menores que isto nao mudam o lote (evita oscilacao).
+_VARIACAO_MINIMA = 0.1
+
+
+def _percentil(valores: list[float], fracao: float) -> float:
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, int(round(fracao * (len(ordenados) - 1)))))
+    return ordenados[idx]
+
+
+class ControladorLote:
+    # Dimensiona a captura para que o lote inteiro seja enviado dentro de uma
+    # fracao do lock_timeout: tamanho ~ alvo * concorrencia / p95 da latencia.
+    # O ajuste por ciclo fica entre metade e o dobro do tamanho atual.
+    def __init__(
+        self,
+        *,
+        nome: str,
+        inicial: int,
+        minimo: int,
+        maximo: int,
+        alvo_segundos: float,
+        concorrencia: int,
+    ) -> None:
+        self.nome = nome
+        self.minimo = max(1, int(minimo))
+        self.maximo = max(self.minimo, int(maximo))
+        self.tamanho = min(self.maximo, max(self.minimo, int(inicial)))
+        self.alvo_segundos = max(1.0, float(alvo_segundos))
+        self.concorrencia = max(1, int(concorrencia))
+        self._latencias: deque[float] = deque(maxlen=_AMOSTRAS_MAXIMAS)
+        self._erros: deque[bool] = deque(maxlen=_AMOSTRAS_MAXIMAS)
+
+    def registrar(self, resultados: list[dict[str, Any]]) -> str | None:
+        # So contam eventos que chegaram a ser enviados: payload invalido nao
+        # diz nada sobre a capacidade da API.
+        for item in resultados:
+            latencia = item.get("latencia")
+            if latencia is None:
+                continue
+            self._latencias.append(float(latencia))
+            self._erros.append(not bool(item.get("sucesso")))
+
+        if len(self._latencias) < _AMOSTRAS_MINIMAS:
+            return None
+
+        amostras = list(self._latencias)
+        p50 = _percentil(amostras, 0.5)
+        p95 = _percentil(amostras, 0.95)
+        taxa_erro = sum(self._erros) / len(self._erros) if self._erros else 0.0
+
+        ideal = int(self.alvo_segundos * self.concorrencia / max(p95, 0.001))
+        if taxa_erro >= _TAXA_ERRO_REDUCAO:
+            ideal = min(ideal, self.tamanho // 2)
+
+        novo = min(self.tamanho * 2, max(self.tamanho // 2, ideal))
+        novo = min(self.maximo, max(self.minimo, novo))
+        if novo == self.tamanho or abs(novo - self.tamanho) < self.tamanho * _VARIACAO_MINIMA:
+            return None
+
+        decisao = (
+            f"Lote{self.nome} {self.tamanho}->{novo} "
+            f"(p50={p50:.2f}s p95={p95:.2f}s erro={taxa_erro:.0%} alvo={self.alvo_segundos:.0f}s)"
+        )
+        self.tamanho = novo
+        return decisao
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+import time
+
+FECHADO = "FECHADO"
+ABERTO = "ABERTO"
+MEIO_ABERTO = "MEIO_ABERTO"
+
+
+class DisjuntorApi:
+    # Circuit breaker do envio: apos `limite_falhas` falhas consecutivas de
+    # infraestrutura (conexao/timeout/5xx) abre e bloqueia envios por
+    # `espera_segundos`. Depois disso fica meio-aberto: um unico evento de
+    # sondagem decide se fecha (sucesso) ou reabre (falha); sem evento para
+    # sondar, fecha em alerta (ver registrar_sem_envio).
+    # limite_falhas <= 0 desliga o disjuntor.
+    def __init__(self, *, limite_falhas: int, espera_segundos: float) -> None:
+        self.limite_falhas = max(0, int(limite_falhas))
+        self.espera_segundos = max(1.0, float(espera_segundos))
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas_consecutivas = 0
+        self._aberto_ate = 0.0
+
+    @property
+    def estado(self) -> str:
+        return self._estado
+
+    def tamanho_captura(self, tamanho: int) -> int:
+        if not self.limite_falhas:
+            return tamanho
+        with self._lock:
+            if self._estado == FECHADO:
+                return tamanho
+            if self._estado == ABERTO and time.monotonic() < self._aberto_ate:
+                return 0
+            self._estado = MEIO_ABERTO
+            return 1
+
+    def permitir(self) -> bool:
+        if not self.limite_falhas:
+            return True
+        with self._lock:
+            return self._estado != ABERTO
+
+    def registrar_sem_envio(self) -> None:
+        # Sondagem que nao chegou a API (fila vazia, payload invalido) nao diz
+        # nada sobre ela: passado o cool-down o disjuntor fecha, mas com as
+        # falhas no limite, entao a primeira falha de infraestrutura reabre.
+        if not self.limite_falhas:
+            return
+        with self._lock:
+            if self._estado != MEIO_ABERTO:
+                return
+            self._estado = FECHADO
+            self._falhas_consecutivas = self.limite_falhas - 1
+
+    def registrar(self, *, falha: bool) -> None:
+        if not self.limite_falhas:
+            return
+        with self._lock:
+            if not falha:
+                self._falhas_consecutivas = 0
+                self._estado = FECHADO
+                return
+
+            self._falhas_consecutivas += 1
+            if self._estado == MEIO_ABERTO or self._falhas_consecutivas >= self.limite_falhas:
+                self._estado = ABERTO
+                self._aberto_ate = time.monotonic() + self.espera_segundos
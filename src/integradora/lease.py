@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable
+
+# Intervalo automatico: um terco do lock_timeout, com piso para nao martelar o banco.
+_FRACAO_LOCK_TIMEOUT = 1 / 3
+_INTERVALO_MINIMO_SEGUNDOS = 5.0
+
+
+class RenovadorLease:
+    # Heartbeat dos locks da fila: enquanto um lote capturado estiver ativo
+    # (da captura ao ack), o LockEm de todas as suas linhas e estendido
+    # periodicamente. Um UPDATE por fila renova todos os lock_ids ativos dela.
+    # Lotes lentos nao sao reclamados por outro worker e o lock_timeout pode
+    # ser curto, so para recuperar locks de processos que cairam.
+    def __init__(
+        self,
+        *,
+        renovar: Callable[[str, list[str]], int],
+        intervalo_segundos: float = 0.0,
+        lock_timeout_minutes: int = 15,
+    ) -> None:
+        self._renovar = renovar
+        if intervalo_segundos and intervalo_segundos > 0:
+            self.intervalo = max(1.0, float(intervalo_segundos))
+        else:
+            self.intervalo = max(
+                _INTERVALO_MINIMO_SEGUNDOS,
+                max(1, int(lock_timeout_minutes)) * 60 * _FRACAO_LOCK_TIMEOUT,
+            )
+        self._lock = threading.Lock()
+        self._ativos: dict[str, str] = {}
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.ultimo_erro: str | None = None
+
+    def registrar(self, nome: str, lock_id: str) -> None:
+        with self._lock:
+            self._ativos[lock_id] = nome
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._executar, name="api-lease", daemon=True)
+                self._thread.start()
+
+    def remover(self, lock_id: str) -> None:
+        with self._lock:
+            self._ativos.pop(lock_id, None)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._ativos.clear()
+
+    def encerrar(self) -> None:
+        self._parar.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.intervalo)
+        self._thread = None
+
+    def renovar_agora(self) -> int:
+        with self._lock:
+            por_fila: dict[str, list[str]] = {}
+            for lock_id, nome in self._ativos.items():
+                por_fila.setdefault(nome, []).append(lock_id)
+
+        renovados = 0
+        for nome, lock_ids in por_fila.items():
+            renovados += self._renovar(nome, lock_ids)
+        return renovados
+
+    def _executar(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.renovar_agora()
+                self.ultimo_erro = None
+            except Exception as exc:
+                # Falha pontual (ex.: banco indisponivel): tenta no proximo tick;
+                # no pior caso o lock expira como antes do heartbeat.
+                self.ultimo_erro = str(exc)
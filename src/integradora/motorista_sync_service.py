@@ -11,8 +11,10 @@ from sqlalchemy.engine import Engine
 
 from Consultas_dbo.cadastrei.motorista_cadastro import RepositorioMotoristaCadastro
 from Consultas_dbo.cadastro_motoristas.cadastro_motoristas import RepositorioCadastroMotoristas
+from Consultas_dbo.metadados import configurar_ttl_metadados
 from Ferramentas.montar_payload_motoristas import montar_payload_motoristas
 from config.settings import settings
+from src.integradora.agendador import AgendadorCiclos
 
 
 @dataclass
@@ -51,6 +53,14 @@ class MotoristaSyncService:
             schema=schema_destino,
             table_name=tabela_destino,
         )
+        configurar_ttl_metadados(settings.db_metadados_ttl_seconds)
+        try:
+            self.repo_origem.aquecer_metadados()
+            self.repo_destino.aquecer_metadados()
+        except Exception:
+            # Catalogo inacessivel no startup: as colunas sao carregadas (e ficam
+            # no cache do processo) na primeira consulta.
+            pass
 
     def resetar_estado_sync(self) -> None:
         self.repo_destino.garantir_estruturas_auxiliares()
@@ -206,7 +216,7 @@ class MotoristaSyncService:
         logger: Callable[[str], None] | None = None,
         stop_event: Any | None = None,
     ) -> None:
-        intervalo = max(1, int(intervalo_segundos))
+        agendador = AgendadorCiclos(intervalo_segundos)
         sink = logger or (lambda _: None)
 
         while True:
@@ -215,6 +225,11 @@ class MotoristaSyncService:
             inicio = time.time()
             try:
                 resultado = self.executar_ciclo()
+                sleep_for = agendador.registrar_ciclo(
+                    itens=resultado.numcads_processados,
+                    lote_cheio=resultado.alterados_fun >= self.batch_size or resultado.alterados_cpl >= self.batch_size,
+                    inicio=inicio,
+                )
                 sink(
                     (
                         f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] "
@@ -223,14 +238,14 @@ class MotoristaSyncService:
                         f"NumCad={resultado.numcads_processados} "
                         f"Payload={resultado.payloads_validos} "
                         f"Eventos={resultado.eventos_gerados} "
-                        f"Inseridos={resultado.eventos_inseridos}"
+                        f"Inseridos={resultado.eventos_inseridos} "
+                        f"{agendador.resumo(sleep_for)}"
                     )
                 )
             except Exception as exc:
                 sink(f"[{datetime.now().isoformat(sep=' ', timespec='seconds')}] ERRO: {exc}")
+                sleep_for = agendador.intervalo - (time.time() - inicio)
 
-            elapsed = time.time() - inicio
-            sleep_for = intervalo - elapsed
             if sleep_for > 0:
                 if stop_event is not None:
                     if stop_event.wait(sleep_for):
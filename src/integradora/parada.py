@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import signal
+import threading
+from typing import Any, Callable
+
+
+def instalar_parada_graciosa(ao_parar: Callable[[], None]) -> threading.Event:
+    # Ctrl+C / stop do NSSM / SIGTERM: o primeiro sinal pede parada graciosa
+    # (termina os POSTs em voo e devolve os eventos capturados); o segundo
+    # interrompe na hora.
+    parada = threading.Event()
+
+    def _tratar(_signum: int, _frame: Any) -> None:
+        if parada.is_set():
+            raise KeyboardInterrupt
+        parada.set()
+        ao_parar()
+
+    for nome in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sinal = getattr(signal, nome, None)
+        if sinal is None:
+            continue
+        try:
+            signal.signal(sinal, _tratar)
+        except (OSError, ValueError):
+            # Fora da thread principal (ex.: embutido na interface) nao ha sinais.
+            continue
+    return parada